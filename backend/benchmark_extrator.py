@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Extrator
+=====================
+
+Mede os trechos mais quentes da extração com simulados sintéticos de
+tamanho crescente (por padrão 10, 100, 1 000 e 10 000 questões):
+
+- parse_questions e extract_answers (extrator_pdf.py), sobre o texto
+- parse_segment_text, collect_text_between e classify_theme
+  (extrair_simulados.py), sobre um PDF gerado localmente com PyMuPDF
+
+Cada medição informa o melhor tempo de N repetições, a vazão (itens/s) e o
+pico de memória alocada (tracemalloc, em uma execução separada). O resultado
+é gravado em JSON para comparar commits:
+
+    python benchmark_extrator.py -o bench_antes.json
+    git checkout outro-commit
+    python benchmark_extrator.py -o bench_depois.json --compare bench_antes.json
+"""
+
+import gc
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from extrator_pdf import PDFExtractor
+
+# Funções do extrair_simulados (precisam do PyMuPDF)
+sys.path.append(str(Path(__file__).resolve().parent.parent / "extrair_simulados"))
+try:
+    import fitz  # PyMuPDF
+    import extrair_simulados as simulados
+    HAS_SIMULADOS = True
+except ImportError:
+    HAS_SIMULADOS = False
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+QUESTIONS_PER_SIMULADO = 70
+QUESTIONS_PER_PAGE = 6
+
+# Trechos usados para montar enunciados com temas variados
+TOPICS = [
+    "A CVM e o BACEN regulam o mercado; segundo o código ANBIMA, o gerente deve",
+    "Um investidor aplicou em CDB, LCI e fundos de ações; considerando o tesouro e a poupança,",
+    "No planejamento da carteira, o rebalanceamento e a alocação de ativos dependem da TIR e do VPL;",
+    "Com a Selic em alta, a inflação e o câmbio afetam o PIB e os juros do mercado;",
+    "Em casos de lavagem de dinheiro e insider trading, o compliance e a ética exigem comunicar ao COAF;",
+    "O perfil do investidor (suitability) conservador, moderado ou arrojado reflete a aversão a risco;",
+    "Assinale a alternativa correta sobre o tema apresentado no enunciado abaixo,",
+]
+FILLER = "considerando as informações do caso e as regras vigentes, é correto afirmar que"
+
+
+def make_questions(count: int, seed: int = 42) -> List[Dict]:
+    """Questões sintéticas: id de origem, enunciado, alternativas a–d e resposta"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        stem = f"{rng.choice(TOPICS)} {FILLER} ({i + 1})"
+        questions.append({
+            'numero': i + 1,
+            'id_origem': f"[{100000 + i}-{'ABCD'[i % 4]}]",
+            'enunciado': stem,
+            'alternativas': [f"alternativa {letra} da questão {i + 1}, com texto de tamanho típico"
+                             for letra in "abcd"],
+            'resposta': rng.choice("ABCD"),
+        })
+    return questions
+
+
+def answer_key_text(questions: List[Dict]) -> str:
+    """Gabarito no formato dos simulados CEA: 'CEA: SIMULADO (n)' seguido de '1. A 2. B ...'"""
+    lines = ["GABARITO"]
+    for start in range(0, len(questions), QUESTIONS_PER_SIMULADO):
+        chunk = questions[start:start + QUESTIONS_PER_SIMULADO]
+        lines.append(f"CEA: SIMULADO ({start // QUESTIONS_PER_SIMULADO + 1})")
+        for row in range(0, len(chunk), 10):
+            lines.append(" ".join(f"{(start + j) % QUESTIONS_PER_SIMULADO + 1}. {q['resposta']}"
+                                  for j, q in enumerate(chunk[row:row + 10], row)))
+    return "\n".join(lines)
+
+
+def cea_question_text(question: Dict) -> str:
+    """Questão no layout dos simulados CEA: 'NN [ID] enunciado' e alternativas a)–d)"""
+    num = (question['numero'] - 1) % QUESTIONS_PER_SIMULADO + 1
+    lines = [f"{num:02d} {question['id_origem']} {question['enunciado']}"]
+    lines += [f"{letra}) {alt}" for letra, alt in zip("abcd", question['alternativas'])]
+    return "\n".join(lines)
+
+
+def make_booklet_text(questions: List[Dict], layout: str = 'cea') -> str:
+    """
+    Texto de um simulado sintético.
+
+    layout='cea' usa o formato 'NN [ID]' dos simulados; layout='numerado' usa
+    '1. enunciado', o formato reconhecido pelos padrões padrão do PDFExtractor.
+    """
+    parts = []
+    for q in questions:
+        if layout == 'cea':
+            parts.append(cea_question_text(q))
+        else:
+            lines = [f"{q['numero']}. {q['enunciado']}"]
+            lines += [f"{letra}) {alt}" for letra, alt in zip("abcd", q['alternativas'])]
+            parts.append("\n".join(lines))
+    parts.append(answer_key_text(questions))
+    return "\n\n".join(parts) + "\n"
+
+
+def make_booklet_pdf(questions: List[Dict], path: Path) -> Path:
+    """Gera com PyMuPDF um PDF no layout CEA, uma questão por bloco de texto"""
+    doc = fitz.open()
+    for start in range(0, len(questions), QUESTIONS_PER_PAGE):
+        page = doc.new_page()
+        y = 50
+        for q in questions[start:start + QUESTIONS_PER_PAGE]:
+            text = cea_question_text(q)
+            page.insert_text((40, y), text, fontsize=8)
+            y += 11 * (text.count("\n") + 1) + 20
+    page = doc.new_page()
+    page.insert_text((40, 50), answer_key_text(questions), fontsize=8)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def measure(func: Callable[[], int], repeat: int) -> Dict:
+    """
+    Executa `func` (que retorna o número de itens processados) e mede o
+    melhor tempo de `repeat` execuções e o pico de memória de uma execução
+    à parte, com tracemalloc ligado.
+    """
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        items = func()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'itens': items,
+        'segundos': round(best, 6),
+        'segundos_media': round(sum(timings) / len(timings), 6),
+        'itens_por_segundo': round(items / best, 1) if best else None,
+        'pico_memoria_bytes': peak,
+    }
+
+
+def bench_extrator(text: str, size: int, repeat: int) -> Dict[str, Dict]:
+    """parse_questions e extract_answers sobre o texto completo"""
+    def run_answers():
+        # O gabarito numera de 1 a 70 em cada simulado; a vazão é por questão do texto
+        extractor.extract_answers(text)
+        return size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFExtractor(str(Path(tmp) / "sintetico.pdf"), tmp)
+        return {
+            'parse_questions': measure(lambda: len(extractor.parse_questions(text)), repeat),
+            'extract_answers': measure(run_answers, repeat),
+        }
+
+
+def bench_simulados(questions: List[Dict], workdir: Path, repeat: int) -> Dict[str, Dict]:
+    """parse_segment_text, collect_text_between e classify_theme sobre um PDF sintético"""
+    pdf_path = make_booklet_pdf(questions, workdir / f"simulado_{len(questions)}.pdf")
+    with fitz.open(str(pdf_path)) as doc:
+        pages = [simulados.read_page(page) for page in doc]
+    index = simulados.PageIndex(pages)
+    segments = simulados.find_segments(pages)
+
+    raw_segments = [simulados.collect_text_between(index, s["start"], s["end"]) for s in segments]
+    parsed = [p for p in map(simulados.parse_segment_text, raw_segments) if p]
+    theme_texts = [" ".join(p[1:]) for p in parsed]
+
+    def run_collect():
+        for seg in segments:
+            simulados.collect_text_between(index, seg["start"], seg["end"])
+        return len(segments)
+
+    def run_parse():
+        return sum(1 for raw in raw_segments if simulados.parse_segment_text(raw))
+
+    def run_classify():
+        for text in theme_texts:
+            simulados.classify_theme(text)
+        return len(theme_texts)
+
+    return {
+        'collect_text_between': measure(run_collect, repeat),
+        'parse_segment_text': measure(run_parse, repeat),
+        'classify_theme': measure(run_classify, repeat),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: List[int], repeat: int = 3, include_pdf: bool = True) -> Dict:
+    """Executa todas as medições e devolve o relatório (pronto para JSON)"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            questions = make_questions(size)
+            text = make_booklet_text(questions, layout='numerado')
+
+            measured = bench_extrator(text, size, repeat)
+            if include_pdf and HAS_SIMULADOS:
+                measured.update(bench_simulados(questions, Path(tmp), repeat))
+
+            for name, data in measured.items():
+                results.append({'funcao': name, 'questoes': size, **data})
+                print(f"{name:>22} | {size:>6} questões | {data['segundos'] * 1000:10.2f} ms | "
+                      f"{data['itens_por_segundo'] or 0:>12,.0f} itens/s | "
+                      f"{data['pico_memoria_bytes'] / 1024:>10,.0f} KiB")
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'repeticoes': repeat,
+        },
+        'resultados': results,
+    }
+
+
+def compare_reports(current: Dict, baseline: Dict):
+    """Mostra a razão de tempo (atual / base) para cada função e tamanho"""
+    base = {(r['funcao'], r['questoes']): r for r in baseline['resultados']}
+    print(f"\nComparação com {baseline['meta'].get('commit') or 'base'} (tempo atual / base; < 1 é mais rápido)")
+    for r in current['resultados']:
+        old = base.get((r['funcao'], r['questoes']))
+        if old and old['segundos']:
+            ratio = r['segundos'] / old['segundos']
+            mem = r['pico_memoria_bytes'] / old['pico_memoria_bytes'] if old['pico_memoria_bytes'] else 0
+            print(f"{r['funcao']:>22} | {r['questoes']:>6} questões | tempo x{ratio:.2f} | memória x{mem:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos trechos quentes da extração')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Quantidades de questões')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Repetições por medição (vale a melhor)')
+    parser.add_argument('-o', '--output', default='benchmark_extrator.json', help='Arquivo JSON de saída')
+    parser.add_argument('--no-pdf', action='store_true', help='Mede só as funções que trabalham sobre texto')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    # O extrator registra cada etapa; no benchmark isso só atrapalha a medição
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if not args.no_pdf and not HAS_SIMULADOS:
+        print("⚠️ PyMuPDF não disponível: medindo só parse_questions e extract_answers")
+
+    report = run_benchmarks(args.sizes, args.repeat, include_pdf=not args.no_pdf)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📊 Resultados salvos em: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(report, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Abertura de PDFs por mmap
+=========================
+
+Mapeia o PDF na memória uma única vez e entrega a mesma região para
+PyMuPDF (`fitz.open(stream=...)`), pdfplumber e PyPDF2, sem ler o arquivo
+para o heap do Python. Cada leitor recebe um "arquivo" próprio (posição
+independente) sobre o mesmo mapeamento.
+
+Dentro de um processo o mapeamento é reaproveitado por caminho
+(`shared_buffer`), então as passadas de texto e de imagens usam o mesmo.
+Os processos do pool mapeiam o mesmo arquivo: as páginas mapeadas vêm do
+cache de páginas do sistema, compartilhadas entre todos os processos, sem
+cópia e sem nova leitura do disco.
+
+Uso:
+    buffer = shared_buffer("simulado.pdf")
+    doc = fitz.open(stream=buffer.view, filetype="pdf")
+    with pdfplumber.open(buffer.reader()) as pdf:
+        ...
+"""
+
+import io
+import os
+import mmap
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+class BufferReader(io.RawIOBase):
+    """Arquivo somente leitura sobre um memoryview, com posição própria"""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        self._pos = max(self._pos, 0)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        chunk = self._view[self._pos:self._pos + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self._pos += size
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        data = self._view[self._pos:end].tobytes()
+        self._pos += len(data)
+        return data
+
+
+class PdfBuffer:
+    """Um PDF mapeado na memória (somente leitura)"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            # O mapeamento continua válido depois de fechar o arquivo
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def reader(self) -> io.BufferedReader:
+        """Novo arquivo sobre o mapeamento (para pdfplumber e PyPDF2)"""
+        return io.BufferedReader(BufferReader(self.view))
+
+    def close(self):
+        self.view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Algum leitor (ex.: um documento fitz aberto) ainda usa a região;
+            # o mapeamento é liberado quando ele for coletado
+            pass
+
+
+# Mapeamentos deste processo: caminho -> (tamanho, mtime, buffer)
+_BUFFERS: Dict[str, Tuple[int, float, PdfBuffer]] = {}
+
+
+def shared_buffer(path: str) -> PdfBuffer:
+    """Mapeamento do PDF reaproveitado dentro do processo (refeito se o arquivo mudar)"""
+    key = str(Path(path).resolve())
+    stat = os.stat(key)
+    entry = _BUFFERS.get(key)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+        return entry[2]
+
+    buffer = PdfBuffer(key)
+    _BUFFERS[key] = (stat.st_size, stat.st_mtime, buffer)
+    return buffer
+
+
+def close_shared_buffers():
+    """Libera todos os mapeamentos deste processo"""
+    while _BUFFERS:
+        _, (_, _, buffer) = _BUFFERS.popitem()
+        buffer.close()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Cache Persistente de Extração
+=============================
+
+Guarda em SQLite o resultado caro da leitura de PDFs (texto por página,
+blocos, informações e bytes de imagens) para que novas execuções sobre o
+mesmo arquivo não precisem abrir o PDF de novo.
+
+Cada entrada é identificada por:
+- hash SHA-256 do conteúdo do PDF
+- número da página (-1 para dados do documento inteiro)
+- tipo do dado (ex.: 'texto:pdfplumber', 'blocos', 'imagens')
+- versão do extrator que gerou o dado
+
+Quando o tamanho total passa de `max_bytes`, as entradas acessadas há mais
+tempo são removidas.
+
+Uso:
+    cache = ExtractionCache()
+    pdf_hash = cache.file_hash("simulado.pdf")
+    cache.put_json(pdf_hash, 0, "blocos", blocos)
+    blocos = cache.get_json(pdf_hash, 0, "blocos")
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(
+    os.getenv("SIMULADO_CEA_CACHE", Path.home() / ".cache" / "simulado-cea" / "extracao.sqlite3")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# Depois de uma remoção, o cache fica com esta fração do limite
+EVICTION_TARGET = 0.9
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 do arquivo lendo em blocos"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ExtractionCache:
+    """Cache em disco de dados extraídos de PDFs, com remoção por tamanho"""
+
+    def __init__(self, version: str, path: Path = DEFAULT_CACHE_PATH,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.version = version
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Vários processos (modo lote) podem escrever ao mesmo tempo
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                pdf_hash TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                versao TEXT NOT NULL,
+                dados BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                acesso REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, pagina, tipo, versao)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entradas_acesso ON entradas (acesso)")
+        # Evita recalcular o hash de arquivos que não mudaram
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                hash TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        self._size = self.conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+
+    def file_hash(self, pdf_path: str) -> str:
+        """Hash do conteúdo do PDF, memorizado por caminho, tamanho e mtime"""
+        path = str(Path(pdf_path).resolve())
+        stat = os.stat(path)
+        row = self.conn.execute(
+            "SELECT hash FROM arquivos WHERE caminho = ? AND tamanho = ? AND mtime = ?",
+            (path, stat.st_size, stat.st_mtime)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        digest = file_sha256(path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO arquivos (caminho, tamanho, mtime, hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, digest)
+            )
+        return digest
+
+    def get(self, pdf_hash: str, page: int, kind: str) -> Optional[bytes]:
+        """Retorna os bytes guardados ou None"""
+        key = (pdf_hash, page, kind, self.version)
+        row = self.conn.execute(
+            "SELECT dados FROM entradas WHERE pdf_hash = ? AND pagina = ? AND tipo = ? AND versao = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE entradas SET acesso = ? WHERE pdf_hash = ? AND pagina = ? AND tipo = ? AND versao = ?",
+                (time.time(),) + key
+            )
+        return bytes(row[0])
+
+    def get_pages(self, pdf_hash: str, kind: str) -> Dict[int, bytes]:
+        """Retorna todas as páginas guardadas de um tipo, {página: bytes}"""
+        key = (pdf_hash, kind, self.version)
+        rows = self.conn.execute(
+            "SELECT pagina, dados FROM entradas WHERE pdf_hash = ? AND tipo = ? AND versao = ? AND pagina >= 0", key
+        ).fetchall()
+        if rows:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE entradas SET acesso = ? WHERE pdf_hash = ? AND tipo = ? AND versao = ?",
+                    (time.time(),) + key
+                )
+        return {page: bytes(data) for page, data in rows}
+
+    def put(self, pdf_hash: str, page: int, kind: str, data: bytes):
+        """Guarda bytes para (hash, página, tipo)"""
+        self.put_many(pdf_hash, kind, [(page, data)])
+
+    def put_many(self, pdf_hash: str, kind: str, items: Iterable[Tuple[int, bytes]]):
+        """Guarda várias páginas de um mesmo tipo em uma única transação"""
+        now = time.time()
+        rows = [(pdf_hash, page, kind, self.version, data, len(data), now) for page, data in items]
+        with self.conn:
+            for row in rows:
+                old = self.conn.execute(
+                    "SELECT tamanho FROM entradas WHERE pdf_hash = ? AND pagina = ? AND tipo = ? AND versao = ?",
+                    row[:4]
+                ).fetchone()
+                self._size -= old[0] if old else 0
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entradas (pdf_hash, pagina, tipo, versao, dados, tamanho, acesso) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", row
+                )
+                self._size += row[5]
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_json(self, pdf_hash: str, page: int, kind: str) -> Any:
+        data = self.get(pdf_hash, page, kind)
+        return None if data is None else json.loads(data)
+
+    def put_json(self, pdf_hash: str, page: int, kind: str, value: Any):
+        self.put(pdf_hash, page, kind, json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+    def evict(self):
+        """Remove as entradas menos usadas até o cache voltar abaixo do limite"""
+        target = int(self.max_bytes * EVICTION_TARGET)
+        removed = 0
+        with self.conn:
+            rows = self.conn.execute(
+                "SELECT rowid, tamanho FROM entradas ORDER BY acesso ASC"
+            ).fetchall()
+            to_delete = []
+            for rowid, size in rows:
+                if self._size <= target:
+                    break
+                to_delete.append((rowid,))
+                self._size -= size
+                removed += size
+            self.conn.executemany("DELETE FROM entradas WHERE rowid = ?", to_delete)
+
+        logger.info(f"Cache: {removed / 1024 / 1024:.1f} MB removidos ({len(to_delete)} entradas)")
+
+    def clear(self):
+        """Apaga todas as entradas"""
+        with self.conn:
+            self.conn.execute("DELETE FROM entradas")
+            self.conn.execute("DELETE FROM arquivos")
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.conn.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+        return {'entradas': entries, 'bytes': self._size, 'limite_bytes': self.max_bytes}
+
+    def close(self):
+        self.conn.close()
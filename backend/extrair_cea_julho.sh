@@ -24,4 +24,7 @@ else
     echo ""
     echo "🔍 Ou execute diretamente:"
     echo "   python extrator_pdf.py 'caminho/para/Simulados-CEA-2024-JULHO.pdf'"
+    echo ""
+    echo "📚 Para vários simulados de uma vez (uma pasta ou um glob):"
+    echo "   python extrator_pdf.py 'caminho/para/simulados/' -o simulados_extraidos --jobs 4"
 fi
\ No newline at end of file
@@ -23,13 +23,33 @@ python extrator_pdf.py arquivo.pdf
 
 import os
 import re
+import io
+import heapq
 import json
+import pstats
+import cProfile
+import hashlib
 import csv
+import glob
+import time
 import argparse
+from bisect import bisect_right
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator, Iterable
+from contextlib import ExitStack
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import logging
 
+from cache_extracao import ExtractionCache, DEFAULT_MAX_BYTES
+from metricas_extracao import StageMetrics
+from buffer_pdf import shared_buffer, close_shared_buffers
+from imagens_saida import ImageSink, IMAGE_FORMATS
+
+# Versão do formato dos dados extraídos; mudar invalida o cache de extração
+EXTRACTOR_VERSION = "2"
+
 # Imports condicionais para bibliotecas de PDF
 try:
     import PyPDF2
@@ -74,11 +94,219 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def question_anchor(pattern: str) -> str:
+    """Reduz um padrão de questão à sua âncora (tudo antes do corpo `(.*?)`)"""
+    body_start = pattern.find('(.*?)')
+    return pattern if body_start < 0 else pattern[:body_start]
+
+
+@lru_cache(maxsize=32)
+def compile_question_scanner(patterns: Tuple[str, ...]) -> Tuple['re.Pattern', Dict[str, int]]:
+    """
+    Combina as âncoras de todos os padrões em uma única alternância.
+
+    Cada âncora vira um grupo nomeado `q<i>`; o primeiro grupo capturado dentro
+    dela é o número da questão. Retorna o regex compilado e o mapa
+    nome do grupo -> índice do grupo do número.
+    """
+    if not patterns:
+        raise ValueError("Nenhum padrão de questão configurado")
+    
+    alternatives = []
+    for i, pattern in enumerate(patterns):
+        anchor = question_anchor(pattern)
+        if re.compile(anchor).groups < 1:
+            raise ValueError(f"Padrão de questão sem grupo para o número: {pattern}")
+        alternatives.append(f"(?P<q{i}>{anchor})")
+    
+    scanner = re.compile('|'.join(alternatives), re.MULTILINE | re.IGNORECASE)
+    number_groups = {name: index + 1 for name, index in scanner.groupindex.items()}
+    return scanner, number_groups
+
+
+@lru_cache(maxsize=32)
+def compile_alternative_scanner(patterns: Tuple[str, ...]) -> 're.Pattern':
+    """
+    Combina as âncoras de `alternative_patterns` (ex.: 'a)', 'b.') em uma
+    alternância aplicada ao início de cada linha; o primeiro grupo capturado
+    de cada âncora é a letra.
+    """
+    if not patterns:
+        raise ValueError("Nenhum padrão de alternativa configurado")
+    
+    alternatives = []
+    for i, pattern in enumerate(patterns):
+        anchor = question_anchor(pattern)
+        if re.compile(anchor).groups < 1:
+            raise ValueError(f"Padrão de alternativa sem grupo para a letra: {pattern}")
+        alternatives.append(f"(?P<a{i}>{anchor})")
+    
+    return re.compile('|'.join(alternatives), re.IGNORECASE)
+
+
+# Marcador inserido entre as páginas na extração de texto
+PAGE_MARKER_RE = re.compile(r'^--- PÁGINA \d+ ---$')
+
+# Cabeçalho de cada gabarito dos simulados CEA; o número identifica o simulado
+SIMULADO_HEADER = r'CEA:\s*SIMULADO\s*\((?P<simulado>\d+)\)[:\s]*'
+DEFAULT_ANSWER_PAIR = r'(\d+)[:\.\-\s]*([a-eA-E])'
+MAX_QUESTION_NUMBER = 1000
+
+# O que pode sobrar em uma linha de gabarito além dos pares número/letra
+ANSWER_LINE_FILLER_RE = re.compile(r'(?:[\s,;|.:\-]|quest[aã]o)*', re.IGNORECASE)
+# Sequência só de letras após um cabeçalho ("Respostas: a b c d e")
+LETTER_SEQUENCE_RE = re.compile(r'[a-e](?:[\s,;\-]*[a-e]){2,}', re.IGNORECASE)
+
+
+@lru_cache(maxsize=32)
+def compile_answer_parser(patterns: Tuple[str, ...]) -> Tuple[Tuple['re.Pattern', ...], 're.Pattern']:
+    """
+    Separa `answer_patterns` em cabeçalhos e pares, já compilados.
+
+    Padrões com um grupo (ex.: 'Gabarito[:\\s]*(.+)') viram cabeçalhos (a parte
+    antes do grupo), junto com 'CEA: SIMULADO (n)'. Cada cabeçalho fica em um
+    regex próprio: começando por um literal, ele é localizado muito mais rápido
+    do que uma alternância sem distinção de maiúsculas. Padrões com dois grupos
+    (número e letra) viram o regex de pares usado dentro das regiões de gabarito.
+    """
+    headers, pairs = [], []
+    for pattern in patterns:
+        groups = re.compile(pattern).groups
+        if groups == 2:
+            pairs.append(f"(?:{pattern})")
+        elif groups == 1:
+            body_start = pattern.find('(.+)')
+            headers.append(re.compile(pattern if body_start < 0 else pattern[:body_start], re.IGNORECASE))
+        else:
+            raise ValueError(f"Padrão de gabarito deve ter 1 grupo (sequência) ou 2 (número e letra): {pattern}")
+    
+    headers.append(re.compile(SIMULADO_HEADER, re.IGNORECASE))
+    pair_re = re.compile('|'.join(pairs) or DEFAULT_ANSWER_PAIR, re.IGNORECASE)
+    return tuple(headers), pair_re
+
+
+def merge_answer_keys(answer_keys: Dict[int, Dict[int, str]]) -> Dict[int, str]:
+    """Junta os gabaritos por simulado em um único {questão: letra} (o último prevalece)"""
+    merged = {}
+    for answers in answer_keys.values():
+        merged.update(answers)
+    return merged
+
+
+# Páginas por faixa na leitura em streaming com vários processos
+STREAM_RANGE_PAGES = 8
+
+
+def split_page_ranges(total_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Divide as páginas em faixas contíguas [início, fim), algumas por processo"""
+    if total_pages <= 0:
+        return []
+    chunk = max(1, -(-total_pages // (workers * 4)))
+    return [(start, min(start + chunk, total_pages)) for start in range(0, total_pages, chunk)]
+
+
+def pdf_source(pdf_path: str, use_mmap: bool = False):
+    """Caminho do PDF ou, com mmap, um arquivo sobre o mapeamento do processo"""
+    return shared_buffer(pdf_path).reader() if use_mmap else pdf_path
+
+
+def open_pdf_file(pdf_path: str, use_mmap: bool = False):
+    """Arquivo binário do PDF: lido do mapeamento (mmap) ou aberto do disco"""
+    return shared_buffer(pdf_path).reader() if use_mmap else open(pdf_path, 'rb')
+
+
+def count_pages_pdfplumber(pdf_path: str, use_mmap: bool = False) -> int:
+    with pdfplumber.open(pdf_source(pdf_path, use_mmap)) as pdf:
+        return len(pdf.pages)
+
+
+def count_pages_pypdf2(pdf_path: str, use_mmap: bool = False) -> int:
+    with open_pdf_file(pdf_path, use_mmap) as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def page_chunk_pdfplumber(page_num: int, page) -> str:
+    """Texto de uma página com o marcador de página (vazio se a página não tem texto)"""
+    page_text = page.extract_text()
+    return f"\n--- PÁGINA {page_num + 1} ---\n{page_text}\n" if page_text else ""
+
+
+def release_pdfplumber_page(page):
+    """
+    Libera os objetos de uma página já lida. Sem isso o pdfplumber guarda o
+    layout e o mapa de texto de todas as páginas até fechar o PDF.
+    """
+    if hasattr(page, 'close'):  # pdfplumber >= 0.10: também limpa o cache do mapa de texto
+        page.close()
+    else:
+        page.flush_cache()
+
+
+def page_chunk_pypdf2(page_num: int, page) -> str:
+    return f"\n--- PÁGINA {page_num + 1} ---\n{page.extract_text()}\n"
+
+
+def extract_page_range_pdfplumber(pdf_path: str, start: int, end: Optional[int],
+                                  use_mmap: bool = False) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """
+    Extrai o texto das páginas [start, end) com pdfplumber.
+
+    Retorna (página, trecho já com o marcador de página) para cada página lida
+    (trecho vazio se a página não tem texto) e, se houver, a mensagem do erro
+    que interrompeu a faixa. Roda também dentro dos processos do pool; com
+    `use_mmap`, cada processo mapeia o mesmo arquivo e as páginas mapeadas
+    são compartilhadas pelo sistema, sem cópia.
+    """
+    parts = []
+    try:
+        with pdfplumber.open(pdf_source(pdf_path, use_mmap)) as pdf:
+            for page_num, page in enumerate(pdf.pages[start:end], start):
+                parts.append((page_num, page_chunk_pdfplumber(page_num, page)))
+                release_pdfplumber_page(page)
+    except Exception as e:
+        return parts, str(e)
+    
+    return parts, None
+
+
+def extract_page_range_pypdf2(pdf_path: str, start: int, end: Optional[int],
+                              use_mmap: bool = False) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """Extrai o texto das páginas [start, end) com PyPDF2 (mesmo contrato da versão pdfplumber)"""
+    parts = []
+    try:
+        with open_pdf_file(pdf_path, use_mmap) as file:
+            reader = PyPDF2.PdfReader(file)
+            for page_num, page in enumerate(reader.pages[start:end], start):
+                parts.append((page_num, page_chunk_pypdf2(page_num, page)))
+    except Exception as e:
+        return parts, str(e)
+    
+    return parts, None
+
+
 class PDFExtractor:
     """Classe principal para extração de conteúdo de PDFs"""
     
-    def __init__(self, pdf_path: str, output_dir: str = "extracted_content"):
+    def __init__(self, pdf_path: str, output_dir: str = "extracted_content", workers: int = 1,
+                 cache: Optional[ExtractionCache] = None, legacy_alternatives: bool = False,
+                 use_mmap: bool = False, image_workers: int = 4, image_format: Optional[str] = None,
+                 max_image_dimension: Optional[int] = None):
         self.pdf_path = Path(pdf_path)
+        self.workers = max(1, workers)
+        self.cache = cache
+        # Modo de compatibilidade: separa alternativas com os regex antigos
+        self.legacy_alternatives = legacy_alternatives
+        # Abre o PDF por mmap: texto e imagens leem o mesmo mapeamento
+        self.use_mmap = use_mmap
+        # Gravação das imagens em segundo plano (ver imagens_saida.py)
+        self.image_workers = max(1, image_workers)
+        self.image_format = image_format
+        self.max_image_dimension = max_image_dimension
+        self.image_stats: Optional[Dict] = None
+        # Imagens que o sink não conseguiu gravar: [{'arquivo': ..., 'erro': ...}]
+        self.image_errors: List[Dict] = []
+        self._pdf_hash: Optional[str] = None
+        self.metrics = StageMetrics()
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
@@ -86,6 +314,9 @@ class PDFExtractor:
         self.images_dir = self.output_dir / "images"
         self.images_dir.mkdir(exist_ok=True)
         
+        # Ocorrências de imagens por página (preenchido em extract_images_pymupdf)
+        self.image_manifest: List[Dict] = []
+        
         # Padrões regex para identificar questões
         self.question_patterns = [
             r'(?:^|\n)\s*(\d+)[\.\)]\s*(.*?)(?=(?:^|\n)\s*\d+[\.\)]|$)',  # 1. Questão...
@@ -108,6 +339,12 @@ class PDFExtractor:
             r'(\d+)[:\.\-\s]*([a-eA-E])',  # 1: a, 2: b, etc.
         ]
 
+    def pdf_hash(self) -> str:
+        """Hash do conteúdo do PDF (chave do cache de extração)"""
+        if self._pdf_hash is None:
+            self._pdf_hash = self.cache.file_hash(str(self.pdf_path))
+        return self._pdf_hash
+
     def check_dependencies(self) -> Dict[str, bool]:
         """Verifica quais bibliotecas estão disponíveis"""
         deps = {
@@ -126,48 +363,119 @@ class PDFExtractor:
         
         return deps
 
-    def extract_text_pypdf2(self) -> str:
+    def extract_text_pypdf2(self, workers: Optional[int] = None) -> str:
         """Extrai texto usando PyPDF2"""
         if not HAS_PYPDF2:
             raise ImportError("PyPDF2 não está instalado")
         
-        text = ""
-        try:
-            with open(self.pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(reader.pages):
-                    page_text = page.extract_text()
-                    text += f"\n--- PÁGINA {page_num + 1} ---\n{page_text}\n"
-        except Exception as e:
-            logger.error(f"Erro ao extrair texto com PyPDF2: {e}")
-        
-        return text
+        return self._extract_text_by_pages(
+            extract_page_range_pypdf2, count_pages_pypdf2, 'PyPDF2', workers
+        )
 
-    def extract_text_pdfplumber(self) -> str:
+    def extract_text_pdfplumber(self, workers: Optional[int] = None) -> str:
         """Extrai texto usando pdfplumber (melhor para layouts complexos)"""
         if not HAS_PDFPLUMBER:
             raise ImportError("pdfplumber não está instalado")
         
-        text = ""
-        try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- PÁGINA {page_num + 1} ---\n{page_text}\n"
-        except Exception as e:
-            logger.error(f"Erro ao extrair texto com pdfplumber: {e}")
+        return self._extract_text_by_pages(
+            extract_page_range_pdfplumber, count_pages_pdfplumber, 'pdfplumber', workers
+        )
+
+    def _extract_text_by_pages(self, range_worker, page_counter, library: str,
+                               workers: Optional[int] = None) -> str:
+        """
+        Extrai o texto por faixas de páginas, em série ou em um pool de processos.
+
+        As faixas são unidas na ordem das páginas; o resultado é idêntico ao da
+        extração em série, inclusive quando uma página falha no meio do caminho.
+        """
+        workers = self.workers if workers is None else workers
+        pdf_path = str(self.pdf_path)
+        kind = f"texto:{library}"
         
-        return text
+        if self.cache is not None:
+            cached = self._cached_text_pages(kind)
+            if cached is not None:
+                logger.info(f"Texto de {len(cached)} páginas lido do cache")
+                return "".join(cached)
+        
+        if workers <= 1:
+            results = [range_worker(pdf_path, 0, None, self.use_mmap)]
+        else:
+            try:
+                total_pages = page_counter(pdf_path, self.use_mmap)
+            except Exception as e:
+                logger.error(f"Erro ao extrair texto com {library}: {e}")
+                return ""
+            
+            ranges = split_page_ranges(total_pages, workers)
+            logger.info(f"Extraindo {total_pages} páginas em {len(ranges)} faixas com {workers} processos")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    range_worker,
+                    [pdf_path] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                    [self.use_mmap] * len(ranges),
+                ))
+        
+        pages = []
+        failed = False
+        for parts, error in results:
+            pages.extend(parts)
+            if error:
+                logger.error(f"Erro ao extrair texto com {library}: {error}")
+                failed = True
+                break
+        
+        # Só páginas de uma extração completa vão para o cache
+        if self.cache is not None and not failed:
+            self.cache.put_many(self.pdf_hash(), kind, [(page_num, chunk.encode('utf-8')) for page_num, chunk in pages])
+            self.cache.put_json(self.pdf_hash(), -1, kind, len(pages))
+        
+        return "".join(chunk for _, chunk in pages)
+
+    def _cached_text_pages(self, kind: str) -> Optional[List[str]]:
+        """Trechos de texto de todas as páginas, se o cache tiver o documento completo"""
+        total_pages = self.cache.get_json(self.pdf_hash(), -1, kind)
+        if total_pages is None:
+            return None
+        
+        pages = self.cache.get_pages(self.pdf_hash(), kind)
+        if len(pages) != total_pages:
+            return None
+        
+        return [pages[page_num].decode('utf-8') for page_num in range(total_pages)]
 
     def extract_images_pymupdf(self) -> List[str]:
         """Extrai imagens usando PyMuPDF"""
         if not HAS_PYMUPDF:
             raise ImportError("PyMuPDF não está instalado")
         
-        image_paths = []
+        self.image_stats = None
+        self.image_errors = []
+        if self.cache is not None:
+            image_paths = self._restore_cached_images()
+            if image_paths is not None:
+                logger.info(f"{len(image_paths)} imagens restauradas do cache")
+                return image_paths
+        
+        self.image_manifest = []
+        failed = False
+        
+        # Cada imagem única é decodificada e salva uma só vez: primeiro por xref,
+        # depois pelo hash do conteúdo (mesma imagem embutida em xrefs diferentes)
+        saved_by_xref: Dict[int, Optional[Tuple[str, str]]] = {}
+        saved_by_hash: Dict[str, str] = {}
+        # Codificação e escrita ficam com o pool do sink; este laço só decodifica
+        sink = ImageSink(workers=self.image_workers, image_format=self.image_format,
+                         max_dimension=self.max_image_dimension, collect_output=self.cache is not None)
+        pages_by_path: Dict[str, int] = {}
         try:
-            doc = fitz.open(self.pdf_path)
+            if self.use_mmap:
+                doc = fitz.open(stream=shared_buffer(str(self.pdf_path)).view, filetype="pdf")
+            else:
+                doc = fitz.open(self.pdf_path)
             
             for page_num in range(len(doc)):
                 page = doc[page_num]
@@ -175,23 +483,151 @@ class PDFExtractor:
                 
                 for img_index, img in enumerate(image_list):
                     xref = img[0]
-                    pix = fitz.Pixmap(doc, xref)
                     
-                    if pix.n - pix.alpha < 4:  # GRAY ou RGB
+                    if xref not in saved_by_xref:
                         img_name = f"page_{page_num + 1}_img_{img_index + 1}.png"
-                        img_path = self.images_dir / img_name
-                        pix.save(str(img_path))
-                        image_paths.append(str(img_path))
-                        logger.info(f"Imagem extraída: {img_name}")
+                        saved_by_xref[xref] = self._save_unique_image(
+                            doc, page_num, xref, img[1], img_name, saved_by_hash, sink
+                        )
+                        if saved_by_xref[xref] is not None:
+                            pages_by_path.setdefault(saved_by_xref[xref][0], page_num)
+                        self._cache_written_images(sink, pages_by_path)
+                    
+                    saved = saved_by_xref[xref]
+                    if saved is None:
+                        continue
                     
-                    pix = None
+                    img_path, digest = saved
+                    self.image_manifest.append({
+                        'pagina': page_num + 1,
+                        'indice': img_index + 1,
+                        'xref': xref,
+                        'arquivo': img_path,
+                        'hash': digest
+                    })
             
             doc.close()
         except Exception as e:
             logger.error(f"Erro ao extrair imagens com PyMuPDF: {e}")
+            failed = True
+        finally:
+            self.image_stats = sink.close()
+            self._cache_written_images(sink, pages_by_path)
+        
+        failed = failed or bool(sink.errors)
+        # Só entra no resultado e no manifesto o que foi de fato gravado
+        self.image_errors = [{'arquivo': target, 'erro': error} for target, error in sink.errors]
+        not_written = sink.failed_paths()
+        if not_written:
+            self.image_manifest = [entry for entry in self.image_manifest if entry['arquivo'] not in not_written]
+            logger.warning(f"{len(not_written)} imagens não foram gravadas (ver erros_imagens)")
+        logger.info(
+            f"Gravação de imagens: {self.image_stats['imagens']} em {self.image_stats['segundos']:.2f}s "
+            f"({self.image_stats['imagens_por_segundo'] or 0:.0f} imagens/s), "
+            f"{self.image_stats['bytes_economizados'] / 1024:.0f} KB economizados"
+        )
+        
+        image_paths = [path for path in saved_by_hash.values() if path not in not_written]
+        self._write_image_manifest()
+        
+        if self.cache is not None and not failed:
+            self.cache.put_json(self.pdf_hash(), -1, self._image_cache_kind('imagens:pymupdf'), [
+                dict(entry, arquivo=Path(entry['arquivo']).name) for entry in self.image_manifest
+            ])
+        
+        manifest_file = self.images_dir / "manifesto.json"
+        
+        logger.info(
+            f"{len(image_paths)} imagens únicas para {len(self.image_manifest)} ocorrências "
+            f"(manifesto em {manifest_file})"
+        )
         
         return image_paths
 
+    def _image_cache_kind(self, kind: str) -> str:
+        """Tipo no cache; imagens recodificadas não se misturam com as originais"""
+        if self.image_format is None and self.max_image_dimension is None:
+            return kind
+        return f"{kind}:{self.image_format or 'png'}:{self.max_image_dimension or 0}"
+
+    def _cache_written_images(self, sink: ImageSink, pages_by_path: Dict[str, int]):
+        """Guarda no cache (nesta thread) as imagens que o sink já gravou"""
+        for img_path, data in sink.drain():
+            img_name = Path(img_path).name
+            self.cache.put(self.pdf_hash(), pages_by_path[img_path], self._image_cache_kind(f"png:{img_name}"), data)
+
+    def _write_image_manifest(self):
+        with open(self.images_dir / "manifesto.json", 'w', encoding='utf-8') as f:
+            json.dump(self.image_manifest, f, ensure_ascii=False, indent=2)
+
+    def _restore_cached_images(self) -> Optional[List[str]]:
+        """Regrava as imagens a partir do cache, sem abrir o PDF; None se faltar algo"""
+        manifest = self.cache.get_json(self.pdf_hash(), -1, self._image_cache_kind('imagens:pymupdf'))
+        if manifest is None:
+            return None
+        
+        image_paths = []
+        restored = set()
+        for entry in manifest:
+            img_name = entry['arquivo']
+            if img_name in restored:
+                continue
+            png = self.cache.get(self.pdf_hash(), entry['pagina'] - 1, self._image_cache_kind(f"png:{img_name}"))
+            if png is None:  # removida do cache
+                return None
+            img_path = self.images_dir / img_name
+            img_path.write_bytes(png)
+            image_paths.append(str(img_path))
+            restored.add(img_name)
+        
+        self.image_manifest = [
+            dict(entry, arquivo=str(self.images_dir / entry['arquivo'])) for entry in manifest
+        ]
+        self._write_image_manifest()
+        
+        return image_paths
+
+    def _save_unique_image(self, doc, page_num: int, xref: int, smask: int, img_name: str,
+                           saved_by_hash: Dict[str, str], sink: ImageSink) -> Optional[Tuple[str, str]]:
+        """
+        Envia a imagem do xref para o sink se o seu conteúdo ainda não foi salvo.
+
+        Retorna (caminho, hash) do arquivo que representa a imagem, ou None se
+        ela não puder ser salva como PNG (ex.: CMYK).
+        """
+        raw = doc.xref_stream_raw(xref)
+        pix = None
+        if raw is None:
+            pix = fitz.Pixmap(doc, xref)
+            raw = pix.samples
+        
+        hasher = hashlib.sha256(raw)
+        if smask:  # a máscara de transparência faz parte da imagem final
+            hasher.update(doc.xref_stream_raw(smask) or b"")
+        digest = hasher.hexdigest()
+        if digest in saved_by_hash:
+            logger.debug(f"Imagem repetida (xref {xref}) reaproveitada: {saved_by_hash[digest]}")
+            return saved_by_hash[digest], digest
+        
+        if pix is None:
+            pix = fitz.Pixmap(doc, xref)
+        
+        if pix.n - pix.alpha >= 4:  # apenas GRAY ou RGB
+            return None
+        
+        img_path = str(self.images_dir / img_name)
+        modes = {1: ('L', 'LA'), 3: ('RGB', 'RGBA')}.get(pix.n - pix.alpha)
+        if HAS_PIL and modes:
+            # Pixels crus: a codificação acontece nas threads do sink
+            pixels = (modes[pix.alpha], pix.width, pix.height, pix.samples)
+            img_path = sink.submit(img_path, pixels=pixels)
+        else:
+            img_path = sink.submit(img_path, data=pix.tobytes("png"))
+        saved_by_hash[digest] = img_path
+        logger.info(f"Imagem extraída: {img_name}")
+        
+        return img_path, digest
+
     def extract_images_pdfplumber(self) -> List[str]:
         """Extrai imagens usando pdfplumber"""
         if not HAS_PDFPLUMBER:
@@ -199,7 +635,7 @@ class PDFExtractor:
         
         image_paths = []
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
+            with pdfplumber.open(pdf_source(str(self.pdf_path), self.use_mmap)) as pdf:
                 for page_num, page in enumerate(pdf.pages):
                     if hasattr(page, 'images'):
                         for img_index, img in enumerate(page.images):
@@ -211,47 +647,280 @@ class PDFExtractor:
         
         return image_paths
 
-    def parse_questions(self, text: str) -> List[Dict]:
-        """Extrai questões do texto usando regex"""
-        questions = []
+    def question_scanner(self) -> Tuple['re.Pattern', Dict[str, int]]:
+        """Retorna o scanner combinado das âncoras de `question_patterns`"""
+        return compile_question_scanner(tuple(self.question_patterns))
+
+    def iter_question_segments(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Percorre o texto uma única vez e gera (número, texto) entre âncoras consecutivas"""
+        return self.iter_chunk_segments([text])
+
+    def iter_chunk_segments(self, chunks: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """
+        Como iter_question_segments, mas sobre o texto em trechos (ex.: páginas).
+
+        Cada segmento sai assim que a âncora seguinte aparece; do texto já lido,
+        só o segmento em aberto fica em memória. Os trechos devem terminar em
+        fim de linha, como os de iter_page_text.
+        """
+        scanner, number_groups = self.question_scanner()
         
-        for pattern in self.question_patterns:
-            matches = re.finditer(pattern, text, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+        buffer = ""
+        current_num = None
+        body_start = 0
+        for chunk in chunks:
+            # Retoma a busca no fim do trecho anterior (uma âncora pode começar no '\n')
+            scan_from = max(body_start, len(buffer) - 1, 0)
+            buffer += chunk
+            for match in scanner.finditer(buffer, scan_from):
+                if current_num is not None:
+                    yield current_num, buffer[body_start:match.start()].strip()
+                current_num = int(match.group(number_groups[match.lastgroup]))
+                body_start = match.end()
             
-            for match in matches:
-                question_num = match.group(1)
-                question_text = match.group(2).strip()
-                
-                # Valida se é realmente uma questão (não apenas um número solto)
-                if len(question_text) < 10:  # Questões muito curtas provavelmente são falsos positivos
-                    continue
-                
-                # Extrai alternativas
-                alternatives = self.extract_alternatives(question_text)
-                
-                # Remove alternativas do texto da questão
-                clean_question = self.clean_question_text(question_text)
-                
-                question_data = {
-                    'numero': int(question_num),
-                    'enunciado': clean_question,
-                    'alternativas': alternatives,
-                    'tipo': 'multipla_escolha' if alternatives else 'dissertativa',
-                    'tema': '',  # A ser preenchido manualmente
-                    'dificuldade': 'media',  # A ser preenchido manualmente
-                    'imagens': []  # A ser associado manualmente
-                }
+            # Descarta o texto já consumido
+            keep = body_start if current_num is not None else max(buffer.rfind('\n'), 0)
+            buffer = buffer[keep:]
+            body_start = max(body_start - keep, 0)
+        
+        if current_num is not None:
+            yield current_num, buffer[body_start:].strip()
+
+    def build_question(self, question_num: int, question_text: str) -> Dict:
+        """Monta o dicionário de uma questão a partir do seu texto bruto"""
+        if self.legacy_alternatives:
+            # Extrai alternativas e as remove do texto da questão
+            alternatives = self.extract_alternatives(question_text)
+            clean_question = self.clean_question_text(question_text)
+        else:
+            clean_question, alternatives = self.split_question(question_text)
+        
+        return {
+            'numero': question_num,
+            'enunciado': clean_question,
+            'alternativas': alternatives,
+            'tipo': 'multipla_escolha' if alternatives else 'dissertativa',
+            'tema': '',  # A ser preenchido manualmente
+            'dificuldade': 'media',  # A ser preenchido manualmente
+            'imagens': []  # A ser associado manualmente
+        }
+
+    def iter_parsed_questions(self, text: str) -> Iterator[Dict]:
+        """Gera as questões na ordem em que aparecem no texto, sem duplicatas"""
+        return self._unique_questions(self.iter_question_segments(text))
+
+    def iter_questions(self, pages: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """
+        Gera as questões direto do PDF, lendo as páginas sob demanda.
+
+        O PDF é aberto uma vez e cada página só é lida quando a questão seguinte
+        é pedida; interromper o consumo (ex.: islice para uma prévia) custa só
+        as páginas já lidas. `pages` são índices a partir de 0 (ex.: range(10)).
+        """
+        chunks = (chunk for _, chunk in self.iter_page_text(pages))
+        return self._unique_questions(self.iter_chunk_segments(chunks))
+
+    def iter_page_text(self, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Gera (página, trecho com o marcador de página) sob demanda.
+
+        Usa pdfplumber (ou PyPDF2) com o mesmo formato da extração completa.
+        Páginas presentes no cache de extração não abrem o PDF; as lidas do
+        PDF entram no cache.
+        """
+        if HAS_PDFPLUMBER:
+            library, page_chunk = 'pdfplumber', page_chunk_pdfplumber
+        elif HAS_PYPDF2:
+            library, page_chunk = 'PyPDF2', page_chunk_pypdf2
+        else:
+            raise ImportError("Nenhuma biblioteca de PDF disponível. Instale pdfplumber ou PyPDF2")
+        kind = f"texto:{library}"
+        
+        with ExitStack() as stack:
+            doc_pages = None
+            
+            def open_pages():
+                if library == 'pdfplumber':
+                    return stack.enter_context(pdfplumber.open(pdf_source(str(self.pdf_path), self.use_mmap))).pages
+                return PyPDF2.PdfReader(stack.enter_context(open_pdf_file(str(self.pdf_path), self.use_mmap))).pages
+            
+            if pages is None:
+                total = self.cache.get_json(self.pdf_hash(), -1, kind) if self.cache is not None else None
+                if total is None:
+                    doc_pages = open_pages()
+                    total = len(doc_pages)
+                pages = range(total)
+            
+            for page_num in pages:
+                if self.cache is not None:
+                    data = self.cache.get(self.pdf_hash(), page_num, kind)
+                    if data is not None:
+                        yield page_num, data.decode('utf-8')
+                        continue
                 
-                questions.append(question_data)
+                if doc_pages is None:
+                    doc_pages = open_pages()
+                page = doc_pages[page_num]
+                chunk = page_chunk(page_num, page)
+                if library == 'pdfplumber':
+                    release_pdfplumber_page(page)
+                if self.cache is not None:
+                    self.cache.put(self.pdf_hash(), page_num, kind, chunk.encode('utf-8'))
+                yield page_num, chunk
+
+    def iter_document_text(self) -> Iterator[Tuple[int, str]]:
+        """
+        Gera (página, trecho) de todas as páginas, em ordem, para a extração em streaming.
+
+        Com `workers` > 1, as páginas fora do cache são lidas em faixas de até
+        STREAM_RANGE_PAGES por um pool de processos, com no máximo duas faixas
+        por processo em andamento: a memória não cresce com o tamanho do PDF.
+        Como na extração completa, um erro de leitura é registrado no log e
+        encerra o texto na última página lida.
+        """
+        if HAS_PDFPLUMBER:
+            library, range_worker, page_counter = 'pdfplumber', extract_page_range_pdfplumber, count_pages_pdfplumber
+        elif HAS_PYPDF2:
+            library, range_worker, page_counter = 'PyPDF2', extract_page_range_pypdf2, count_pages_pypdf2
+        else:
+            raise ImportError("Nenhuma biblioteca de PDF disponível. Instale pdfplumber ou PyPDF2")
+        kind = f"texto:{library}"
+        pdf_path = str(self.pdf_path)
+
+        # Documento inteiro no cache: lido página a página, sem abrir o PDF
+        cached = self.cache is not None and self.cache.get_json(self.pdf_hash(), -1, kind) is not None
+        if self.workers <= 1 or cached:
+            total_pages = 0
+            try:
+                for page_num, chunk in self.iter_page_text():
+                    total_pages += 1
+                    yield page_num, chunk
+            except Exception as e:
+                logger.error(f"Erro ao extrair texto com {library}: {e}")
+                return
+            # Só um documento lido por completo entra no cache como completo
+            if self.cache is not None and not cached:
+                self.cache.put_json(self.pdf_hash(), -1, kind, total_pages)
+            return
+
+        try:
+            total_pages = page_counter(pdf_path, self.use_mmap)
+        except Exception as e:
+            logger.error(f"Erro ao extrair texto com {library}: {e}")
+            return
+
+        step = min(STREAM_RANGE_PAGES, max(1, -(-total_pages // (self.workers * 4))))
+        ranges = iter([(start, min(start + step, total_pages)) for start in range(0, total_pages, step)])
+        logger.info(f"Extraindo {total_pages} páginas em faixas de {step} com {self.workers} processos")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+
+            def submit_next():
+                page_range = next(ranges, None)
+                if page_range is not None:
+                    pending.append(pool.submit(range_worker, pdf_path, *page_range, self.use_mmap))
+
+            for _ in range(self.workers * 2):
+                submit_next()
+            try:
+                while pending:
+                    parts, error = pending.popleft().result()
+                    submit_next()
+                    if self.cache is not None:
+                        self.cache.put_many(self.pdf_hash(), kind, [(page_num, chunk.encode('utf-8')) for page_num, chunk in parts])
+                    yield from parts
+                    if error:
+                        logger.error(f"Erro ao extrair texto com {library}: {error}")
+                        return
+            finally:
+                # Parada antecipada (erro ou consumidor que desistiu): não espera as faixas restantes
+                for future in pending:
+                    future.cancel()
+
+        if self.cache is not None:
+            self.cache.put_json(self.pdf_hash(), -1, kind, total_pages)
+
+    def _unique_questions(self, segments: Iterable[Tuple[int, str]]) -> Iterator[Dict]:
+        """Monta as questões dos segmentos, ignorando números repetidos e falsos positivos"""
+        seen_numbers = set()
         
-        # Remove duplicatas e ordena
-        questions = self.remove_duplicate_questions(questions)
+        for question_num, question_text in segments:
+            # A primeira ocorrência de cada número prevalece
+            if question_num in seen_numbers:
+                continue
+            
+            # Valida se é realmente uma questão (não apenas um número solto)
+            if len(question_text) < 10:  # Questões muito curtas provavelmente são falsos positivos
+                continue
+            
+            seen_numbers.add(question_num)
+            yield self.build_question(question_num, question_text)
+
+    def parse_questions(self, text: str) -> List[Dict]:
+        """Extrai questões do texto em uma única varredura pelas âncoras"""
+        questions = list(self.iter_parsed_questions(text))
         questions.sort(key=lambda x: x['numero'])
         
         return questions
 
+    def split_question(self, question_text: str) -> Tuple[str, List[Dict]]:
+        """
+        Separa enunciado e alternativas percorrendo as linhas uma única vez.
+
+        Uma linha que começa com uma âncora de `alternative_patterns` abre uma
+        alternativa; as linhas seguintes continuam a alternativa até a próxima
+        âncora ou uma linha em branco. A primeira alternativa precisa ser 'a' e
+        letras repetidas são tratadas como texto comum. O texto antes das
+        alternativas forma o enunciado; o que vier depois do bloco da última
+        alternativa (ex.: o gabarito no fim do caderno, que cai no segmento da
+        última questão) é descartado, assim como os marcadores de página.
+        """
+        scanner = compile_alternative_scanner(tuple(self.alternative_patterns))
+        
+        stem_lines = []
+        alternatives = {}
+        current = None  # linhas da alternativa aberta
+        gap = False
+        
+        for line in question_text.split('\n'):
+            stripped = line.strip()
+            if not stripped:
+                gap = True
+                stem_lines.append('')
+                continue
+            if PAGE_MARKER_RE.match(stripped):
+                # Quebra de página não encerra a alternativa
+                gap = False
+                continue
+            
+            match = scanner.match(line)
+            if match:
+                letter = match.group(scanner.groupindex[match.lastgroup] + 1).lower()
+                if letter not in alternatives and (alternatives or letter == 'a'):
+                    current = alternatives[letter] = [line[match.end():].strip()]
+                    gap = False
+                    continue
+            
+            if current is not None and not gap:
+                current.append(stripped)
+            else:
+                current = None
+                if not alternatives:
+                    stem_lines.append(line)
+            gap = False
+        
+        stem = re.sub(r'\n\s*\n', '\n\n', '\n'.join(stem_lines)).strip()
+        result = []
+        for letter in sorted(alternatives):
+            alt_text = ' '.join(' '.join(alternatives[letter]).split())
+            if alt_text:
+                result.append({'letra': letter, 'texto': alt_text})
+        
+        return stem, result
+
     def extract_alternatives(self, question_text: str) -> List[Dict]:
-        """Extrai alternativas de uma questão"""
+        """Extrai alternativas de uma questão (modo de compatibilidade)"""
         alternatives = []
         found_letters = set()
         
@@ -279,7 +948,7 @@ class PDFExtractor:
         return alternatives
 
     def clean_question_text(self, text: str) -> str:
-        """Remove alternativas do texto da questão"""
+        """Remove alternativas do texto da questão (modo de compatibilidade)"""
         # Remove alternativas do texto
         for pattern in self.alternative_patterns:
             text = re.sub(pattern, '', text, flags=re.MULTILINE | re.IGNORECASE)
@@ -303,101 +972,181 @@ class PDFExtractor:
         return unique_questions
 
     def extract_answers(self, text: str) -> Dict[int, str]:
-        """Extrai gabarito do texto"""
-        answers = {}
+        """Extrai gabarito do texto, juntando os gabaritos de todos os simulados"""
+        return merge_answer_keys(self.extract_answer_keys(text))
+
+    def extract_answer_keys(self, text: str) -> Dict[int, Dict[int, str]]:
+        """
+        Extrai os gabaritos por simulado: {simulado: {questão: letra}}.
+
+        Só lê as regiões de gabarito: uma região começa em um cabeçalho
+        ('GABARITO', 'Respostas', 'CEA: SIMULADO (n)' ou outro padrão de um
+        grupo em `answer_patterns`) e segue pelas linhas que contêm apenas
+        pares número/letra, parando na primeira linha com outro conteúdo.
+        Sem cabeçalho 'CEA: SIMULADO (n)', as respostas ficam no simulado 1.
+        """
+        header_res, pair_re = compile_answer_parser(tuple(self.answer_patterns))
         
-        for pattern in self.answer_patterns:
-            matches = re.finditer(pattern, text, re.MULTILINE | re.IGNORECASE)
+        answer_keys: Dict[int, Dict[int, str]] = {}
+        simulado = 1
+        
+        # Cabeçalhos em ordem de posição; só as linhas de cada região são lidas
+        headers = heapq.merge(*(h.finditer(text) for h in header_res), key=lambda m: m.start())
+        for header in headers:
+            if 'simulado' in header.re.groupindex:
+                simulado = int(header.group('simulado'))
             
-            for match in matches:
-                if len(match.groups()) == 2:
-                    # Padrão: número: letra
-                    try:
-                        question_num = int(match.group(1))
-                        answer_letter = match.group(2).lower()
-                        
-                        # Valida se é uma resposta válida (a-e)
-                        if answer_letter in 'abcde' and 1 <= question_num <= 1000:
-                            answers[question_num] = answer_letter
-                    except ValueError:
-                        continue
-                else:
-                    # Padrão: sequência de respostas
-                    answer_text = match.group(1)
-                    parsed_answers = self.parse_answer_sequence(answer_text)
-                    
-                    # Valida respostas antes de adicionar
-                    for num, letter in parsed_answers.items():
-                        if letter in 'abcde' and 1 <= num <= 1000:
-                            answers[num] = letter
+            line_end = text.find('\n', header.end())
+            line_end = len(text) if line_end < 0 else line_end
+            rest = text[header.end():line_end]
+            found = self.parse_answer_sequence(rest)
+            # Um cabeçalho no meio de uma frase não abre região
+            if not found and rest.strip():
+                continue
+            region = answer_keys.setdefault(simulado, {})
+            region.update(found)
+            
+            while line_end < len(text):
+                line_start = line_end + 1
+                line_end = text.find('\n', line_start)
+                line_end = len(text) if line_end < 0 else line_end
+                line = text[line_start:line_end]
+                stripped = line.strip()
+                if not stripped or PAGE_MARKER_RE.match(stripped):
+                    continue
+                # Outro cabeçalho é tratado na próxima volta
+                if any(h.search(line) for h in header_res):
+                    break
+                found = self._answer_line(line, pair_re)
+                if found is None:
+                    break
+                region.update(found)
         
+        return {sim: answers for sim, answers in answer_keys.items() if answers}
+
+    def answer_key_lines(self, chunk: str) -> List[str]:
+        """
+        Linhas de um trecho que podem fazer parte de uma região de gabarito.
+
+        Permite extrair o gabarito de um documento lido em trechos sem guardar
+        o texto inteiro: ficam as linhas alcançadas por um cabeçalho (inclusive
+        a linha onde o cabeçalho continua), as linhas só com pares número/letra
+        e os marcadores de página. Cada sequência de outras linhas com conteúdo
+        vira uma linha '#', que encerra uma região como a original encerraria.
+        Com trechos de página (como os de iter_page_text), extract_answer_keys
+        sobre as linhas juntadas com '\\n' dá o mesmo resultado que sobre o
+        texto completo.
+        """
+        header_res, pair_re = compile_answer_parser(tuple(self.answer_patterns))
+        line_starts = [0] + [m.end() for m in re.finditer('\n', chunk)]
+
+        header_lines = set()
+        for header_re in header_res:
+            for match in header_re.finditer(chunk):
+                first = bisect_right(line_starts, match.start()) - 1
+                last = bisect_right(line_starts, match.end()) - 1
+                header_lines.update(range(first, last + 1))
+
+        lines = []
+        for i, line in enumerate(chunk.split('\n')):
+            stripped = line.strip()
+            if (i in header_lines or PAGE_MARKER_RE.match(stripped)
+                    or (stripped and self._answer_line(line, pair_re) is not None)):
+                lines.append(line)
+            elif stripped and (not lines or lines[-1] != '#'):
+                lines.append('#')
+        return lines
+
+    def _answer_line(self, line: str, pair_re: 're.Pattern') -> Optional[Dict[int, str]]:
+        """Pares de uma linha que só contém gabarito; None se a linha tiver outro conteúdo"""
+        found = self._answer_pairs(line, pair_re)
+        if not found or not ANSWER_LINE_FILLER_RE.fullmatch(pair_re.sub(' ', line)):
+            return None
+        return found
+
+    @staticmethod
+    def _answer_pairs(text: str, pair_re: 're.Pattern') -> Dict[int, str]:
+        answers = {}
+        for match in pair_re.finditer(text):
+            number, letter = [g for g in match.groups() if g is not None][:2]
+            number, letter = int(number), letter.lower()
+            if letter in 'abcde' and 1 <= number <= MAX_QUESTION_NUMBER:
+                answers[number] = letter
         return answers
 
     def parse_answer_sequence(self, answer_text: str) -> Dict[int, str]:
-        """Analisa uma sequência de respostas (ex: 1a 2b 3c)"""
-        answers = {}
+        """Analisa uma sequência de respostas (ex: 1a 2b 3c, 1: a, ou só 'a b c d e')"""
+        _, pair_re = compile_answer_parser(tuple(self.answer_patterns))
+        answers = self._answer_pairs(answer_text, pair_re)
         
-        # Padrões para sequências de respostas
-        patterns = [
-            r'(\d+)\s*([a-eA-E])',  # 1a, 2b, 3c
-            r'(\d+)[:\.\-\s]+([a-eA-E])',  # 1:a, 2.b, 3-c, 4 d
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, answer_text)
-            for match in matches:
-                try:
-                    question_num = int(match.group(1))
-                    answer_letter = match.group(2).lower()
-                    
-                    # Valida se é uma resposta válida
-                    if answer_letter in 'abcde' and 1 <= question_num <= 100:
-                        answers[question_num] = answer_letter
-                except ValueError:
-                    continue
+        if not answers and LETTER_SEQUENCE_RE.fullmatch(answer_text.strip()):
+            letters = [ch.lower() for ch in answer_text if ch.isalpha()]
+            answers = {i: letter for i, letter in enumerate(letters, 1)}
         
         return answers
 
-    def extract_all(self) -> Dict:
-        """Executa extração completa do PDF"""
-        logger.info(f"Iniciando extração de: {self.pdf_path}")
-        
-        # Verifica dependências
-        deps = self.check_dependencies()
-        
-        # Extrai texto
-        text = ""
+    def _extract_text(self, deps: Dict[str, bool]) -> str:
+        """Extrai o texto com a melhor biblioteca disponível"""
         if deps['pdfplumber']:
             logger.info("Extraindo texto com pdfplumber...")
-            text = self.extract_text_pdfplumber()
+            return self.extract_text_pdfplumber()
         elif deps['PyPDF2']:
             logger.info("Extraindo texto com PyPDF2...")
-            text = self.extract_text_pypdf2()
+            return self.extract_text_pypdf2()
         else:
             raise ImportError("Nenhuma biblioteca de PDF disponível. Instale pdfplumber ou PyPDF2")
-        
-        # Salva texto extraído
+
+    def _save_text(self, text: str):
+        """Salva o texto extraído ao lado dos resultados"""
         text_file = self.output_dir / "texto_extraido.txt"
         with open(text_file, 'w', encoding='utf-8') as f:
             f.write(text)
         logger.info(f"Texto salvo em: {text_file}")
-        
-        # Extrai imagens
-        image_paths = []
+
+    def _extract_images(self, deps: Dict[str, bool]) -> List[str]:
+        """Extrai (ou detecta) imagens com a biblioteca disponível"""
         if deps['PyMuPDF']:
             logger.info("Extraindo imagens com PyMuPDF...")
-            image_paths = self.extract_images_pymupdf()
+            return self.extract_images_pymupdf()
         elif deps['pdfplumber']:
             logger.info("Detectando imagens com pdfplumber...")
-            image_paths = self.extract_images_pdfplumber()
+            return self.extract_images_pdfplumber()
+        return []
+
+    def extract_all(self) -> Dict:
+        """Executa extração completa do PDF"""
+        logger.info(f"Iniciando extração de: {self.pdf_path}")
+        self.metrics = StageMetrics()
+        
+        # Verifica dependências
+        deps = self.check_dependencies()
+        
+        # Extrai e salva texto
+        with self.metrics.stage('texto') as etapa:
+            text = self._extract_text(deps)
+            etapa['itens'] = len(text)
+        with self.metrics.stage('salvar:texto'):
+            self._save_text(text)
+        
+        # Extrai imagens
+        with self.metrics.stage('imagens') as etapa:
+            image_paths = self._extract_images(deps)
+            etapa['itens'] = len(image_paths)
+            if self.image_stats:
+                etapa['gravacao'] = self.image_stats
         
         # Extrai questões
         logger.info("Extraindo questões...")
-        questions = self.parse_questions(text)
+        with self.metrics.stage('questoes') as etapa:
+            questions = self.parse_questions(text)
+            etapa['itens'] = len(questions)
         
         # Extrai gabarito
         logger.info("Extraindo gabarito...")
-        answers = self.extract_answers(text)
+        with self.metrics.stage('gabarito') as etapa:
+            answer_keys = self.extract_answer_keys(text)
+            answers = merge_answer_keys(answer_keys)
+            etapa['itens'] = len(answers)
         
         # Combina questões com gabarito
         for question in questions:
@@ -411,16 +1160,157 @@ class PDFExtractor:
             'total_imagens': len(image_paths),
             'questoes': questions,
             'gabarito': answers,
+            'gabaritos': answer_keys,
             'imagens': image_paths,
-            'texto_completo': text
+            'manifesto_imagens': self.image_manifest,
+            'erros_imagens': self.image_errors,
+            'texto_completo': text,
+            'metricas': self.metrics.as_dict()
         }
         
         return result
 
-    def save_results(self, results: Dict, format_type: str = 'json'):
+    def extract_to_jsonl(self, include_full_text: bool = True) -> Dict:
+        """
+        Executa a extração em streaming, gravando as questões em JSONL.
+
+        As páginas são lidas uma a uma (iter_document_text) e cada questão vira
+        uma linha de `questoes_extraidas.jsonl`, descarregada assim que a âncora
+        seguinte aparece; o texto vai página a página para `texto_extraido.txt`
+        (só se `include_full_text` for verdadeiro). Do texto ficam em memória só
+        o segmento em aberto e as linhas candidatas a gabarito (answer_key_lines),
+        então a memória não cresce com o PDF e o JSONL pode ser lido enquanto a
+        extração anda. As linhas ficam na ordem do PDF, e não ordenadas por
+        `numero` como no JSON.
+
+        O gabarito costuma estar no fim do caderno: depois da última página, o
+        `gabarito` de cada questão entra em uma passada que regrava o JSONL
+        linha a linha e substitui o arquivo de uma vez. As imagens são extraídas
+        depois das questões. Retorna um resumo sem as questões.
+        """
+        logger.info(f"Iniciando extração (JSONL) de: {self.pdf_path}")
+        self.metrics = StageMetrics()
+        
+        deps = self.check_dependencies()
+        
+        jsonl_file = self.output_dir / "questoes_extraidas.jsonl"
+        text_file = self.output_dir / "texto_extraido.txt"
+        answer_lines: List[str] = []
+        
+        # Texto, parser e gravação andam juntos, página a página, em uma única etapa
+        logger.info("Extraindo texto e questões...")
+        with self.metrics.stage('texto+questoes+salvar:jsonl') as etapa, ExitStack() as stack:
+            text_out = stack.enter_context(open(text_file, 'w', encoding='utf-8')) if include_full_text else None
+            etapa['paginas'] = 0
+            
+            def chunks():
+                for _page_num, chunk in self.iter_document_text():
+                    if text_out:
+                        text_out.write(chunk)
+                    answer_lines.extend(self.answer_key_lines(chunk))
+                    etapa['paginas'] += 1
+                    yield chunk
+            
+            questions = self._unique_questions(self.iter_chunk_segments(chunks()))
+            total_questions = self.write_questions_jsonl(questions, jsonl_file)
+            etapa['itens'] = total_questions
+        logger.info(f"Resultados salvos em JSONL: {jsonl_file}")
+        if include_full_text:
+            logger.info(f"Texto salvo em: {text_file}")
+        
+        logger.info("Extraindo gabarito...")
+        with self.metrics.stage('gabarito') as etapa:
+            answer_keys = self.extract_answer_keys('\n'.join(answer_lines))
+            answers = merge_answer_keys(answer_keys)
+            etapa['itens'] = len(answers)
+        self.save_answer_key(answers, answer_keys)
+        if answers:
+            with self.metrics.stage('salvar:jsonl+gabarito') as etapa:
+                etapa['itens'] = self.fill_jsonl_answers(jsonl_file, answers)
+        
+        with self.metrics.stage('imagens') as etapa:
+            image_paths = self._extract_images(deps)
+            etapa['itens'] = len(image_paths)
+            if self.image_stats:
+                etapa['gravacao'] = self.image_stats
+        
+        return {
+            'arquivo_origem': str(self.pdf_path),
+            'total_questoes': total_questions,
+            'total_imagens': len(image_paths),
+            'gabarito': answers,
+            'gabaritos': answer_keys,
+            'imagens': image_paths,
+            'manifesto_imagens': self.image_manifest,
+            'erros_imagens': self.image_errors,
+            'metricas': self.metrics.as_dict()
+        }
+
+    def write_questions_jsonl(self, questions, jsonl_file: Path,
+                              answers: Optional[Dict[int, str]] = None) -> int:
+        """Grava uma questão por linha, descarregando cada linha; retorna o total gravado"""
+        total = 0
+        with open(jsonl_file, 'w', encoding='utf-8') as f:
+            for question in questions:
+                if answers and question['numero'] in answers:
+                    question['gabarito'] = answers[question['numero']]
+                f.write(json.dumps(question, ensure_ascii=False) + "\n")
+                f.flush()
+                total += 1
+        return total
+
+    def fill_jsonl_answers(self, jsonl_file: Path, answers: Dict[int, str]) -> int:
+        """
+        Preenche o `gabarito` das linhas de um JSONL já gravado, lendo e
+        regravando uma linha por vez; o arquivo é substituído de uma vez no fim.
+        Retorna quantas questões receberam gabarito.
+        """
+        filled = 0
+        tmp_file = jsonl_file.with_name(jsonl_file.name + '.tmp')
+        with open(jsonl_file, encoding='utf-8') as src, open(tmp_file, 'w', encoding='utf-8') as dst:
+            for line in src:
+                question = json.loads(line)
+                if question['numero'] in answers:
+                    question['gabarito'] = answers[question['numero']]
+                    filled += 1
+                dst.write(json.dumps(question, ensure_ascii=False) + "\n")
+        os.replace(tmp_file, jsonl_file)
+        return filled
+
+    def save_answer_key(self, answers: Dict[int, str],
+                        answer_keys: Optional[Dict[int, Dict[int, str]]] = None):
+        """Salva o gabarito em texto (uma seção por simulado, se houver mais de um)"""
+        gabarito_file = self.output_dir / "gabarito.txt"
+        with open(gabarito_file, 'w', encoding='utf-8') as f:
+            f.write("GABARITO\n")
+            f.write("=" * 50 + "\n")
+            if answer_keys and len(answer_keys) > 1:
+                for simulado, sim_answers in sorted(answer_keys.items()):
+                    f.write(f"\nSIMULADO {simulado}\n")
+                    for num, answer in sorted(sim_answers.items()):
+                        f.write(f"Questão {num}: {answer.upper()}\n")
+            else:
+                for num, answer in sorted(answers.items()):
+                    f.write(f"Questão {num}: {answer.upper()}\n")
+        
+        logger.info(f"Gabarito salvo em: {gabarito_file}")
+
+    def save_results(self, results: Dict, format_type: str = 'json', include_full_text: bool = True):
         """Salva resultados em diferentes formatos"""
+        with self.metrics.stage(f'salvar:{format_type}') as etapa:
+            etapa['itens'] = len(results.get('questoes', []))
+            self._save_results(results, format_type, include_full_text)
+    
+    def _save_results(self, results: Dict, format_type: str, include_full_text: bool):
+        if format_type == 'jsonl':
+            # Uma questão por linha; o texto completo fica em arquivo separado
+            jsonl_file = self.output_dir / "questoes_extraidas.jsonl"
+            self.write_questions_jsonl(results['questoes'], jsonl_file)
+            logger.info(f"Resultados salvos em JSONL: {jsonl_file}")
+            if include_full_text and results.get('texto_completo'):
+                self._save_text(results['texto_completo'])
         
-        if format_type == 'json':
+        elif format_type == 'json':
             # Salva como JSON
             json_file = self.output_dir / "questoes_extraidas.json"
             with open(json_file, 'w', encoding='utf-8') as f:
@@ -451,22 +1341,235 @@ class PDFExtractor:
             logger.info(f"Resultados salvos em CSV: {csv_file}")
         
         # Sempre salva o gabarito separadamente
-        gabarito_file = self.output_dir / "gabarito.txt"
-        with open(gabarito_file, 'w', encoding='utf-8') as f:
-            f.write("GABARITO\n")
-            f.write("=" * 50 + "\n")
-            for num, answer in sorted(results['gabarito'].items()):
-                f.write(f"Questão {num}: {answer.upper()}\n")
+        self.save_answer_key(results['gabarito'], results.get('gabaritos'))
+
+
+def resolve_pdf_inputs(spec: str) -> Tuple[List[Path], bool]:
+    """
+    Resolve o argumento de entrada em uma lista de PDFs.
+
+    Aceita um arquivo, um diretório (PDFs diretamente dentro dele) ou um glob
+    (ex.: 'simulados/**/*.pdf'). Retorna (pdfs, modo_lote).
+    """
+    path = Path(spec)
+    if path.is_file():
+        return [path], False
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.suffix.lower() == '.pdf'), True
+    if any(ch in spec for ch in '*?['):
+        return sorted(Path(p) for p in glob.glob(spec, recursive=True) if p.lower().endswith('.pdf')), True
+    return [], False
+
+
+def batch_output_dirs(pdf_files: List[Path], output_dir: str) -> List[Path]:
+    """Um subdiretório por PDF, nomeado pelo arquivo (com sufixo se o nome repetir)"""
+    used = {}
+    dirs = []
+    for pdf in pdf_files:
+        name = pdf.stem
+        if name in used:
+            used[name] += 1
+            name = f"{name}_{used[name]}"
+        else:
+            used[name] = 0
+        dirs.append(Path(output_dir) / name)
+    return dirs
+
+
+def extract_pdf_job(pdf_path: str, output_dir: str, format_type: str = 'both',
+                    include_full_text: bool = True, workers: int = 1,
+                    cache_max_bytes: Optional[int] = None, legacy_alternatives: bool = False,
+                    use_mmap: bool = False, image_options: Optional[Dict] = None,
+                    profile: bool = False, trace_name: Optional[str] = None) -> Dict:
+    """
+    Extrai um PDF do lote (roda dentro de um processo do pool).
+
+    Nunca propaga exceções: erros voltam no campo 'erro', para que um PDF
+    ruim não interrompa o lote. Com `profile`, grava perfil.prof e, com
+    `trace_name`, o trace das etapas com esse nome, no diretório do PDF.
+    """
+    started = time.perf_counter()
+    summary = {'arquivo': pdf_path, 'saida': output_dir, 'erro': None}
+    try:
+        # O extrator só registra no log PDFs ilegíveis; no lote eles contam como erro
+        count_pages = count_pages_pdfplumber if HAS_PDFPLUMBER else count_pages_pypdf2
+        if count_pages(pdf_path, use_mmap) == 0:
+            raise ValueError("PDF sem páginas")
         
-        logger.info(f"Gabarito salvo em: {gabarito_file}")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        cache = None
+        if cache_max_bytes:
+            cache = ExtractionCache(f"extrator_pdf-{EXTRACTOR_VERSION}", max_bytes=cache_max_bytes)
+        
+        extractor = PDFExtractor(pdf_path, output_dir, workers=workers, cache=cache,
+                                 legacy_alternatives=legacy_alternatives, use_mmap=use_mmap,
+                                 **(image_options or {}))
+        profiler = cProfile.Profile() if profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            results = run_extraction(extractor, format_type, include_full_text)
+        finally:
+            if profiler:
+                profiler.disable()
+                summary['perfil'] = str(Path(output_dir) / "perfil.prof")
+                profiler.dump_stats(summary['perfil'])
+            if trace_name:
+                summary['trace'] = str(Path(output_dir) / trace_name)
+                extractor.metrics.save_chrome_trace(summary['trace'])
+        
+        # As questões voltam ao processo principal só como arquivo: a mescla do
+        # lote lê o JSONL de cada PDF linha a linha
+        jsonl_file = Path(output_dir) / "questoes_extraidas.jsonl"
+        if format_type != 'jsonl':
+            extractor.write_questions_jsonl(results['questoes'], jsonl_file)
+        summary['jsonl'] = str(jsonl_file)
+        summary['total_questoes'] = results['total_questoes']
+        summary['total_imagens'] = results['total_imagens']
+        summary['erros_imagens'] = results['erros_imagens']
+        summary['total_gabarito'] = len(results['gabarito'])
+        summary['metricas'] = extractor.metrics.as_dict()
+    except Exception as e:
+        summary['erro'] = f"{type(e).__name__}: {e}"
+    finally:
+        # O processo do pool segue para o próximo PDF; não acumula mapeamentos
+        close_shared_buffers()
+    
+    summary['segundos'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def iter_job_questions(summary: Dict) -> Iterator[Dict]:
+    """Questões de um PDF do lote, lidas uma a uma do JSONL gravado pelo job"""
+    if summary['erro'] or not summary.get('jsonl'):
+        return
+    with open(summary['jsonl'], encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def write_merged_questions(merged_file: Path, summaries: List[Dict]) -> int:
+    """
+    Grava as questões de todos os PDFs, na ordem dos arquivos e renumeradas,
+    em um único JSON ({'questoes': [...], 'total_questoes': n}). Cada questão
+    é lida e gravada por vez, sem montar a lista. Retorna o total.
+    """
+    total = 0
+    with open(merged_file, 'w', encoding='utf-8') as f:
+        f.write('{\n  "questoes": [')
+        for summary in summaries:
+            for question in iter_job_questions(summary):
+                question['numero_original'] = question['numero']
+                question['numero'] = total + 1
+                question['arquivo_origem'] = summary['arquivo']
+                item = json.dumps(question, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+                f.write(f"{',' if total else ''}\n    {item}")
+                total += 1
+        f.write("\n  ]" if total else "]")
+        f.write(f',\n  "total_questoes": {total}\n}}\n')
+    return total
+
+
+def run_extraction(extractor: 'PDFExtractor', format_type: str, include_full_text: bool = True) -> Dict:
+    """Extrai e salva nos formatos pedidos"""
+    if format_type == 'jsonl':
+        results = extractor.extract_to_jsonl(include_full_text=include_full_text)
+    else:
+        results = extractor.extract_all()
+    
+    if format_type in ['json', 'both']:
+        extractor.save_results(results, 'json')
+    
+    if format_type in ['csv', 'both']:
+        extractor.save_results(results, 'csv')
+    
+    return results
+
+
+def run_batch(pdf_files: List[Path], output_dir: str, format_type: str = 'both',
+              include_full_text: bool = True, jobs: Optional[int] = None, workers: int = 1,
+              cache_max_bytes: Optional[int] = None, legacy_alternatives: bool = False,
+              use_mmap: bool = False, image_options: Optional[Dict] = None,
+              profile: bool = False, trace_name: Optional[str] = None) -> Dict:
+    """
+    Extrai vários PDFs em um pool de processos (um PDF por tarefa).
+
+    Grava as saídas de cada PDF em `output_dir/<nome do pdf>/` (sempre com
+    `questoes_extraidas.jsonl`, além do formato pedido), um conjunto único
+    de questões renumeradas em `questoes_mescladas.json` e o resumo do lote
+    em `resumo_lote.json`. Os processos devolvem só caminhos e contagens; a
+    mescla lê os JSONL uma questão por vez (ver write_merged_questions). `image_options` vai para o PDFExtractor
+    (image_workers, image_format, max_image_dimension). `profile` e
+    `trace_name` valem por PDF (ver extract_pdf_job).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    out_dirs = batch_output_dirs(pdf_files, output_dir)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    logger.info(f"Lote: {len(pdf_files)} PDFs com {jobs} processos")
+    started = time.perf_counter()
+    summaries: List[Optional[Dict]] = [None] * len(pdf_files)
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(extract_pdf_job, str(pdf), str(out), format_type,
+                        include_full_text, workers, cache_max_bytes, legacy_alternatives, use_mmap,
+                        image_options, profile, trace_name): i
+            for i, (pdf, out) in enumerate(zip(pdf_files, out_dirs))
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:  # processo do pool morreu
+                summary = {'arquivo': str(pdf_files[i]), 'saida': str(out_dirs[i]),
+                           'erro': f"{type(e).__name__}: {e}", 'segundos': None}
+            summaries[i] = summary
+            
+            if summary['erro']:
+                logger.error(f"[{done}/{len(pdf_files)}] {pdf_files[i].name}: ERRO - {summary['erro']}")
+            else:
+                logger.info(f"[{done}/{len(pdf_files)}] {pdf_files[i].name}: "
+                            f"{summary['total_questoes']} questões ({summary['segundos']}s)")
+    
+    # Mescla na ordem dos arquivos, renumerando as questões
+    merged_file = Path(output_dir) / "questoes_mescladas.json"
+    total_questions = write_merged_questions(merged_file, summaries)
+    
+    report = {
+        'total_arquivos': len(pdf_files),
+        'arquivos_com_erro': sum(1 for s in summaries if s['erro']),
+        'total_questoes': total_questions,
+        'segundos': round(time.perf_counter() - started, 3),
+        'arquivos': summaries,
+    }
+    with open(Path(output_dir) / "resumo_lote.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    logger.info(f"Questões mescladas salvas em: {merged_file}")
+    return report
 
 
 def main():
     """Função principal"""
     parser = argparse.ArgumentParser(description='Extrator de Questões, Imagens e Gabarito de PDF')
-    parser.add_argument('pdf_file', help='Caminho para o arquivo PDF')
+    parser.add_argument('pdf_file', help='Arquivo PDF, diretório com PDFs ou glob (ex.: "simulados/*.pdf")')
     parser.add_argument('-o', '--output', default='extracted_content', help='Diretório de saída')
-    parser.add_argument('-f', '--format', choices=['json', 'csv', 'both'], default='both', help='Formato de saída')
+    parser.add_argument('-f', '--format', choices=['json', 'csv', 'both', 'jsonl'], default='both', help='Formato de saída')
+    parser.add_argument('--no-full-text', action='store_true', help='No formato jsonl, não salva o texto completo')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Processos para extrair o texto das páginas em paralelo')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='No modo lote, PDFs processados em paralelo (padrão: núcleos)')
+    parser.add_argument('--legacy-alternatives', action='store_true', help='Separa as alternativas com os regex antigos (para comparar saídas)')
+    parser.add_argument('--mmap', action='store_true', help='Abre o PDF por mmap, compartilhado entre as etapas e os processos')
+    parser.add_argument('--image-workers', type=int, default=4, help='Threads que codificam e gravam as imagens')
+    parser.add_argument('--image-format', choices=IMAGE_FORMATS, default=None, help='Recodifica as imagens como PNG otimizado ou WebP')
+    parser.add_argument('--max-image-size', type=int, default=None, metavar='PIXELS', help='Reduz as imagens para que o maior lado tenha no máximo PIXELS')
+    parser.add_argument('--no-cache', action='store_true', help='Não usa o cache de extração')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help='Tamanho máximo do cache de extração (MB)')
+    parser.add_argument('--trace', metavar='ARQUIVO', help='Grava o tempo das etapas em formato Chrome Trace (abre no speedscope/Perfetto); '
+                        'no modo lote, um arquivo com esse nome no diretório de cada PDF')
+    parser.add_argument('--profile', action='store_true', help='Executa com cProfile e grava perfil.prof no diretório de saída '
+                        '(no modo lote, no diretório de cada PDF)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Modo verboso')
     
     args = parser.parse_args()
@@ -475,23 +1578,59 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Verifica se o arquivo existe
-    if not Path(args.pdf_file).exists():
+    pdf_files, batch_mode = resolve_pdf_inputs(args.pdf_file)
+    if not pdf_files:
         logger.error(f"Arquivo não encontrado: {args.pdf_file}")
         return 1
     
+    cache_max_bytes = None if args.no_cache else args.cache_max_mb * 1024 * 1024
+    image_options = {'image_workers': args.image_workers, 'image_format': args.image_format,
+                     'max_image_dimension': args.max_image_size}
+    
+    if batch_mode:
+        report = run_batch(pdf_files, args.output, args.format, not args.no_full_text,
+                           jobs=args.jobs, workers=args.workers, cache_max_bytes=cache_max_bytes,
+                           legacy_alternatives=args.legacy_alternatives, use_mmap=args.mmap,
+                           image_options=image_options, profile=args.profile,
+                           trace_name=Path(args.trace).name if args.trace else None)
+        logger.info("\n" + "="*50)
+        logger.info("RESUMO DO LOTE")
+        logger.info("="*50)
+        logger.info(f"PDFs processados: {report['total_arquivos']}")
+        logger.info(f"PDFs com erro: {report['arquivos_com_erro']}")
+        logger.info(f"Questões mescladas: {report['total_questoes']}")
+        logger.info(f"Tempo total: {report['segundos']}s")
+        logger.info(f"Resultados salvos em: {args.output}")
+        if args.profile or args.trace:
+            logger.info("Perfis/traces salvos no diretório de cada PDF (ver resumo_lote.json)")
+        return 0 if report['arquivos_com_erro'] < report['total_arquivos'] else 1
+    
     try:
         # Cria extrator
-        extractor = PDFExtractor(args.pdf_file, args.output)
+        cache = None
+        if cache_max_bytes:
+            cache = ExtractionCache(f"extrator_pdf-{EXTRACTOR_VERSION}", max_bytes=cache_max_bytes)
         
-        # Executa extração
-        results = extractor.extract_all()
+        extractor = PDFExtractor(args.pdf_file, args.output, workers=args.workers, cache=cache,
+                                 legacy_alternatives=args.legacy_alternatives, use_mmap=args.mmap,
+                                 **image_options)
         
-        # Salva resultados
-        if args.format in ['json', 'both']:
-            extractor.save_results(results, 'json')
+        # Executa extração e salva resultados
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler:
+            profiler.enable()
+        results = run_extraction(extractor, args.format, not args.no_full_text)
+        if profiler:
+            profiler.disable()
+            profile_file = Path(args.output) / "perfil.prof"
+            profiler.dump_stats(str(profile_file))
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+            logger.info(f"Perfil salvo em: {profile_file}\n{stream.getvalue()}")
         
-        if args.format in ['csv', 'both']:
-            extractor.save_results(results, 'csv')
+        if args.trace:
+            extractor.metrics.save_chrome_trace(args.trace)
+            logger.info(f"Trace das etapas salvo em: {args.trace}")
         
         # Resumo
         logger.info("\n" + "="*50)
@@ -500,10 +1639,16 @@ def main():
         logger.info(f"Arquivo: {results['arquivo_origem']}")
         logger.info(f"Questões encontradas: {results['total_questoes']}")
         logger.info(f"Imagens extraídas: {results['total_imagens']}")
+        if results['erros_imagens']:
+            logger.info(f"Imagens com erro na gravação: {len(results['erros_imagens'])}")
         logger.info(f"Respostas no gabarito: {len(results['gabarito'])}")
         logger.info(f"Resultados salvos em: {args.output}")
         
-        if results['total_questoes'] > 0:
+        logger.info("\nTempo por etapa:")
+        for line in extractor.metrics.log_lines():
+            logger.info(f"  {line}")
+        
+        if results.get('questoes'):
             logger.info("\nPrimeiras questões encontradas:")
             for i, question in enumerate(results['questoes'][:3]):
                 logger.info(f"  {question['numero']}. {question['enunciado'][:100]}...")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Gravação de Imagens em Segundo Plano
+====================================
+
+Etapa de saída das imagens extraídas: o laço que percorre o PDF só entrega
+a imagem (bytes já codificados ou pixels crus) e segue adiante; a
+codificação (PNG/WebP) e a escrita em disco rodam em um pool de threads,
+alimentado por uma fila limitada. Quando a fila enche, `submit` espera,
+então a memória ocupada por imagens pendentes não cresce sem limite.
+
+Opcionalmente as imagens são recodificadas como PNG otimizado ou WebP e
+reduzidas para caber em `max_dimension` pixels (o frontend as mostra em
+tamanho pequeno). A recodificação usa o Pillow.
+
+Uso:
+    with ImageSink(workers=4, image_format='webp', max_dimension=800) as sink:
+        path = sink.submit("imagens/q1.png", data=png_bytes)  # -> imagens/q1.webp
+    print(sink.stats(), sink.failed_paths())
+
+Uma imagem que falhou não fica no disco pela metade: o arquivo é removido,
+e o caminho aparece em `errors`/`failed_paths()` (conhecidos só depois de
+`close`). Quem guarda os caminhos gravados deve descartar esses.
+"""
+
+import io
+import os
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = ('png', 'webp')
+WEBP_QUALITY = 80
+
+# Pixels crus de uma imagem: (modo do Pillow, largura, altura, bytes)
+Pixels = Tuple[str, int, int, bytes]
+
+
+class ImageSink:
+    """Fila limitada + pool de threads que codifica e grava imagens"""
+
+    def __init__(self, workers: int = 4, max_pending: int = 32,
+                 image_format: Optional[str] = None, max_dimension: Optional[int] = None,
+                 collect_output: bool = False):
+        """
+        image_format: None grava como veio (pixels crus viram PNG); 'png'
+        recodifica como PNG otimizado; 'webp' recodifica como WebP.
+        max_dimension: reduz a imagem (mantendo a proporção) para que o maior
+        lado tenha no máximo esse tamanho.
+        collect_output: guarda (caminho, bytes gravados) para `drain`.
+        """
+        if image_format is not None and image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Formato de imagem inválido: {image_format}")
+        self.image_format = image_format
+        self.max_dimension = max_dimension
+        self.reencode = image_format is not None or max_dimension is not None
+        if self.reencode and not HAS_PIL:
+            raise ImportError("Pillow não está instalado (necessário para recodificar imagens)")
+
+        self.collect_output = collect_output
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._output: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # bytes_entrada e bytes_gravados_recodificadas só contam imagens recebidas já
+        # codificadas; pixels crus não têm um tamanho original comparável
+        self._counts = {'imagens': 0, 'imagens_de_pixels': 0, 'bytes_entrada': 0,
+                        'bytes_gravados': 0, 'bytes_gravados_recodificadas': 0}
+        self.errors: List[Tuple[str, str]] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._closed = False
+
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def output_path(self, path: str) -> str:
+        """Caminho final do arquivo (a extensão muda ao recodificar para WebP)"""
+        if self.image_format == 'webp':
+            return str(Path(path).with_suffix('.webp'))
+        return str(path)
+
+    def submit(self, path: str, data: Optional[bytes] = None, pixels: Optional[Pixels] = None) -> str:
+        """
+        Enfileira uma imagem para gravar em `path` (espera se a fila estiver
+        cheia) e retorna o caminho final. Passe `data` (imagem já codificada)
+        ou `pixels` (modo, largura, altura, bytes), que são codificados como PNG.
+        """
+        if self._closed:
+            raise RuntimeError("ImageSink já foi fechado")
+        if self._started is None:
+            self._started = time.perf_counter()
+        target = self.output_path(path)
+        self._queue.put((target, data, pixels))
+        return target
+
+    def failed_paths(self) -> set:
+        """Caminhos finais das imagens que não foram gravadas"""
+        with self._lock:
+            return {target for target, _error in self.errors}
+
+    def drain(self) -> Iterator[Tuple[str, bytes]]:
+        """(caminho, bytes gravados) das imagens já concluídas (com collect_output)"""
+        while True:
+            try:
+                yield self._output.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self) -> Dict:
+        """Espera as imagens pendentes e encerra as threads; retorna as estatísticas"""
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._finished = time.perf_counter()
+        return self.stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict:
+        """
+        Imagens gravadas, bytes recebidos e gravados, bytes economizados e
+        vazão. A economia compara só as imagens recebidas já codificadas com o
+        que foi gravado para elas; as recebidas como pixels crus entram em
+        `bytes_gravados`, mas não na economia (a compressão PNG normal não é
+        economia da recodificação).
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        end = self._finished or time.perf_counter()
+        seconds = end - self._started if self._started is not None else 0.0
+        reencoded_output = counts.pop('bytes_gravados_recodificadas')
+        counts.update({
+            'bytes_economizados': counts['bytes_entrada'] - reencoded_output,
+            'erros': len(self.errors),
+            'segundos': round(seconds, 6),
+            'imagens_por_segundo': round(counts['imagens'] / seconds, 1) if seconds else None,
+        })
+        return counts
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            target, data, pixels = job
+            opened = False
+            try:
+                output = self._encode(data, pixels)
+                with open(target, 'wb') as f:
+                    opened = True
+                    f.write(output)
+            except Exception as e:
+                logger.error(f"Erro ao gravar imagem {target}: {e}")
+                if opened:
+                    try:
+                        os.remove(target)  # não deixa um arquivo truncado
+                    except OSError:
+                        pass
+                with self._lock:
+                    self.errors.append((target, str(e)))
+                continue
+
+            with self._lock:
+                self._counts['imagens'] += 1
+                self._counts['bytes_gravados'] += len(output)
+                if data is not None:
+                    self._counts['bytes_entrada'] += len(data)
+                    self._counts['bytes_gravados_recodificadas'] += len(output)
+                else:
+                    self._counts['imagens_de_pixels'] += 1
+            if self.collect_output:
+                self._output.put((target, output))
+
+    def _encode(self, data: Optional[bytes], pixels: Optional[Pixels]) -> bytes:
+        if data is not None and not self.reencode:
+            return data
+
+        if pixels is not None:
+            mode, width, height, samples = pixels
+            image = Image.frombytes(mode, (width, height), samples)
+        else:
+            image = Image.open(io.BytesIO(data))
+
+        if self.max_dimension and max(image.size) > self.max_dimension:
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+        out = io.BytesIO()
+        if self.image_format == 'webp':
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+            image.save(out, format='WEBP', quality=WEBP_QUALITY, method=4)
+        else:
+            if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16'):
+                image = image.convert('RGB')  # ex.: CMYK
+            image.save(out, format='PNG', optimize=self.image_format == 'png')
+        return out.getvalue()
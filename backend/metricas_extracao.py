@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Métricas por Etapa da Extração
+==============================
+
+Registra, para cada etapa do PDFExtractor (texto, imagens, questões,
+gabarito, salvar), o tempo de relógio, o tempo de CPU (incluindo processos
+filhos já encerrados, como os do pool de páginas), o pico de memória
+residente do processo e a quantidade de itens processados.
+
+As etapas podem ser exportadas no formato Chrome Trace (chrome://tracing,
+Perfetto ou https://www.speedscope.app):
+
+    metrics = StageMetrics()
+    with metrics.stage('texto') as etapa:
+        text = extrair()
+        etapa['itens'] = len(text)
+    metrics.save_chrome_trace('trace.json')
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # Windows
+    HAS_RESOURCE = False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memória residente do processo, em bytes (None se indisponível)"""
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS em bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def cpu_seconds() -> float:
+    """CPU de usuário e sistema do processo e dos filhos já encerrados"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class StageMetrics:
+    """Coleta as métricas das etapas na ordem em que terminam"""
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        """
+        Mede o bloco como uma etapa. O dicionário entregue pode receber
+        'itens' e outros campos, que vão junto para o resultado.
+        """
+        record = {'etapa': name, 'itens': None}
+        wall_start = time.perf_counter()
+        cpu_start = cpu_seconds()
+        rss_start = peak_rss_bytes()
+        try:
+            yield record
+        finally:
+            wall_end = time.perf_counter()
+            rss_end = peak_rss_bytes()
+            record.update({
+                'inicio_s': round(wall_start - self._origin, 6),
+                'tempo_s': round(wall_end - wall_start, 6),
+                'cpu_s': round(cpu_seconds() - cpu_start, 6),
+                'pico_rss_bytes': rss_end,
+                'aumento_pico_rss_bytes': rss_end - rss_start if rss_end is not None else None,
+                'thread': threading.get_ident(),
+            })
+            self.stages.append(record)
+
+    def as_dict(self) -> Dict:
+        """Resumo serializável: etapas e totais"""
+        return {
+            'etapas': [{k: v for k, v in s.items() if k != 'thread'} for s in self.stages],
+            'tempo_total_s': round(sum(s['tempo_s'] for s in self.stages), 6),
+            'cpu_total_s': round(sum(s['cpu_s'] for s in self.stages), 6),
+            'pico_rss_bytes': peak_rss_bytes(),
+        }
+
+    def chrome_trace(self) -> Dict:
+        """Etapas como eventos completos ('X') do formato Chrome Trace"""
+        pid = os.getpid()
+        events = []
+        for s in self.stages:
+            args = {k: v for k, v in s.items() if k not in ('etapa', 'inicio_s', 'tempo_s', 'thread')}
+            events.append({
+                'name': s['etapa'], 'cat': 'extracao', 'ph': 'X',
+                'ts': s['inicio_s'] * 1e6, 'dur': s['tempo_s'] * 1e6,
+                'pid': pid, 'tid': s['thread'], 'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def log_lines(self) -> List[str]:
+        """Uma linha legível por etapa, para o resumo no log"""
+        lines = []
+        for s in self.stages:
+            items = f", {s['itens']} itens" if s['itens'] is not None else ""
+            rss = f", pico RSS {s['pico_rss_bytes'] / 1024 / 1024:.0f} MB" if s['pico_rss_bytes'] else ""
+            lines.append(f"{s['etapa']}: {s['tempo_s']:.3f}s (CPU {s['cpu_s']:.3f}s){items}{rss}")
+        return lines
@@ -6,10 +6,12 @@ Script de Teste do Extrator PDF
 Testa o extrator com dados simulados para verificar funcionamento.
 """
 
+import re
 import tempfile
 import json
 from pathlib import Path
-from extrator_pdf import PDFExtractor
+from extrator_pdf import PDFExtractor, HAS_PDFPLUMBER, HAS_PYMUPDF, write_merged_questions
+from imagens_saida import ImageSink, HAS_PIL
 
 
 def create_test_text():
@@ -88,6 +90,107 @@ def test_question_parsing():
     return len(questions) == 5
 
 
+def test_custom_question_pattern():
+    """Testa padrões personalizados no scanner de âncoras"""
+    print("\n🧪 Testando padrão personalizado de questão...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    extractor.question_patterns.append(
+        r'(?:^|\n)\s*PERGUNTA\s+(\d+)\s*(.*?)(?=(?:^|\n)\s*PERGUNTA\s+\d+|$)'
+    )
+    
+    text = """
+PERGUNTA 01
+Qual é a função da mitocôndria?
+a) Produção de energia
+b) Síntese de proteínas
+
+PERGUNTA 02
+O que é fotossíntese?
+a) Respiração celular
+b) Processo de produção de alimento
+
+PERGUNTA 01
+Repetição do número que não deve gerar duplicata.
+"""
+    questions = extractor.parse_questions(text)
+    
+    print(f"   ✅ Questões encontradas: {len(questions)}")
+    
+    return (
+        [q['numero'] for q in questions] == [1, 2]
+        and questions[0]['enunciado'] == 'Qual é a função da mitocôndria?'
+        and len(questions[1]['alternativas']) == 2
+    )
+
+
+def test_alternative_scanner():
+    """Testa a separação de enunciado e alternativas em uma passada"""
+    print("\n🧪 Testando separação de alternativas...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    text = """Um investidor aplicou em um fundo
+de renda fixa. Qual o prazo?
+a) Primeira alternativa que
+continua na linha seguinte
+b) 3
+--- PÁGINA 2 ---
+c) Terceira
+d) Quarta
+
+Texto após as alternativas"""
+    
+    stem, alternatives = extractor.split_question(text)
+    letters = [alt['letra'] for alt in alternatives]
+    print(f"   ✅ Alternativas encontradas: {letters}")
+    
+    # O modo de compatibilidade mantém o resultado dos regex antigos
+    legacy = PDFExtractor("teste.pdf", "test_output", legacy_alternatives=True)
+    legacy_question = legacy.build_question(1, text)
+    
+    return (
+        stem == "Um investidor aplicou em um fundo\nde renda fixa. Qual o prazo?"
+        and letters == ['a', 'b', 'c', 'd']
+        and alternatives[0]['texto'] == "Primeira alternativa que continua na linha seguinte"
+        and alternatives[1]['texto'] == "3"
+        and legacy_question['alternativas'] == legacy.extract_alternatives(text)
+        and legacy_question['enunciado'] == legacy.clean_question_text(text)
+    )
+
+
+def test_trailing_answer_key():
+    """Testa que o gabarito no fim do caderno não entra no enunciado da última questão"""
+    print("\n🧪 Testando gabarito após a última questão...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    text = create_test_text().replace("GABARITO:", "=" * 20 + "\nGABARITO OFICIAL\n\nGABARITO:")
+    questions = extractor.parse_questions(text)
+    last = questions[-1]
+    print(f"   ✅ Enunciado da questão {last['numero']}: {last['enunciado']!r}")
+    
+    return (
+        last['enunciado'] == 'Quem escreveu "Dom Casmurro"?'
+        and [alt['letra'] for alt in last['alternativas']] == ['a', 'b', 'c', 'd', 'e']
+        and last['alternativas'][-1]['texto'] == 'Jorge Amado'
+    )
+
+
+def test_chunked_segments():
+    """Testa a segmentação por páginas (iter_questions) contra o texto inteiro"""
+    print("\n🧪 Testando segmentação página a página...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    lines = create_test_text().split("\n")
+    # Trechos pequenos cortam questões no meio, como quebras de página
+    chunks = ["\n".join(lines[i:i + 4]) + "\n" for i in range(0, len(lines), 4)]
+    
+    lazy = list(extractor.iter_chunk_segments(chunks))
+    full = list(extractor.iter_question_segments("".join(chunks)))
+    print(f"   ✅ Segmentos: {len(lazy)}")
+    
+    return lazy == full and len(lazy) == 5
+
+
 def test_answer_parsing():
     """Testa a extração de gabarito"""
     print("\n🧪 Testando extração de gabarito...")
@@ -108,6 +211,180 @@ def test_answer_parsing():
     return len(answers) == 5
 
 
+def test_answer_keys_by_simulado():
+    """Testa gabaritos por simulado, ignorando números soltos nos enunciados"""
+    print("\n🧪 Testando gabaritos por simulado...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    text = """
+01 [1001-A] Um investidor aplicou 10 anos atrás em 3 e 4 fundos...
+a) 2 anos
+b) 5 dias
+
+GABARITO
+CEA: SIMULADO (1)
+1. A 2. C 3. B
+4. D
+CEA: SIMULADO (2)
+1. B 2. A
+Fim do caderno
+"""
+    answer_keys = extractor.extract_answer_keys(text)
+    print(f"   ✅ Simulados encontrados: {sorted(answer_keys)}")
+    
+    return answer_keys == {
+        1: {1: 'a', 2: 'c', 3: 'b', 4: 'd'},
+        2: {1: 'b', 2: 'a'},
+    }
+
+
+def test_answer_key_lines():
+    """Testa o gabarito extraído só das linhas candidatas de cada trecho"""
+    print("\n🧪 Testando gabarito lido em trechos...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    texts = [
+        create_test_text(),
+        # Cabeçalho quebrado em duas linhas e região que continua na página seguinte
+        "\n--- PÁGINA 1 ---\nCEA:\nSIMULADO (1)\n1a 2b\n--- PÁGINA 2 ---\n3c 4d\ntexto\n5a\n"
+        "Respostas no meio da frase 9a\nGabarito\n\n--- PÁGINA 3 ---\nCEA: SIMULADO (2)\n\n1c 2c\n",
+    ]
+    
+    # O primeiro texto vira páginas de 6 linhas, como os trechos de iter_page_text
+    lines = texts[0].split("\n")
+    texts[0] = "".join(f"\n--- PÁGINA {i // 6 + 1} ---\n" + "\n".join(lines[i:i + 6]) + "\n"
+                       for i in range(0, len(lines), 6))
+    
+    ok = True
+    for text in texts:
+        chunks = re.split(r"(?=\n--- PÁGINA)", text)
+        candidates = [line for chunk in chunks for line in extractor.answer_key_lines(chunk)]
+        expected = extractor.extract_answer_keys("".join(chunks))
+        print(f"   ✅ {len(candidates)} de {text.count(chr(10))} linhas guardadas, "
+              f"{sum(len(a) for a in expected.values())} respostas")
+        ok = ok and expected and extractor.extract_answer_keys("\n".join(candidates)) == expected
+    
+    return ok
+
+
+def test_jsonl_streaming():
+    """Testa a extração em JSONL página a página contra a extração completa"""
+    print("\n🧪 Testando extração JSONL em streaming...")
+    
+    if not (HAS_PYMUPDF and HAS_PDFPLUMBER):
+        print("   ⚠️ PyMuPDF/pdfplumber não disponíveis: teste ignorado")
+        return True
+    
+    import fitz
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Três páginas: questões cortadas entre páginas e o gabarito no fim
+        lines = create_test_text().strip().split("\n")
+        doc = fitz.open()
+        for i in range(0, len(lines), 20):
+            doc.new_page().insert_text((40, 40), "\n".join(lines[i:i + 20]), fontsize=9)
+        pdf_path = str(Path(tmp) / "teste.pdf")
+        doc.save(pdf_path)
+        doc.close()
+        
+        extractor = PDFExtractor(pdf_path, str(Path(tmp) / "saida"), image_workers=1)
+        summary = extractor.extract_to_jsonl()
+        with open(Path(tmp) / "saida" / "questoes_extraidas.jsonl", encoding='utf-8') as f:
+            streamed = [json.loads(line) for line in f]
+        full = extractor.extract_all()
+        text_file = Path(tmp) / "saida" / "texto_extraido.txt"
+        same_text = text_file.read_text(encoding='utf-8') == full['texto_completo']
+    
+    print(f"   ✅ Questões: {summary['total_questoes']}, com gabarito: "
+          f"{sum(1 for q in streamed if 'gabarito' in q)}")
+    return (streamed == full['questoes'] and summary['gabarito'] == full['gabarito']
+            and summary['total_questoes'] == 5 and same_text)
+
+
+def test_merged_questions():
+    """Testa a mescla do lote a partir dos JSONL de cada PDF"""
+    print("\n🧪 Testando mescla das questões do lote...")
+    
+    extractor = PDFExtractor("teste.pdf", "test_output")
+    questions = extractor.parse_questions(create_test_text())
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        summaries = []
+        for name, erro in [("a.pdf", None), ("ruim.pdf", "ValueError: PDF sem páginas"), ("b.pdf", None)]:
+            jsonl_file = Path(tmp) / f"{name}.jsonl"
+            extractor.write_questions_jsonl([dict(q) for q in questions[:3]], jsonl_file)
+            summaries.append({'arquivo': name, 'erro': erro, 'jsonl': str(jsonl_file)})
+        
+        merged_file = Path(tmp) / "questoes_mescladas.json"
+        total = write_merged_questions(merged_file, summaries)
+        with open(merged_file, encoding='utf-8') as f:
+            merged = json.load(f)
+    
+    print(f"   ✅ Questões mescladas: {total}")
+    return (total == merged['total_questoes'] == 6
+            and [q['numero'] for q in merged['questoes']] == list(range(1, 7))
+            and [q['numero_original'] for q in merged['questoes']] == [1, 2, 3, 1, 2, 3]
+            and merged['questoes'][3]['arquivo_origem'] == "b.pdf")
+
+
+def test_image_sink():
+    """Testa a gravação de imagens em segundo plano, com redução de tamanho"""
+    print("\n🧪 Testando gravação de imagens...")
+    
+    if not HAS_PIL:
+        print("   ⚠️ Pillow não disponível: teste ignorado")
+        return True
+    
+    from PIL import Image
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Fila menor que o número de imagens: submit precisa esperar as threads
+        with ImageSink(workers=2, max_pending=2, max_dimension=8) as sink:
+            paths = [sink.submit(str(Path(tmp) / f"img_{i}.png"), pixels=('L', 32, 16, bytes([i * 40]) * 512))
+                     for i in range(5)]
+        stats = sink.stats()
+        sizes = [Image.open(path).size for path in paths]
+    
+    print(f"   ✅ Imagens: {stats['imagens']}, {stats['bytes_economizados']} bytes economizados")
+    return stats['imagens'] == 5 and stats['erros'] == 0 and all(size == (8, 4) for size in sizes)
+
+
+def test_image_write_failures():
+    """Testa que imagens não gravadas ficam fora do resultado e do manifesto"""
+    print("\n🧪 Testando falhas na gravação de imagens...")
+    
+    if not HAS_PYMUPDF:
+        print("   ⚠️ PyMuPDF não disponível: teste ignorado")
+        return True
+    
+    import fitz
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        doc = fitz.open()
+        page = doc.new_page()
+        for i in range(2):
+            pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 4, 4), False)
+            pix.set_rect(pix.irect, (i * 100, 50, 200))
+            page.insert_image(fitz.Rect(40 + i * 100, 40, 120 + i * 100, 120), pixmap=pix)
+        pdf_path = str(Path(tmp) / "imagens.pdf")
+        doc.save(pdf_path)
+        doc.close()
+        
+        extractor = PDFExtractor(pdf_path, str(Path(tmp) / "saida"), image_workers=1)
+        # Um diretório no lugar do arquivo da primeira imagem: a escrita falha
+        (extractor.images_dir / "page_1_img_1.png").mkdir(parents=True)
+        image_paths = extractor.extract_images_pymupdf()
+        with open(extractor.images_dir / "manifesto.json", encoding='utf-8') as f:
+            manifest = json.load(f)
+    
+    print(f"   ✅ Gravadas: {[Path(p).name for p in image_paths]}, "
+          f"com erro: {[Path(e['arquivo']).name for e in extractor.image_errors]}")
+    return ([Path(p).name for p in image_paths] == ["page_1_img_2.png"]
+            and [Path(e['arquivo']).name for e in extractor.image_errors] == ["page_1_img_1.png"]
+            and [Path(entry['arquivo']).name for entry in manifest] == ["page_1_img_2.png"]
+            and manifest == extractor.image_manifest)
+
+
 def test_dependencies():
     """Testa dependências disponíveis"""
     print("\n🧪 Testando dependências...")
@@ -192,7 +469,17 @@ def run_all_tests():
     tests = [
         ("Dependências", test_dependencies),
         ("Extração de Questões", test_question_parsing),
+        ("Padrão Personalizado", test_custom_question_pattern),
+        ("Separação de Alternativas", test_alternative_scanner),
+        ("Gabarito no Fim do Caderno", test_trailing_answer_key),
+        ("Segmentação por Páginas", test_chunked_segments),
         ("Extração de Gabarito", test_answer_parsing),
+        ("Gabaritos por Simulado", test_answer_keys_by_simulado),
+        ("Gabarito em Trechos", test_answer_key_lines),
+        ("JSONL em Streaming", test_jsonl_streaming),
+        ("Mescla do Lote", test_merged_questions),
+        ("Gravação de Imagens", test_image_sink),
+        ("Falhas na Gravação de Imagens", test_image_write_failures),
         ("Fluxo Completo", test_full_workflow),
     ]
     
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Upload concorrente e idempotente de questões para o PostgREST do Supabase.
+
+- lotes enviados em paralelo, com número máximo de lotes em andamento
+- tamanho do lote ajustado pela latência observada (e reduzido em 413)
+- retentativa com backoff exponencial por lote; um lote com erro não
+  interrompe os demais
+- upsert por `id_questao_origem` (requer índice único nessa coluna), então
+  reenviar o mesmo CSV não duplica nada e dispensa apagar a tabela; o `id`
+  não é enviado (é do banco), então linhas existentes mantêm o seu
+- remoção só das questões que saíram do simulado (delete_rows), para enviar
+  apenas as diferenças geradas por extrair_simulados.py
+
+Usa só a biblioteca padrão. Para medir sem rede, `--stub` sobe o substituto
+local de postgrest_stub.py:
+
+    python bulk_upload.py --stub --stub-latency 0.05 --concurrency 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import http.client
+from itertools import islice
+from urllib.parse import urlparse, quote
+from concurrent.futures import ThreadPoolExecutor
+
+TABLE_NAME = "questoes"
+CONFLICT_COLUMN = "id_questao_origem"
+
+# Falhas transitórias que valem nova tentativa (0 = erro de rede)
+RETRYABLE_STATUS = {0, 408, 429, 500, 502, 503, 504}
+
+
+class AdaptiveBatchSize:
+    """Cresce o lote enquanto a latência fica abaixo da meta; reduz quando passa ou falha"""
+
+    def __init__(self, initial=500, minimum=50, maximum=2000, target_latency=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.size = max(minimum, min(initial, maximum))
+
+    def success(self, latency):
+        if latency < self.target_latency / 2:
+            self.size = min(self.maximum, int(self.size * 1.5))
+        elif latency > self.target_latency:
+            self.shrink()
+
+    def shrink(self):
+        self.size = max(self.minimum, self.size // 2)
+
+    def cap(self, maximum):
+        # O servidor recusou lotes deste tamanho: não volta a crescer até ele
+        self.maximum = max(self.minimum, maximum)
+        self.size = min(self.size, self.maximum)
+
+
+class PostgrestClient:
+    """POST de lotes no PostgREST, com uma conexão persistente por thread"""
+
+    def __init__(self, base_url, api_key, table=TABLE_NAME, on_conflict=CONFLICT_COLUMN, timeout=30):
+        url = urlparse(base_url.rstrip("/"))
+        self.https = url.scheme == "https"
+        self.netloc = url.netloc
+        self.table_path = self.path = f"{url.path}/rest/v1/{table}"
+        self.key_column = on_conflict or CONFLICT_COLUMN
+        if on_conflict:
+            self.path += f"?on_conflict={quote(on_conflict)}"
+        self.headers = {
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Prefer": "resolution=merge-duplicates,return=minimal" if on_conflict else "return=minimal",
+        }
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.netloc, timeout=self.timeout)
+        return conn
+
+    def _request(self, method, path, body=None):
+        try:
+            conn = self._connection()
+            conn.request(method, path, body=body, headers=self.headers)
+            resp = conn.getresponse()
+            message = resp.read().decode("utf-8", "replace")
+            return resp.status, message
+        except (OSError, http.client.HTTPException) as e:
+            self._local.conn = None
+            return 0, str(e)
+
+    def post(self, rows):
+        """Envia um lote; retorna (status, mensagem). Status 0 indica erro de rede."""
+        return self._request("POST", self.path, json.dumps(rows, ensure_ascii=False).encode("utf-8"))
+
+    def delete(self, keys):
+        """Apaga as linhas cuja chave está em `keys`; retorna (status, mensagem)"""
+        values = ",".join('"' + str(k).replace('"', '\\"') + '"' for k in keys)
+        return self._request("DELETE", f"{self.table_path}?{quote(self.key_column)}=in.({quote(values)})")
+
+
+def unique_rows(rows, key, stats):
+    """Descarta linhas com chave repetida (a primeira vence), para o upsert ser determinístico"""
+    seen = set()
+    for row in rows:
+        k = row.get(key)
+        if k in seen:
+            stats["duplicadas"].append(k)
+            continue
+        seen.add(k)
+        yield row
+
+
+async def upload_rows(rows, client, concurrency=4, batch_size=500, min_batch=50, max_batch=2000,
+                      target_latency=1.0, retries=5, backoff=0.5):
+    """
+    Envia as linhas (qualquer iterável) em lotes concorrentes.
+    Retorna um dicionário com contadores, lotes com falha e vazão.
+    """
+    stats = {
+        "enviadas": 0, "lotes": 0, "retentativas": 0,
+        "falhas": [], "duplicadas": [], "segundos": 0.0, "linhas_por_segundo": 0.0,
+    }
+    sizer = AdaptiveBatchSize(batch_size, min_batch, max_batch, target_latency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    in_flight = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def send(batch):
+        for attempt in range(retries + 1):
+            started = time.monotonic()
+            status, message = await loop.run_in_executor(executor, client.post, batch)
+            if 200 <= status < 300:
+                sizer.success(time.monotonic() - started)
+                stats["enviadas"] += len(batch)
+                stats["lotes"] += 1
+                return
+            if status == 413 and len(batch) > 1:
+                # Lote grande demais: divide e segue com lotes menores
+                half = len(batch) // 2
+                sizer.cap(half)
+                await send(batch[:half])
+                await send(batch[half:])
+                return
+            if status not in RETRYABLE_STATUS or attempt == retries:
+                stats["falhas"].append({"status": status, "mensagem": message[:200], "linhas": len(batch)})
+                return
+            sizer.shrink()
+            stats["retentativas"] += 1
+            await asyncio.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def send_and_release(batch):
+        try:
+            await send(batch)
+        finally:
+            in_flight.release()
+
+    started = time.monotonic()
+    source = unique_rows(rows, CONFLICT_COLUMN, stats)
+    try:
+        while True:
+            # O tamanho é decidido só quando há vaga, com a latência mais recente
+            await in_flight.acquire()
+            batch = list(islice(source, sizer.size))
+            if not batch:
+                in_flight.release()
+                break
+            task = asyncio.create_task(send_and_release(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        executor.shutdown(wait=False)
+
+    stats["segundos"] = time.monotonic() - started
+    stats["linhas_por_segundo"] = stats["enviadas"] / stats["segundos"] if stats["segundos"] else 0.0
+    stats["tamanho_final_lote"] = sizer.size
+    return stats
+
+
+def delete_rows(keys, client, batch_size=100, retries=5, backoff=0.5):
+    """
+    Apaga as linhas com as chaves dadas, em lotes (a lista vai na URL).
+    Retorna {"removidas": n, "falhas": [...]}.
+    """
+    keys = list(keys)
+    stats = {"removidas": 0, "falhas": []}
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        for attempt in range(retries + 1):
+            status, message = client.delete(batch)
+            if 200 <= status < 300:
+                stats["removidas"] += len(batch)
+                break
+            if status not in RETRYABLE_STATUS or attempt == retries:
+                stats["falhas"].append({"status": status, "mensagem": message[:200], "linhas": len(batch)})
+                break
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+    return stats
+
+
+def print_stats(stats):
+    print(f"→ Linhas enviadas: {stats['enviadas']} em {stats['lotes']} lotes "
+          f"({stats['segundos']:.2f}s, {stats['linhas_por_segundo']:.0f} linhas/s)")
+    print(f"→ Retentativas: {stats['retentativas']} | tamanho final do lote: {stats['tamanho_final_lote']}")
+    if stats["duplicadas"]:
+        print(f"⚠️ {len(stats['duplicadas'])} linha(s) com {CONFLICT_COLUMN} repetido ignorada(s): "
+              f"{', '.join(map(str, stats['duplicadas'][:10]))}")
+    for falha in stats["falhas"]:
+        print(f"❌ Lote com {falha['linhas']} linhas falhou (HTTP {falha['status']}): {falha['mensagem']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload concorrente (upsert) de questões para o PostgREST")
+    parser.add_argument("--csv", default="simulados.csv", help="CSV gerado por extrair_simulados.py")
+    parser.add_argument("--url", default=os.getenv("SUPABASE_URL"), help="URL do projeto (padrão: SUPABASE_URL)")
+    parser.add_argument("--key", default=os.getenv("SUPABASE_ANON_KEY"), help="Chave (padrão: SUPABASE_ANON_KEY)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lotes em andamento ao mesmo tempo")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tamanho inicial do lote")
+    parser.add_argument("--repeat", type=int, default=1, help="Repete as linhas N vezes (com id_questao_origem distintos) para medir vazão")
+    parser.add_argument("--stub", action="store_true", help="Envia para um PostgREST local (postgrest_stub.py)")
+    parser.add_argument("--stub-latency", type=float, default=0.02)
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0)
+    parser.add_argument("--stub-max-batch", type=int, default=None)
+    args = parser.parse_args()
+
+    from upload_supabase import read_csv_rows
+
+    stub = None
+    if args.stub:
+        from postgrest_stub import start_stub
+        stub, args.url, state = start_stub(latency=args.stub_latency, failure_rate=args.stub_failure_rate,
+                                           max_batch=args.stub_max_batch)
+        args.key = args.key or "stub"
+        print(f"🧪 Usando PostgREST local em {args.url}")
+    elif not args.url or not args.key:
+        print("❌ ERRO: informe --url/--key ou configure SUPABASE_URL e SUPABASE_ANON_KEY (ou use --stub)")
+        sys.exit(1)
+
+    def rows():
+        for n in range(args.repeat):
+            for row in read_csv_rows(args.csv):
+                if n:
+                    row = dict(row, id_questao_origem=f"{row['id_questao_origem']}#{n}")
+                yield row
+
+    client = PostgrestClient(args.url, args.key)
+    stats = asyncio.run(upload_rows(rows(), client, concurrency=args.concurrency, batch_size=args.batch_size))
+    print_stats(stats)
+
+    if stub is not None:
+        print(f"→ Linhas na tabela local: {len(state.table(TABLE_NAME))} ({state.requests} requisições)")
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,39 @@
 #!/usr/bin/env python3
 import re
 import os
-import csv
+import sys
+import json
+import hashlib
+import argparse
+from bisect import bisect_left
+from operator import itemgetter
+from pathlib import Path
 import fitz  # PyMuPDF
+import numpy as np
+
+# Cache de extração compartilhado com o backend
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+from cache_extracao import ExtractionCache
+from buffer_pdf import PdfBuffer
+from imagens_saida import ImageSink
+from questao import QuestaoRow, write_csv_rows
 
 PDF_PATH = "Simulados-CEA-2024-JULHO.pdf"
 CSV_OUT  = "simulados.csv"
 IMG_DIR  = "imagens"
+# Diferenças em relação à execução anterior (novas, alteradas, removidas)
+DIFF_OUT = "simulados_diff.json"
+# Impressões digitais dos segmentos, linhas e imagens da última execução
+STATE_PATH = "simulados_estado.json"
+
+# Versão do formato dos dados de página; mudar invalida o cache
+EXTRACTOR_VERSION = "1"
+# Versão do formato do estado salvo; mudar faz a próxima execução tratar tudo como novo
+STATE_FORMAT = 3
 
-os.makedirs(IMG_DIR, exist_ok=True)
+# Colunas que ficam fora da comparação entre execuções: o `id` é só a posição
+# da questão no PDF e quem o atribui no banco é o próprio banco (o upload não o envia)
+UNCOMPARED_COLUMNS = ("id",)
 
 # ---------------- Tema por palavras-chave ----------------
 THEME_RULES = [
@@ -21,12 +46,64 @@ THEME_RULES = [
 ]
 FALLBACK_THEME = "Produtos e Investimentos"
 
+class ThemeClassifier:
+    """
+    Classificador de tema com as regras compiladas uma única vez.
+
+    Para contar acertos, todas as regras formam uma única alternância com um
+    grupo nomeado por tema, e cada texto é varrido uma vez. O tema escolhido é
+    sempre o da primeira regra (na ordem de THEME_RULES) que casa com o texto.
+    """
+    def __init__(self, rules=THEME_RULES, fallback=FALLBACK_THEME):
+        self.labels = [label for label, _pat in rules]
+        self.fallback = fallback
+        self.patterns = [re.compile(pat, re.IGNORECASE) for _label, pat in rules]
+        self.combined = re.compile(
+            "|".join(f"(?P<t{i}>{pat})" for i, (_label, pat) in enumerate(rules)),
+            re.IGNORECASE
+        )
+
+    def _scan(self, text):
+        t = (text or "").lower()
+        counts = [0] * len(self.labels)
+        for m in self.combined.finditer(t):
+            counts[int(m.lastgroup[1:])] += 1
+
+        first = next((i for i, c in enumerate(counts) if c), None)
+        if first is not None:
+            # Um acerto de regra anterior pode ficar escondido dentro de outro
+            # acerto (a varredura não sobrepõe); confere só essas regras
+            for i in range(first):
+                if self.patterns[i].search(t):
+                    first = i
+                    break
+        return first, counts
+
+    def classify(self, text: str) -> str:
+        # Sem contagem, parar no primeiro acerto em ordem de prioridade é mais barato
+        t = (text or "").lower()
+        for label, pat in zip(self.labels, self.patterns):
+            if pat.search(t):
+                return label
+        return self.fallback
+
+    def hits(self, text: str) -> dict:
+        _first, counts = self._scan(text)
+        return {label: c for label, c in zip(self.labels, counts) if c}
+
+    def classify_many(self, texts):
+        """Retorna [(tema, {tema: acertos})] para cada texto"""
+        results = []
+        for text in texts:
+            first, counts = self._scan(text)
+            label = self.labels[first] if first is not None else self.fallback
+            results.append((label, {lb: c for lb, c in zip(self.labels, counts) if c}))
+        return results
+
+THEME_CLASSIFIER = ThemeClassifier()
+
 def classify_theme(text: str) -> str:
-    t = (text or "").lower()
-    for label, pat in THEME_RULES:
-        if re.search(pat, t, flags=re.IGNORECASE):
-            return label
-    return FALLBACK_THEME
+    return THEME_CLASSIFIER.classify(text)
 
 # ---------------- Regexes ----------------
 # Âncora: número + [ID que pode ter letras/hífen] + enunciado
@@ -66,70 +143,207 @@ def get_page_images(page):
             infos.append({"xref": xref, "bbox": None, "width": i[2], "height": i[3]})
         return infos
 
+def read_page(page):
+    # Tudo o que o pipeline usa de uma página, em formato serializável
+    return {
+        "blocks": [list(b) for b in get_page_blocks(page)],
+        "images": [{k: v for k, v in info.items() if not isinstance(v, bytes)}
+                   for info in get_page_images(page)],
+        "text": page.get_text("text"),
+        "height": page.rect.height,
+    }
+
+class PdfSource:
+    """
+    Páginas e imagens do PDF, lidas do cache quando possível.
+    O PDF só é aberto se algum dado não estiver no cache; com use_mmap ele é
+    mapeado na memória em vez de lido para o heap.
+    """
+    def __init__(self, path, cache=None, use_mmap=False):
+        self.path = path
+        self.cache = cache
+        self.use_mmap = use_mmap
+        self._buffer = None
+        self.pdf_hash = cache.file_hash(path) if cache else None
+        self._doc = None
+        # xref -> hash, para imagens repetidas entre páginas; os bytes não ficam
+        # na memória: são lidos de novo (do cache ou do PDF) só na hora de gravar
+        self._digests = {}
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            if self.use_mmap:
+                self._buffer = PdfBuffer(self.path)
+                self._doc = fitz.open(stream=self._buffer.view, filetype="pdf")
+            else:
+                self._doc = fitz.open(self.path)
+        return self._doc
+
+    def load_pages(self):
+        if self.cache:
+            total = self.cache.get_json(self.pdf_hash, -1, "paginas")
+            if total is not None:
+                cached = self.cache.get_pages(self.pdf_hash, "pagina")
+                if len(cached) == total:
+                    return [json_loads(cached[p]) for p in range(total)]
+
+        pages = [read_page(self.doc[p]) for p in range(len(self.doc))]
+        if self.cache:
+            self.cache.put_many(self.pdf_hash, "pagina",
+                                [(p, json_dumps(pg)) for p, pg in enumerate(pages)])
+            self.cache.put_json(self.pdf_hash, -1, "paginas", len(pages))
+        return pages
+
+    def image_digest(self, page_num, xref):
+        digest = self._digests.get(xref)
+        if digest is None:
+            digest = self._digests[xref] = image_digest(self.extract_image(page_num, xref))
+        return digest
+
+    def extract_image(self, page_num, xref):
+        kind = f"imagem:{xref}"
+        if self.cache:
+            data = self.cache.get(self.pdf_hash, page_num, kind)
+            if data is not None:
+                return data
+        data = self.doc.extract_image(xref)["image"]
+        if self.cache:
+            self.cache.put(self.pdf_hash, page_num, kind, data)
+        return data
+
+    def close(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        if self._buffer is not None:
+            self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def json_dumps(value):
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+def json_loads(data):
+    return json.loads(data.decode("utf-8"))
+
 def is_qrcode_like(width, height):
-    ratio = width / float(height or 1)
-    return (0.85 <= ratio <= 1.15) and (min(width, height) <= 500)
+    # Funciona com números ou com arrays NumPy (uma resposta por imagem)
+    width = np.asarray(width, dtype=float)
+    height = np.asarray(height, dtype=float)
+    ratio = width / np.where(height == 0, 1.0, height)
+    return (0.85 <= ratio) & (ratio <= 1.15) & (np.minimum(width, height) <= 500)
 
-def collect_text_between(all_blocks, start, end):
-    (sp, sy) = start
-    (ep, ey) = end
+class PageIndex:
+    """
+    Blocos de texto de cada página ordenados por y, montado uma vez.
+    Cada segmento sai de um bisect + fatia por página, em vez de percorrer
+    de novo todos os blocos das páginas que ele cobre.
+    """
+    def __init__(self, pages):
+        self.block_ys, self.blocks = [], []
+        for pg in pages:
+            # (y0, ordem original, texto)
+            blocks = sorted((b[1], i, b[4]) for i, b in enumerate(pg["blocks"]) if b[4])
+            self.block_ys.append([b[0] for b in blocks])
+            self.blocks.append(blocks)
+
+    def blocks_between(self, p, start, end):
+        # Blocos da página p com y em [sy, ey) conforme a posição da página no segmento,
+        # na ordem original da página
+        (sp, sy) = start
+        (ep, ey) = end
+        ys = self.block_ys[p]
+        lo = bisect_left(ys, sy) if p == sp else 0
+        hi = bisect_left(ys, ey) if p == ep else len(ys)
+        return sorted(self.blocks[p][lo:hi], key=itemgetter(1))
+
+class ImageTable:
+    """
+    Todas as imagens do documento em colunas NumPy (página, ordem na página,
+    centro y, tem bbox, xref, largura, altura), já sem as de rodapé e as com
+    cara de QR code. As imagens são distribuídas entre os segmentos de uma vez
+    (assign), sem decodificar nenhuma: extract_image só roda para as escolhidas.
+    """
+    def __init__(self, pages):
+        page, order, center_y, has_bbox, xref, width, height = [], [], [], [], [], [], []
+        page_h = []
+        for p, pg in enumerate(pages):
+            for i, info in enumerate(pg["images"]):
+                bbox = info.get("bbox")
+                page.append(p)
+                order.append(i)
+                page_h.append(pg["height"])
+                has_bbox.append(bbox is not None)
+                # Sem bbox, a imagem fica no meio da página
+                center_y.append((bbox[1] + bbox[3]) / 2.0 if bbox is not None else pg["height"] / 2)
+                xref.append(info.get("xref") or 0)
+                width.append(info.get("width", 0))
+                height.append(info.get("height", 0))
+
+        center_y = np.array(center_y, dtype=float)
+        width = np.array(width, dtype=np.int64)
+        height = np.array(height, dtype=np.int64)
+        # Filtros que não dependem do segmento: rodapé e QR code
+        keep = (center_y / np.array(page_h, dtype=float) <= 0.85) & ~is_qrcode_like(width, height)
+
+        self.page = np.array(page, dtype=np.int64)[keep]
+        self.order = np.array(order, dtype=np.int64)[keep]
+        self.center_y = center_y[keep]
+        self.has_bbox = np.array(has_bbox, dtype=bool)[keep]
+        self.xref = np.array(xref, dtype=np.int64)[keep]
+        self.width = width[keep]
+        self.height = height[keep]
+
+    def __len__(self):
+        return len(self.page)
+
+    def assign(self, segments):
+        """
+        Imagens de cada segmento, [(página, xref, largura, altura)] na ordem
+        (página, ordem original). Um segmento vai do seu início (página, y) até
+        o início do próximo; o NumPy ordena complexos pela parte real e depois
+        pela imaginária, então (página, y) vira página + y·j e um searchsorted
+        acha o segmento de todas as imagens de uma vez.
+        """
+        if not segments or not len(self):
+            return [[] for _ in segments]
+
+        starts = np.array([complex(*seg["start"]) for seg in segments])
+        seg = np.searchsorted(starts, self.page + 1j * self.center_y, side="right") - 1
+
+        # Sem bbox só dá para situar a imagem em segmentos de uma página
+        single_page = np.array([seg["start"][0] == seg["end"][0] for seg in segments])
+        selected = (seg >= 0) & (self.has_bbox | single_page[np.maximum(seg, 0)])
+
+        rows = np.flatnonzero(selected)
+        rows = rows[np.lexsort((self.order[rows], self.page[rows], seg[rows]))]
+        bounds = np.searchsorted(seg[rows], np.arange(len(segments) + 1)).tolist()
+        # Convertidas para listas uma vez só; cada segmento recebe uma fatia
+        found = list(zip(self.page[rows].tolist(), self.xref[rows].tolist(),
+                         self.width[rows].tolist(), self.height[rows].tolist()))
+        return [found[bounds[i]:bounds[i + 1]] for i in range(len(segments))]
+
+def collect_text_between(index, start, end):
+    (sp, _sy) = start
+    (ep, _ey) = end
     texts = []
     for p in range(sp, ep + 1):
-        blocks = all_blocks[p]
-        for (x0, y0, x1, y1, text, *_rest) in blocks:
-            if not text:
-                continue
-            if sp == ep:
-                cond = (y0 >= sy and y0 < ey)
-            elif p == sp:
-                cond = (y0 >= sy)
-            elif p == ep:
-                cond = (y0 < ey)
-            else:
-                cond = True
-            if cond:
-                texts.append(text)
+        texts.extend(text for (_y0, _i, text) in index.blocks_between(p, start, end))
     return "\n".join(texts)
 
-def collect_images_between(doc, start, end):
-    (sp, sy) = start
-    (ep, ey) = end
+def collect_images(source, candidates):
+    """Hash só das imagens escolhidas para o segmento: [(página, xref, hash, largura, altura)]"""
     found = []
-    for p in range(sp, ep + 1):
-        page = doc[p]
-        infos = get_page_images(page)
-        page_h = page.rect.height
-        for info in infos:
-            xref = info.get("xref")
-            bbox = info.get("bbox")
-            width = info.get("width", 0)
-            height = info.get("height", 0)
-
-            if bbox is None:
-                if sp != ep:
-                    continue
-                center_y = page_h / 2
-            else:
-                _, y0, _, y1 = bbox
-                center_y = (y0 + y1) / 2.0
-
-            if sp == ep and not (center_y >= sy and center_y < ey):
-                continue
-            if p == sp and ep != sp and center_y < sy:
-                continue
-            if p == ep and ep != sp and center_y >= ey:
-                continue
-
-            if (center_y / page_h) > 0.85:
-                continue
-            if is_qrcode_like(width, height):
-                continue
-
-            try:
-                base = doc.extract_image(xref)
-                found.append((p, xref, base["image"], width, height))
-            except Exception:
-                pass
+    for p, xref, width, height in candidates:
+        try:
+            found.append((p, xref, source.image_digest(p, xref), width, height))
+        except Exception:
+            pass
     return found
 
 def normalize_spaces(s: str) -> str:
@@ -220,36 +434,119 @@ def parse_segment_text(segment_text):
 
     return id_orig, enunciado, alt_a, alt_b, alt_c, alt_d
 
-def extract_all():
-    with fitz.open(PDF_PATH) as doc:
-        all_blocks = [get_page_blocks(doc[p]) for p in range(len(doc))]
-        anchors = []
-        for p in range(len(doc)):
-            for (x0, y0, x1, y1, text, *_rest) in all_blocks[p]:
-                if not text:
-                    continue
-                for ln in text.split("\n"):
-                    s = ln.strip()
-                    if s and ANCHOR_RE.match(s):
-                        anchors.append({"page": p, "y0": y0, "start_line": s})
-        anchors.sort(key=lambda a: (a["page"], a["y0"]))
-
-        segments = []
-        for i, a in enumerate(anchors):
-            start = (a["page"], a["y0"])
-            if i < len(anchors) - 1:
-                nxt = anchors[i + 1]
-                end = (nxt["page"], nxt["y0"])
-            else:
-                end = (len(doc) - 1, float("inf"))
-            segments.append({"start": start, "end": end})
+def find_segments(pages):
+    """Segmentos {start, end} de cada questão, de uma âncora "NN [ID]" até a próxima"""
+    anchors = []
+    for p, pg in enumerate(pages):
+        for (x0, y0, x1, y1, text, *_rest) in pg["blocks"]:
+            if not text:
+                continue
+            for ln in text.split("\n"):
+                s = ln.strip()
+                if s and ANCHOR_RE.match(s):
+                    anchors.append({"page": p, "y0": y0, "start_line": s})
+    anchors.sort(key=lambda a: (a["page"], a["y0"]))
+
+    segments = []
+    for i, a in enumerate(anchors):
+        start = (a["page"], a["y0"])
+        if i < len(anchors) - 1:
+            nxt = anchors[i + 1]
+            end = (nxt["page"], nxt["y0"])
+        else:
+            end = (len(pages) - 1, float("inf"))
+        segments.append({"start": start, "end": end})
+    return segments
+
+def image_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def segment_fingerprint(raw, image_digests):
+    """Identidade do conteúdo de um segmento: texto e hash de cada imagem, na ordem"""
+    h = hashlib.sha256(raw.encode("utf-8"))
+    for digest in image_digests:
+        h.update(b"\0" + digest.encode("ascii"))
+    return h.hexdigest()
+
+def row_fingerprint(row):
+    """Identidade de uma linha do CSV, sem as colunas que o banco atribui"""
+    content = {col: value for col, value in row.items() if col not in UNCOMPARED_COLUMNS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def row_fingerprints(rows):
+    """{id_questao_origem: impressão digital} das linhas; a primeira de cada id vale, como no upload"""
+    current = {}
+    for q in rows:
+        if q.id_questao_origem not in current:
+            current[q.id_questao_origem] = row_fingerprint(q.to_csv())
+    return current
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if state.get("versao") != EXTRACTOR_VERSION or state.get("formato") != STATE_FORMAT:
+        return None
+    return state
+
+def save_state(state, path=STATE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def diff_rows(previous, current):
+    """Compara {id_questao_origem: impressão digital da linha} da execução anterior com a atual"""
+    return {
+        "adicionadas": [k for k in current if k not in previous],
+        "alteradas": [k for k in current if k in previous and previous[k] != current[k]],
+        "removidas": [k for k in previous if k not in current],
+    }
+
+def sync_image_files(source, images, previous, sink, img_dir=IMG_DIR):
+    """
+    Envia ao sink (que grava em paralelo) só as imagens novas ou com conteúdo
+    diferente (ou que sumiram do disco) e apaga as que não pertencem mais a
+    nenhuma questão. Os bytes de cada imagem são lidos da fonte só aqui, um
+    de cada vez (a fila do sink é limitada).
+    images: {arquivo: (hash, página, xref)}; previous: {arquivo: hash}
+    """
+    written, removed = [], []
+    for name, (digest, page_num, xref) in images.items():
+        path = os.path.join(img_dir, name)
+        if previous.get(name) == digest and os.path.exists(path):
+            continue
+        sink.submit(path, data=source.extract_image(page_num, xref))
+        written.append(name)
+    for name in previous:
+        if name not in images:
+            try:
+                os.remove(os.path.join(img_dir, name))
+            except FileNotFoundError:
+                pass
+            removed.append(name)
+    return written, removed
+
+def extract_all(use_cache=True, use_mmap=False, full=False, image_workers=4,
+                optimize_images=False, max_image_size=None):
+    os.makedirs(IMG_DIR, exist_ok=True)
+    cache = ExtractionCache(f"extrair_simulados-{EXTRACTOR_VERSION}") if use_cache else None
+    # Estado da execução anterior: segmentos já interpretados, linhas e imagens gravadas
+    state = None if full else load_state()
+    state = state or {"versao": EXTRACTOR_VERSION, "segmentos": {}, "linhas": {}, "imagens": {}}
+    with PdfSource(PDF_PATH, cache, use_mmap) as source:
+        pages = source.load_pages()
+        index = PageIndex(pages)
+        segments = find_segments(pages)
+        segment_images = ImageTable(pages).assign(segments)
 
         # Gabarito
         gabaritos = {}
         current_sim = None
-        for p in range(len(doc)):
-            text = doc[p].get_text("text")
-            for line in text.split("\n"):
+        for pg in pages:
+            for line in pg["text"].split("\n"):
                 head = GAB_SIM_HEAD.search(line)
                 if head:
                     current_sim = int(head.group(1))
@@ -260,59 +557,121 @@ def extract_all():
                         gabaritos[current_sim][int(num)] = letter.upper().strip()
 
         rows = []
+        images = {}  # arquivo -> (hash, página, xref); um id repetido sobrescreve, como no disco
+        parsed_segments = {}
+        # Segmentos interpretados agora: o tema sai depois, em um único classify_many
+        unclassified = []
         for i, seg in enumerate(segments):
-            raw = collect_text_between(all_blocks, seg["start"], seg["end"])
-            parsed = parse_segment_text(raw)
-            if not parsed:
-                continue
-            id_orig, enunciado, a, b, c, d = parsed
+            raw = collect_text_between(index, seg["start"], seg["end"])
+            imgs = collect_images(source, segment_images[i])
+            digests = [digest for (_p, _xref, digest, _w, _h) in imgs]
+
+            # Segmento com o mesmo conteúdo da execução anterior: reaproveita a interpretação
+            fingerprint = segment_fingerprint(raw, digests)
+            parsed = state["segmentos"].get(fingerprint)
+            if parsed is None:
+                parsed = parse_segment_text(raw)
+                if not parsed:
+                    continue
+                parsed = [*parsed, None]
+                unclassified.append((len(rows), parsed))
+            parsed_segments[fingerprint] = parsed
+            id_orig, enunciado, a, b, c, d, tema = parsed
 
-            imgs = collect_images_between(doc, seg["start"], seg["end"])
             ha_img = (len(imgs) > 0)
-            for idx, (_p, _xref, img_bytes, _w, _h) in enumerate(imgs):
+            for idx, (p, xref, digest, _w, _h) in enumerate(imgs):
                 base = id_orig if idx == 0 else (id_orig[:-1] + f"_{idx}]")
-                with open(os.path.join(IMG_DIR, f"{base}.png"), "wb") as f:
-                    f.write(img_bytes)
+                images[f"{base}.png"] = (digest, p, xref)
 
             qid = len(rows) + 1
             simulado_numero = (qid - 1) // 70 + 1
-            tema = classify_theme(" ".join([enunciado or "", a or "", b or "", c or "", d or ""]))
-
-            rows.append({
-                "id": qid,
-                "id_questao_origem": id_orig,
-                "tema": tema,
-                "enunciado": enunciado,
-                "alternativa_a": a,
-                "alternativa_b": b,
-                "alternativa_c": c,
-                "alternativa_d": d,
-                "resposta_correta": "",
-                "ha_imagem": "SIM" if ha_img else "NAO",
-                "comentario": "",
-                "simulado_numero": simulado_numero
-            })
+
+            rows.append(QuestaoRow(
+                id=qid,
+                id_questao_origem=id_orig,
+                tema=tema,
+                enunciado=enunciado,
+                alternativa_a=a,
+                alternativa_b=b,
+                alternativa_c=c,
+                alternativa_d=d,
+                resposta_correta="",
+                ha_imagem=ha_img,
+                comentario="",
+                simulado_numero=simulado_numero
+            ))
+
+        texts = [" ".join(part or "" for part in parsed[1:6]) for _row, parsed in unclassified]
+        for (row, parsed), (tema, _hits) in zip(unclassified, THEME_CLASSIFIER.classify_many(texts)):
+            parsed[6] = rows[row].tema = tema
 
         # Preenche gabarito
         for q in rows:
-            sim = q["simulado_numero"]
-            within = ((q["id"] - 1) % 70) + 1
-            q["resposta_correta"] = gabaritos.get(sim, {}).get(within, "")
-
-        # CSV (sobrescreve)
-        header = ["id","id_questao_origem","tema","enunciado",
-                  "alternativa_a","alternativa_b","alternativa_c","alternativa_d",
-                  "resposta_correta","ha_imagem","comentario","simulado_numero"]
-        with open(CSV_OUT, "w", encoding="utf-8", newline="") as f:
-            wr = csv.DictWriter(f, fieldnames=header)
-            wr.writeheader()
-            for r in rows:
-                wr.writerow(r)
-
-        print("✅ Extração concluída (alternativas robustas).")
-        print(f"→ CSV sobrescrito: {CSV_OUT}")
-        print(f"→ Imagens: {IMG_DIR}/")
+            sim = q.simulado_numero
+            within = ((q.id - 1) % 70) + 1
+            q.resposta_correta = gabaritos.get(sim, {}).get(within, "")
+
+        # Opções de gravação diferentes das da última execução regravam todas as imagens
+        image_options = {"otimizar": optimize_images, "tamanho_maximo": max_image_size}
+        previous_images = state["imagens"] if state.get("opcoes_imagens", image_options) == image_options else {}
+        with ImageSink(workers=image_workers, image_format="png" if optimize_images else None,
+                       max_dimension=max_image_size) as sink:
+            written, removed = sync_image_files(source, images, previous_images, sink)
+        image_stats = sink.stats()
+        # Uma imagem que não foi gravada não conta como gravada nem entra no
+        # estado: a próxima execução tenta de novo
+        failed_paths = sink.failed_paths()
+        failed_images = sorted(name for name in written if os.path.join(IMG_DIR, name) in failed_paths)
+        written = [name for name in written if name not in failed_images]
+
+    # Só o que mudou desde a execução anterior, por id_questao_origem. Gabarito e
+    # simulado_numero entram na comparação: uma errata de gabarito, ou as questões
+    # que mudaram de simulado depois de uma inserção, precisam chegar ao banco
+    current = row_fingerprints(rows)
+    diff = diff_rows(state["linhas"], current)
+    diff["imagens_gravadas"] = written
+    diff["imagens_removidas"] = removed
+    diff["imagens_com_erro"] = failed_images
+
+    changed = diff["adicionadas"] or diff["alteradas"] or diff["removidas"]
+    if changed or not os.path.exists(CSV_OUT):
+        write_csv_rows(CSV_OUT, rows)
+    with open(DIFF_OUT, "w", encoding="utf-8") as f:
+        json.dump(diff, f, ensure_ascii=False, indent=2)
+    save_state({
+        "versao": EXTRACTOR_VERSION,
+        "formato": STATE_FORMAT,
+        "segmentos": parsed_segments,
+        "linhas": current,
+        "imagens": {name: digest for name, (digest, _p, _xref) in images.items() if name not in failed_images},
+        "opcoes_imagens": image_options,
+    })
+
+    print("✅ Extração concluída (alternativas robustas).")
+    print(f"→ Questões: {len(diff['adicionadas'])} novas, {len(diff['alteradas'])} alteradas, "
+          f"{len(diff['removidas'])} removidas ({len(current) - len(diff['adicionadas']) - len(diff['alteradas'])} sem mudança)")
+    print(f"→ Diferenças: {DIFF_OUT}")
+    print(f"→ CSV {'regravado' if changed else 'sem mudança'}: {CSV_OUT}")
+    print(f"→ Imagens: {IMG_DIR}/ ({len(written)} gravadas, {len(removed)} removidas"
+          f"{f', {len(failed_images)} com erro' if failed_images else ''})")
+    if written:
+        print(f"→ Gravação: {image_stats['imagens_por_segundo'] or 0:.0f} imagens/s, "
+              f"{image_stats['bytes_economizados'] / 1024:.0f} KB economizados, {image_stats['erros']} erros")
+    return diff
 
 if __name__ == "__main__":
-    extract_all()
+    parser = argparse.ArgumentParser(description="Extrai as questões dos simulados CEA para CSV e imagens")
+    parser.add_argument("--no-cache", action="store_true", help="Não usa o cache de extração")
+    parser.add_argument("--mmap", action="store_true", help="Abre o PDF por mmap em vez de lê-lo para a memória")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignora o estado da execução anterior e regrava CSV e imagens")
+    parser.add_argument("--image-workers", type=int, default=4, help="Threads que gravam as imagens")
+    parser.add_argument("--optimize-images", action="store_true",
+                        help="Recodifica as imagens como PNG otimizado")
+    parser.add_argument("--max-image-size", type=int, default=None, metavar="PIXELS",
+                        help="Reduz as imagens para que o maior lado tenha no máximo PIXELS")
+    args = parser.parse_args()
+    extract_all(use_cache=not args.no_cache, use_mmap=args.mmap, full=args.full,
+                image_workers=args.image_workers, optimize_images=args.optimize_images,
+                max_image_size=args.max_image_size)
 
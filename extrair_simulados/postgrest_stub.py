@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Substituto local do endpoint PostgREST do Supabase, para testar e medir o
+upload sem rede.
+
+Implementa só o que os scripts de upload usam:
+- POST /rest/v1/<tabela>                       insere (409 se a chave repetir)
+- POST /rest/v1/<tabela>?on_conflict=<coluna>  upsert pela coluna
+
+Como no banco, `id` é a chave primária: linhas sem `id` recebem o próximo
+valor da sequência (o upsert mantém o `id` da linha existente) e um `id`
+já usado por outra linha é recusado com 409.
+- GET  /rest/v1/<tabela>                       devolve as linhas (Content-Range com o total)
+- DELETE /rest/v1/<tabela>                     apaga tudo
+- DELETE /rest/v1/<tabela>?<coluna>=in.(...)   apaga as linhas com essas chaves
+
+Latência, taxa de falhas (503) e tamanho máximo de lote (413) são
+configuráveis para exercitar retentativas e o ajuste do tamanho dos lotes.
+
+Uso:
+    python postgrest_stub.py --port 8787 --latency 0.05 --failure-rate 0.1
+"""
+import csv
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubState:
+    def __init__(self, latency=0.0, failure_rate=0.0, max_batch=None, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_batch = max_batch
+        self.tables = {}  # tabela -> {id: linha}
+        self.sequences = {}  # tabela -> próximo id gerado
+        self.indexes = {}  # (tabela, coluna) -> {valor: id}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    def table(self, name):
+        return self.tables.setdefault(name, {})
+
+    def index(self, name, column):
+        key = (name, column)
+        if key not in self.indexes:
+            self.indexes[key] = {row.get(column): row_id for row_id, row in self.table(name).items()}
+        return self.indexes[key]
+
+    def _store(self, name, row_id, row):
+        self.table(name)[row_id] = row
+        for (table_name, column), index in self.indexes.items():
+            if table_name == name:
+                index[row.get(column)] = row_id
+
+    def _remove(self, name, row_id):
+        row = self.table(name).pop(row_id, None)
+        if row is None:
+            return
+        for (table_name, column), index in self.indexes.items():
+            if table_name == name and index.get(row.get(column)) == row_id:
+                del index[row.get(column)]
+
+    def write(self, name, rows, on_conflict=None):
+        """
+        Insere (ou faz upsert por `on_conflict`) as linhas de uma vez; nada é
+        aplicado se alguma violar a chave. Retorna (status, mensagem).
+        """
+        table = self.table(name)
+        key_col = on_conflict or "id"
+        keys = [row.get(key_col) for row in rows]
+        if on_conflict and len(set(keys)) != len(keys):
+            return 400, "ON CONFLICT não pode afetar a mesma linha duas vezes"
+        index = self.index(name, on_conflict) if on_conflict else {}
+
+        next_id = self.sequences.get(name, 1)
+        plan = []  # (id existente ou None, id final, linha)
+        claimed = set()
+        for key, row in zip(keys, rows):
+            existing = index.get(key) if on_conflict else None
+            if existing is not None:
+                row_id = row.get("id", existing)
+            elif "id" in row:
+                row_id = row["id"]
+            else:
+                row_id, next_id = next_id, next_id + 1
+            # A chave primária não pode repetir: nem em outra linha da tabela, nem no lote
+            if row_id in claimed or (row_id in table and row_id != existing):
+                return 409, f"chave duplicada: id={row_id} ({name}_pkey)"
+            claimed.add(row_id)
+            plan.append((existing, row_id, row))
+
+        for existing, row_id, row in plan:
+            merged = dict(table.get(existing, {}) if existing is not None else {}, **row)
+            merged["id"] = row_id
+            if existing is not None:
+                self._remove(name, existing)
+            self._store(name, row_id, merged)
+        self.sequences[name] = next_id
+        return 201, None
+
+    def delete(self, name, column=None, keys=None):
+        """Apaga as linhas com `column` em `keys` (ou todas, sem coluna)"""
+        if column is None:
+            self.table(name).clear()
+            self.indexes = {k: v for k, v in self.indexes.items() if k[0] != name}
+            return
+        index = self.index(name, column)
+        for key in keys:
+            row_id = index.get(key)
+            if row_id is not None:
+                self._remove(name, row_id)
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _table_name(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            if len(parts) != 3 or parts[:2] != ["rest", "v1"]:
+                return None
+            return parts[2]
+
+        def _reply(self, status, body=None, headers=None):
+            data = json.dumps(body).encode("utf-8") if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _simulate(self):
+            # Latência e falhas transitórias; retorna False se a requisição "falhou"
+            with state.lock:
+                state.requests += 1
+                fail = state.random.random() < state.failure_rate
+            if state.latency:
+                time.sleep(state.latency)
+            if fail:
+                self._reply(503, {"message": "stub: falha simulada"})
+                return False
+            return True
+
+        def do_POST(self):
+            name = self._table_name()
+            if name is None:
+                return self._reply(404, {"message": "rota desconhecida"})
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                rows = json.loads(self.rfile.read(length) or b"[]")
+            except ValueError:
+                return self._reply(400, {"message": "JSON inválido"})
+            if isinstance(rows, dict):
+                rows = [rows]
+            if not self._simulate():
+                return
+            if state.max_batch and len(rows) > state.max_batch:
+                return self._reply(413, {"message": f"lote maior que {state.max_batch}"})
+
+            on_conflict = parse_qs(urlparse(self.path).query).get("on_conflict", [None])[0]
+            with state.lock:
+                status, message = state.write(name, rows, on_conflict)
+            if message:
+                return self._reply(status, {"message": message})
+            self._reply(status)
+
+        def do_GET(self):
+            name = self._table_name()
+            if name is None:
+                return self._reply(404, {"message": "rota desconhecida"})
+            with state.lock:
+                rows = list(state.table(name).values())
+            self._reply(200, rows, {"Content-Range": f"0-{max(len(rows) - 1, 0)}/{len(rows)}"})
+
+        def do_DELETE(self):
+            name = self._table_name()
+            if name is None:
+                return self._reply(404, {"message": "rota desconhecida"})
+            filters = parse_qs(urlparse(self.path).query)
+            with state.lock:
+                if not filters:
+                    state.delete(name)
+                for col, (value, *_rest) in filters.items():
+                    # Só o filtro in.("a","b") por coluna-chave, que é o que o upload usa
+                    if not (value.startswith("in.(") and value.endswith(")")):
+                        return self._reply(400, {"message": f"filtro não suportado: {value}"})
+                    state.delete(name, col, next(csv.reader([value[4:-1]], escapechar="\\"), []))
+            self._reply(204)
+
+    return Handler
+
+
+def start_stub(host="127.0.0.1", port=0, **options):
+    """Sobe o substituto em uma thread; retorna (servidor, url_base, estado)"""
+    state = StubState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return server, url, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Substituto local do PostgREST para testes de upload")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência por requisição (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fração de requisições com 503")
+    parser.add_argument("--max-batch", type=int, default=None, help="Recusa lotes maiores (413)")
+    args = parser.parse_args()
+
+    server, url, _state = start_stub(args.host, args.port, latency=args.latency,
+                                     failure_rate=args.failure_rate, max_batch=args.max_batch)
+    print(f"🧪 PostgREST local em {url}/rest/v1/ (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Modelo de linha da tabela `questoes`, compartilhado entre a extração
+(extrair_simulados.py, que grava o CSV) e o upload (upload_supabase.py,
+que lê o CSV).
+
+Cada coluna tem um conversor de texto do CSV para o tipo do banco; a linha
+usa __slots__ para ocupar pouca memória, e o leitor devolve uma linha por
+vez, então o consumo não cresce com o tamanho do CSV.
+"""
+import csv
+from typing import Any, Dict, Iterator
+
+COLUMNS = [
+    "id", "id_questao_origem", "tema", "enunciado",
+    "alternativa_a", "alternativa_b", "alternativa_c", "alternativa_d",
+    "resposta_correta", "ha_imagem", "comentario", "simulado_numero",
+]
+
+NULLS = (None, "", "NULL", "null")
+
+
+def to_int(value):
+    if value in NULLS:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def to_bool(value):
+    # 'SIM'/'S'/'sim' -> True; qualquer outra coisa -> False
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().upper().startswith("S")
+
+
+# Colunas sem conversor ficam como texto
+CONVERTERS = {
+    "id": to_int,
+    "simulado_numero": to_int,
+    "ha_imagem": to_bool,
+}
+
+
+class QuestaoRow:
+    __slots__ = tuple(COLUMNS) + ("extra",)
+
+    def __init__(self, **values):
+        for col in COLUMNS:
+            setattr(self, col, values.pop(col, ""))
+        # Colunas que não fazem parte do modelo seguem intactas até o upload
+        self.extra = values
+
+    @classmethod
+    def from_csv(cls, raw: Dict[str, str]) -> "QuestaoRow":
+        values = dict(raw)
+        for col, convert in CONVERTERS.items():
+            if col in values:
+                values[col] = convert(values[col])
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Valores tipados, prontos para JSON/PostgREST"""
+        data = {col: getattr(self, col) for col in COLUMNS}
+        data.update(self.extra)
+        return data
+
+    def to_csv(self) -> Dict[str, Any]:
+        """Valores no formato do CSV (ha_imagem como SIM/NAO)"""
+        data = self.to_dict()
+        data["ha_imagem"] = "SIM" if self.ha_imagem is True else ("NAO" if self.ha_imagem is False else self.ha_imagem)
+        return data
+
+    def __repr__(self):
+        return f"QuestaoRow(id={self.id!r}, id_questao_origem={self.id_questao_origem!r})"
+
+
+def iter_csv_rows(path: str) -> Iterator[QuestaoRow]:
+    """Lê o CSV linha a linha, já convertendo os tipos"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for raw in csv.DictReader(f):
+            yield QuestaoRow.from_csv(raw)
+
+
+def write_csv_rows(path: str, rows) -> int:
+    """Grava as linhas (qualquer iterável de QuestaoRow) no CSV; retorna o total"""
+    total = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        wr = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        wr.writeheader()
+        for row in rows:
+            wr.writerow(row.to_csv())
+            total += 1
+    return total
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Testes da extração dos simulados
+================================
+
+Usa o simulados.csv versionado ao lado deste script, sem precisar do PDF.
+"""
+
+import os
+import re
+from pathlib import Path
+
+from extrair_simulados import (FALLBACK_THEME, THEME_CLASSIFIER, THEME_RULES, ThemeClassifier,
+                               diff_rows, row_fingerprints)
+from questao import iter_csv_rows
+
+CSV_PATH = Path(__file__).resolve().parent / "simulados.csv"
+
+
+def load_rows():
+    return list(iter_csv_rows(str(CSV_PATH)))
+
+
+def test_answer_key_errata_diff():
+    """Uma errata que só muda o gabarito de uma questão aparece no diff"""
+    print("🧪 Testando diff de errata de gabarito...")
+
+    rows = load_rows()
+    previous = row_fingerprints(rows)
+
+    target = next(q for q in rows if q.resposta_correta)
+    target.resposta_correta = "A" if target.resposta_correta != "A" else "B"
+    diff = diff_rows(previous, row_fingerprints(rows))
+
+    print(f"   📝 Alterada: {diff['alteradas']}")
+    assert diff["alteradas"] == [target.id_questao_origem]
+    assert diff["adicionadas"] == [] and diff["removidas"] == []
+
+    # O id é atribuído pelo banco: renumerar as linhas não altera nada
+    for q in rows:
+        q.id += 1
+    assert diff_rows(previous, row_fingerprints(rows))["alteradas"] == [target.id_questao_origem]
+
+
+def classify_theme_loop(text, rules=THEME_RULES, fallback=FALLBACK_THEME):
+    """O classificador original: um re.search por regra, na ordem"""
+    t = (text or "").lower()
+    for label, pat in rules:
+        if re.search(pat, t, flags=re.IGNORECASE):
+            return label
+    return fallback
+
+
+def test_classify_many_matches_loop():
+    """classify_many dá o mesmo tema do laço de re.search nos textos do CSV"""
+    print("\n🧪 Testando classify_many contra o classificador original...")
+
+    texts = [" ".join([q.enunciado, q.alternativa_a, q.alternativa_b, q.alternativa_c, q.alternativa_d])
+             for q in load_rows()]
+    # Recortes menores também, para exercitar textos com menos regras
+    texts += [text[:n] for text in texts for n in (40, 120)]
+    expected = [classify_theme_loop(text) for text in texts]
+    results = THEME_CLASSIFIER.classify_many(texts)
+
+    print(f"   📝 {len(texts)} textos, {len(set(expected))} temas")
+    assert [label for label, _hits in results] == expected
+    assert [THEME_CLASSIFIER.classify(text) for text in texts] == expected
+    # O tema vem sempre com pelo menos um acerto, a não ser no tema padrão
+    assert all(hits or label == FALLBACK_THEME for label, hits in results)
+
+
+def test_classify_many_overlapping_rules():
+    """Um acerto de regra anterior escondido dentro de outro ainda decide o tema"""
+    print("\n🧪 Testando regras que se sobrepõem...")
+
+    rules = [("Fundos", r"\bfundo\b"), ("Extrato", r"\bsaldo do fundo\b"),
+             ("Renda", r"\brenda( fixa)?\b")]
+    classifier = ThemeClassifier(rules, fallback="Outros")
+    texts = [
+        "saldo do fundo",              # 'fundo' só aparece dentro do acerto de Extrato
+        "o saldo do fundo de renda",   # idem, com outra regra depois
+        "renda fixa e fundo",          # a ordem no texto não importa, só a das regras
+        "saldo do",                    # nenhuma regra
+        "",
+    ]
+    results = classifier.classify_many(texts)
+    assert [label for label, _hits in results] == [classify_theme_loop(t, rules, "Outros") for t in texts]
+    assert [label for label, _hits in results] == ["Fundos", "Fundos", "Fundos", "Outros", "Outros"]
+    assert results[1][1] == {"Extrato": 1, "Renda": 1} and classifier.hits("renda fixa e fundo") == {
+        "Fundos": 1, "Renda": 1}
+
+    # Nas regras reais, siglas de temas diferentes no mesmo texto
+    text = "A CVM regula fundos e a Selic influencia o mercado"
+    assert THEME_CLASSIFIER.classify_many([text])[0][0] == classify_theme_loop(text)
+    assert THEME_CLASSIFIER.hits(text) == {"Sistema Financeiro e Regulação": 1, "Produtos e Investimentos": 1,
+                                           "Mercado Financeiro e Economia": 2}
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("🧪 EXECUTANDO TESTES DA EXTRAÇÃO DOS SIMULADOS")
+    print("=" * 50)
+
+    tests = [
+        ("Errata de Gabarito", test_answer_key_errata_diff),
+        ("Temas em Lote", test_classify_many_matches_loop),
+        ("Regras Sobrepostas", test_classify_many_overlapping_rules),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append(True)
+            print(f"\n{test_name}: ✅ PASSOU")
+        except AssertionError:
+            print(f"\n{test_name}: ❌ FALHOU")
+            results.append(False)
+        except Exception as e:
+            print(f"\n{test_name}: ❌ ERRO - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print("📊 RESUMO DOS TESTES")
+    print("=" * 50)
+
+    passed = sum(results)
+    total = len(results)
+
+    print(f"Testes executados: {total}")
+    print(f"Testes passou: {passed}")
+    print(f"Taxa de sucesso: {passed/total*100:.1f}%")
+
+    if passed != total:
+        print(f"\n⚠️  {total-passed} teste(s) falharam.")
+
+
+if __name__ == "__main__":
+    os.chdir(Path(__file__).resolve().parent)
+    run_all_tests()
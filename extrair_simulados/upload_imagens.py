@@ -1,71 +1,187 @@
 #!/usr/bin/env python3
 import os
-import mimetypes
 import sys
-from supabase import create_client, Client
+import json
+import hashlib
+import argparse
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # CONFIG - Usar variáveis de ambiente para credenciais
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    print("❌ ERRO: Variáveis de ambiente SUPABASE_URL e SUPABASE_ANON_KEY são obrigatórias")
-    print("Configure-as antes de executar este script:")
-    print("export SUPABASE_URL='sua_url_aqui'")
-    print("export SUPABASE_ANON_KEY='sua_chave_aqui'")
-    sys.exit(1)
-
 TABLE_NAME = "questoes"
 BUCKET = "questoes-images"
 LOCAL_DIR = "imagens"
+# O que já foi enviado: caminho remoto -> hash, tamanho, mtime e URL pública
+MANIFEST_PATH = "imagens_enviadas.json"
+# Diferenças da última extração (extrair_simulados.py)
+DIFF_PATH = "simulados_diff.json"
+WORKERS = 8
+
+def require_env():
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        print("❌ ERRO: Variáveis de ambiente SUPABASE_URL e SUPABASE_ANON_KEY são obrigatórias")
+        print("Configure-as antes de executar este script:")
+        print("export SUPABASE_URL='sua_url_aqui'")
+        print("export SUPABASE_ANON_KEY='sua_chave_aqui'")
+        sys.exit(1)
 
 def sanitize_filename(id_questao):
     clean = id_questao.strip("[]")       # remove colchetes
     clean = clean.replace("-", "_")      # troca hífen por underline
     return clean + ".png"
 
-def find_local_image(qid):
+def scan_local_images(local_dir=LOCAL_DIR):
+    """Lista o diretório uma única vez: nome do arquivo -> os.DirEntry"""
+    try:
+        return {entry.name: entry for entry in os.scandir(local_dir) if entry.is_file()}
+    except FileNotFoundError:
+        return {}
+
+def find_local_image(qid, local_files):
+    # Mesmos nomes aceitos antes, na mesma ordem, mas consultando a listagem
     expected = sanitize_filename(qid)          # 104217_A.png
     original = f"[{qid}].png" if not qid.startswith("[") else f"{qid}.png"
 
-    path_original = os.path.join(LOCAL_DIR, original.strip("[]") if original.endswith(".png") else original)
-    path_bracket = os.path.join(LOCAL_DIR, original)
-    path_sanitized = os.path.join(LOCAL_DIR, expected)
-
-    if os.path.isfile(path_original): return path_original
-    if os.path.isfile(path_bracket): return path_bracket
-    if os.path.isfile(path_sanitized): return path_sanitized
-
+    for name in (original.strip("[]") if original.endswith(".png") else original, original, expected):
+        if name in local_files:
+            return local_files[name]
     return None
 
-def upload_image(supa, qid):
-    filename = sanitize_filename(qid)
-    local_path = find_local_image(qid)
-
-    if not local_path:
-        print(f"⚠️ Imagem não encontrada para {qid} → ignorado")
-        return False
-
-    remote_path = f"public/{filename}"
-    mime, _ = mimetypes.guess_type(filename)
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def file_digest(entry, previous):
+    # Reaproveita o hash do manifesto se tamanho e mtime não mudaram
+    st = entry.stat()
+    if previous and previous.get("size") == st.st_size and previous.get("mtime") == st.st_mtime:
+        return previous["sha256"], st
+    h = hashlib.sha256()
+    with open(entry.path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest(), st
+
+def plan_sync(rows, local_files, manifest):
+    """
+    Decide o que enviar. Retorna (envios, urls, ausentes):
+    - envios: [(qid, entry, remote_path, sha256, stat)] de arquivos novos ou alterados
+    - urls: {qid: remote_path} para todas as questões com imagem local
+    - ausentes: qids sem imagem local
+    """
+    uploads, remote_by_qid, missing = [], {}, []
+    for row in rows:
+        qid = row["id_questao_origem"]
+        entry = find_local_image(qid, local_files)
+        if entry is None:
+            missing.append(qid)
+            continue
+        remote_path = f"public/{sanitize_filename(qid)}"
+        remote_by_qid[qid] = remote_path
+        previous = manifest.get(remote_path)
+        digest, st = file_digest(entry, previous)
+        if previous and previous.get("sha256") == digest:
+            # Conteúdo igual: só atualiza tamanho/mtime se o arquivo foi tocado
+            previous.update(size=st.st_size, mtime=st.st_mtime)
+            continue
+        uploads.append((qid, entry, remote_path, digest, st))
+    return uploads, remote_by_qid, missing
+
+def upload_file(supa, entry, remote_path):
+    mime, _ = mimetypes.guess_type(remote_path)
     mime = mime or "image/png"
-
-    with open(local_path, "rb") as f:
+    with open(entry.path, "rb") as f:
         supa.storage.from_(BUCKET).upload(
             remote_path,
             f.read(),
             {"content-type": mime, "upsert": "true"}
         )
+    return supa.storage.from_(BUCKET).get_public_url(remote_path)
 
-    public_url = supa.storage.from_(BUCKET).get_public_url(remote_path)
-    supa.table(TABLE_NAME).update({"url_imagem": public_url}).eq("id_questao_origem", qid).execute()
-
-    print(f"✅ OK → {qid} → {public_url}")
-    return True
+def update_url(supa, qid, url):
+    # UPDATE (PATCH) e não upsert: só altera questões que existem, sem montar
+    # uma linha nova que esbarraria nas colunas NOT NULL
+    supa.table(TABLE_NAME).update({"url_imagem": url}).eq("id_questao_origem", qid).execute()
 
-def main():
-    supa = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+def sync_images(supa, rows, local_dir=LOCAL_DIR, manifest_path=MANIFEST_PATH, workers=WORKERS):
+    """Envia só imagens novas/alteradas em paralelo e atualiza só as URLs que mudaram"""
+    local_files = scan_local_images(local_dir)
+    manifest = load_manifest(manifest_path)
+    uploads, remote_by_qid, missing = plan_sync(rows, local_files, manifest)
 
+    for qid in missing:
+        print(f"⚠️ Imagem não encontrada para {qid} → ignorado")
+    print(f"→ {len(uploads)} imagens novas ou alteradas, {len(remote_by_qid) - len(uploads)} sem mudança")
+
+    ok, failed = 0, 0
+    if uploads:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(upload_file, supa, entry, remote_path): (qid, remote_path, digest, st)
+                       for (qid, entry, remote_path, digest, st) in uploads}
+            for fut in as_completed(futures):
+                qid, remote_path, digest, st = futures[fut]
+                try:
+                    url = fut.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Falha ao enviar {qid}: {e}")
+                    continue
+                manifest[remote_path] = {"sha256": digest, "size": st.st_size, "mtime": st.st_mtime, "url": url}
+                ok += 1
+                print(f"✅ OK → {qid} → {url}")
+
+    # Atualiza, em paralelo, só as questões cuja URL no banco difere da enviada
+    # (cada questão tem sua própria URL, então é uma atualização por chave)
+    updates = []
+    for row in rows:
+        qid = row["id_questao_origem"]
+        info = manifest.get(remote_by_qid.get(qid))
+        if info and row.get("url_imagem") != info["url"]:
+            updates.append((qid, info["url"]))
+    updated = 0
+    if updates:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(update_url, supa, qid, url): qid for qid, url in updates}
+            for fut in as_completed(futures):
+                try:
+                    fut.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Falha ao atualizar url_imagem de {futures[fut]}: {e}")
+                    continue
+                updated += 1
+        print(f"✅ url_imagem atualizada em {updated} questões")
+
+    save_manifest(manifest, manifest_path)
+    return {"enviadas": ok, "falhas": failed, "sem_mudanca": len(remote_by_qid) - len(uploads),
+            "ausentes": len(missing), "urls_atualizadas": updated}
+
+def remove_images(supa, qids, manifest_path=MANIFEST_PATH):
+    """Apaga do bucket (e do manifesto) as imagens de questões removidas"""
+    manifest = load_manifest(manifest_path)
+    paths = [f"public/{sanitize_filename(qid)}" for qid in qids]
+    paths = [p for p in paths if p in manifest]
+    if not paths:
+        return 0
+    supa.storage.from_(BUCKET).remove(paths)
+    for p in paths:
+        manifest.pop(p, None)
+    save_manifest(manifest, manifest_path)
+    return len(paths)
+
+def clear_bucket(supa):
     print("🧹 Limpando bucket…")
     try:
         files = supa.storage.from_(BUCKET).list("public/")
@@ -75,17 +191,39 @@ def main():
         pass
     print("✅ Bucket limpo")
 
+def main():
+    parser = argparse.ArgumentParser(description="Envia as imagens das questões para o Storage do Supabase")
+    parser.add_argument("--full", action="store_true",
+                        help="Limpa o bucket e reenvia tudo (ignora o manifesto de envios)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Envios em paralelo")
+    parser.add_argument("--diff", nargs="?", const=DIFF_PATH, default=None,
+                        help=f"Considera só as questões novas/alteradas/removidas da última extração (padrão: {DIFF_PATH})")
+    args = parser.parse_args()
+
+    require_env()
+    from supabase import create_client
+    supa = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+
+    if args.full:
+        clear_bucket(supa)
+        if os.path.exists(MANIFEST_PATH):
+            os.remove(MANIFEST_PATH)
+
     print("🔍 Buscando ha_imagem = true…")
-    rows = supa.table(TABLE_NAME).select("id_questao_origem").eq("ha_imagem", True).execute().data
-    print(f"→ {len(rows)} imagens para enviar\n")
+    rows = supa.table(TABLE_NAME).select("id_questao_origem,url_imagem").eq("ha_imagem", True).execute().data
+    if args.diff:
+        with open(args.diff, "r", encoding="utf-8") as f:
+            diff = json.load(f)
+        keys = set(diff["adicionadas"]) | set(diff["alteradas"])
+        rows = [row for row in rows if row["id_questao_origem"] in keys]
+        removed = remove_images(supa, diff["removidas"])
+        print(f"🧮 Diferenças ({args.diff}): {removed} imagens de questões removidas apagadas do bucket")
+    print(f"→ {len(rows)} questões com imagem\n")
 
-    count = 0
-    for row in rows:
-        if upload_image(supa, row["id_questao_origem"]):
-            count += 1
+    stats = sync_images(supa, rows, workers=args.workers)
 
-    print(f"\n🎉 FINALIZADO — {count} imagens enviadas com sucesso.")
+    print(f"\n🎉 FINALIZADO — {stats['enviadas']} imagens enviadas, {stats['sem_mudanca']} sem mudança, "
+          f"{stats['falhas']} falhas.")
 
 if __name__ == "__main__":
     main()
-
@@ -1,56 +1,53 @@
 import os
-import csv
-import time
 import sys
-from typing import List, Dict, Any
+import json
+import asyncio
+import argparse
+from typing import Dict, Any, Iterator
+
+from bulk_upload import PostgrestClient, upload_rows, delete_rows, print_stats
+from questao import iter_csv_rows
 
 # ========= CONFIG =========
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    print("❌ ERRO: Variáveis de ambiente SUPABASE_URL e SUPABASE_ANON_KEY são obrigatórias")
-    print("Configure-as antes de executar este script:")
-    print("export SUPABASE_URL='sua_url_aqui'")
-    print("export SUPABASE_ANON_KEY='sua_chave_aqui'")
-    sys.exit(1)
-
 TABLE_NAME = "questoes"
 CSV_PATH   = "simulados.csv"
+DIFF_PATH  = "simulados_diff.json"
 BATCH_SIZE = 500
+CONCURRENCY = 4
 # ==========================
 
-try:
-    from supabase import create_client, Client
-except Exception as e:
-    raise SystemExit(f"❌ Instale com: pip install supabase\nErro: {e}")
-
-def read_csv_rows(path: str) -> List[Dict[str, Any]]:
-    with open(path, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    for r in rows:
-        for k in ("id", "simulado_numero"):
-            if k in r and r[k] not in (None, "", "NULL", "null"):
-                try:
-                    r[k] = int(r[k])
-                except ValueError:
-                    pass
-
-        # ✅ CONVERSÃO CORRETA PARA BOOLEAN
-        if "ha_imagem" in r:
-            v = str(r["ha_imagem"]).strip().upper()
-            r["ha_imagem"] = True if v.startswith("S") else False
-
-        for col in [
-            "id","id_questao_origem","tema","enunciado",
-            "alternativa_a","alternativa_b","alternativa_c","alternativa_d",
-            "resposta_correta","ha_imagem","comentario","simulado_numero"
-        ]:
-            r.setdefault(col, "")
-
-    return rows
+def require_env():
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        print("❌ ERRO: Variáveis de ambiente SUPABASE_URL e SUPABASE_ANON_KEY são obrigatórias")
+        print("Configure-as antes de executar este script:")
+        print("export SUPABASE_URL='sua_url_aqui'")
+        print("export SUPABASE_ANON_KEY='sua_chave_aqui'")
+        sys.exit(1)
+
+def read_csv_rows(path: str) -> Iterator[Dict[str, Any]]:
+    # Uma linha por vez, já tipada; o upload agrupa em lotes conforme consome.
+    # O `id` do CSV é só a posição no PDF: quem identifica a questão no upsert é
+    # id_questao_origem, e o `id` fica com o banco (uma linha existente mantém o
+    # seu, e as respostas salvas no app continuam ligadas à mesma questão).
+    for row in iter_csv_rows(path):
+        data = row.to_dict()
+        data.pop("id", None)
+        yield data
+
+def load_diff(path: str) -> Dict[str, Any]:
+    """Diferenças gravadas por extrair_simulados.py (novas, alteradas, removidas)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def delta_rows(rows: Iterator[Dict[str, Any]], diff: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # Só as linhas novas ou alteradas seguem para o upsert
+    keys = set(diff["adicionadas"]) | set(diff["alteradas"])
+    for row in rows:
+        if row["id_questao_origem"] in keys:
+            yield row
 
 def rls_hint(action: str) -> str:
     return (
@@ -60,6 +57,19 @@ def rls_hint(action: str) -> str:
     )
 
 def main():
+    parser = argparse.ArgumentParser(description="Envia simulados.csv para a tabela questoes (upsert)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Lotes em andamento ao mesmo tempo")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Tamanho inicial do lote")
+    parser.add_argument("--diff", nargs="?", const=DIFF_PATH, default=None,
+                        help=f"Envia só as diferenças da última extração (padrão: {DIFF_PATH})")
+    args = parser.parse_args()
+
+    require_env()
+    try:
+        from supabase import create_client, Client
+    except Exception as e:
+        raise SystemExit(f"❌ Instale com: pip install supabase\nErro: {e}")
+
     print("🔗 Conectando ao Supabase…")
     supa: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
@@ -72,39 +82,41 @@ def main():
         print(rls_hint("SELECT"))
         return
 
-    print(f"🧹 Apagando TODOS os registros da tabela '{TABLE_NAME}' (via delete)…")
-    try:
-        supa.table(TABLE_NAME).delete().gt("id", 0).execute()
-        print("✅ DELETE total concluído.")
-    except Exception as e:
-        print(f"❌ Falhou ao apagar: {e}")
-        print(rls_hint("DELETE"))
-        return
-
+    # Upsert por id_questao_origem: reenviar o CSV atualiza em vez de duplicar,
+    # sem precisar apagar a tabela antes. O CSV é lido em streaming.
     print(f"📄 Lendo CSV: {CSV_PATH}")
+    print(f"⬆️ Enviando registros (upsert) em lotes de ~{args.batch_size}, "
+          f"{args.concurrency} em paralelo…")
+    client = PostgrestClient(SUPABASE_URL, SUPABASE_ANON_KEY, TABLE_NAME)
     rows = read_csv_rows(CSV_PATH)
-    total = len(rows)
-    if total == 0:
-        print("⚠️ CSV vazio.")
+    if args.diff:
+        diff = load_diff(args.diff)
+        print(f"🧮 Diferenças ({args.diff}): {len(diff['adicionadas'])} novas, "
+              f"{len(diff['alteradas'])} alteradas, {len(diff['removidas'])} removidas")
+        rows = delta_rows(rows, diff)
+        if diff["removidas"]:
+            removed = delete_rows(diff["removidas"], client)
+            print(f"🗑️ Removidas: {removed['removidas']}")
+            for falha in removed["falhas"]:
+                print(f"❌ Remoção de {falha['linhas']} linhas falhou (HTTP {falha['status']}): {falha['mensagem']}")
+            if removed["falhas"] and any(f["status"] in (401, 403) for f in removed["falhas"]):
+                print(rls_hint("DELETE"))
+    stats = asyncio.run(upload_rows(rows, client,
+                                    concurrency=args.concurrency, batch_size=args.batch_size))
+    if stats["enviadas"] == 0 and not stats["falhas"]:
+        print("✅ Nada a enviar." if args.diff else "⚠️ CSV vazio.")
         return
+    print_stats(stats)
 
-    print(f"⬆️ Inserindo {total} registros em lotes de {BATCH_SIZE}…")
-    inserted = 0
-    for i in range(0, total, BATCH_SIZE):
-        batch = rows[i:i+BATCH_SIZE]
-        try:
-            supa.table(TABLE_NAME).insert(batch).execute()
-            inserted += len(batch)
-            print(f"✅ Lote {i//BATCH_SIZE + 1}: {len(batch)} ok (total {inserted}/{total})")
-            time.sleep(0.2)
-        except Exception as e:
-            print(f"❌ Erro no INSERT: {e}")
-            print(rls_hint("INSERT"))
-            return
+    if stats["falhas"]:
+        if any(f["status"] in (401, 403) for f in stats["falhas"]):
+            print(rls_hint("INSERT/UPDATE"))
+        if any(f["status"] == 400 for f in stats["falhas"]):
+            print("💡 O upsert exige um índice único em id_questao_origem.")
+        return
 
     print("🎉 CONCLUÍDO COM SUCESSO!")
-    print(f"→ Registros inseridos: {inserted}")
+    print(f"→ Registros enviados: {stats['enviadas']}")
 
 if __name__ == "__main__":
     main()
-
@@ -5,36 +5,433 @@ Monitora logs de segurança e detecta atividades suspeitas
 """
 
 import os
+import re
 import sys
+import zlib
 import json
 import time
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
+import queue
+import random
+import argparse
+import threading
+import urllib.request
+import multiprocessing
+from datetime import datetime
+from collections import OrderedDict, deque
 from typing import Dict, List, Any
 
+class SlidingWindowCounter:
+    """
+    Eventos por chave (IP) em uma janela deslizante de `window` segundos.
+
+    Cada chave guarda um deque com os instantes dos seus eventos: o novo entra
+    no fim e os vencidos saem do início, em O(1) amortizado por evento. As
+    chaves ficam em ordem de uso (OrderedDict); a cada evento, as chaves do
+    início que estão paradas há mais de `window` segundos são removidas, e
+    `max_keys` limita quantas chaves ficam na memória (a menos usada sai).
+    """
+    def __init__(self, window: float, max_keys: int = 100_000, max_events_per_key: int = 1_000):
+        self.window = window
+        self.max_keys = max_keys
+        self.max_events_per_key = max_events_per_key
+        self._events: "OrderedDict[str, deque]" = OrderedDict()
+        self.evicted_idle = 0
+        self.evicted_over_limit = 0
+
+    def add(self, key: str, ts: float) -> int:
+        """Registra um evento em `ts` (segundos) e retorna quantos há na janela"""
+        events = self._events.get(key)
+        if events is None:
+            # A contagem satura em max_events_per_key, o que basta para os limites de alerta
+            events = self._events[key] = deque(maxlen=self.max_events_per_key)
+            if len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+                self.evicted_over_limit += 1
+        else:
+            self._events.move_to_end(key)
+        events.append(ts)
+        
+        cutoff = ts - self.window
+        while events[0] <= cutoff:
+            events.popleft()
+        self.sweep(ts)
+        return len(events)
+
+    def sweep(self, now: float):
+        """Remove as chaves sem eventos na janela que termina em `now`"""
+        cutoff = now - self.window
+        events = self._events
+        while events:
+            key = next(iter(events))
+            if events[key][-1] > cutoff:
+                break
+            del events[key]
+            self.evicted_idle += 1
+
+    def count(self, key: str) -> int:
+        events = self._events.get(key)
+        return len(events) if events else 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._events
+
+class TokenBucketLimiter:
+    """
+    Limite de taxa por chave com balde de fichas: cada chave guarda só
+    [fichas, instante da última recarga, recusas seguidas], e cada evento
+    custa O(1), qualquer que seja a taxa. O balde enche `rate` fichas por
+    segundo até `burst`; um evento sem ficha disponível é uma violação.
+
+    Um balde cheio equivale a não ter estado, então as chaves paradas há
+    mais de burst/rate segundos são removidas (sempre do início, que está
+    em ordem de uso), e `max_keys` limita a memória.
+    """
+    def __init__(self, rate: float, burst: float, max_keys: int = 200_000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate deve ser > 0 e burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_after = burst / rate
+        self._buckets: "OrderedDict[Any, list]" = OrderedDict()
+        self.rejected = 0
+        self.evicted_idle = 0
+        self.evicted_over_limit = 0
+
+    def hit(self, key: Any, ts: float) -> int:
+        """
+        Consome uma ficha de `key` no instante `ts` (segundos). Retorna 0 se
+        o evento está dentro do limite, ou quantos eventos seguidos foram
+        recusados (1 no primeiro evento de uma violação).
+        """
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [self.burst - 1.0, ts, 0]
+            if len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+                self.evicted_over_limit += 1
+            self.sweep(ts)
+            return 0
+
+        buckets.move_to_end(key)
+        tokens = bucket[0]
+        elapsed = ts - bucket[1]
+        if elapsed > 0:
+            # Eventos fora de ordem (elapsed < 0) não recarregam o balde
+            tokens += elapsed * self.rate
+            if tokens > self.burst:
+                tokens = self.burst
+            bucket[1] = ts
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            bucket[2] = 0
+            return 0
+        bucket[0] = tokens
+        bucket[2] += 1
+        self.rejected += 1
+        return bucket[2]
+
+    def sweep(self, now: float):
+        """Remove as chaves cujo balde já estaria cheio em `now`"""
+        cutoff = now - self.idle_after
+        buckets = self._buckets
+        while buckets:
+            key = next(iter(buckets))
+            if buckets[key][1] > cutoff:
+                break
+            del buckets[key]
+            self.evicted_idle += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._buckets
+
+# ---------------- Despacho de alertas ----------------
+class StdoutSink:
+    """Imprime os alertas no terminal (formato original do monitor)"""
+    def write(self, alert: Dict):
+        repeated = alert.get('repeated')
+        if repeated:
+            print(f"🔁 ALERTA REPETIDO: {alert['type']} x{repeated}")
+            print(f"   IP: {alert['ip']}")
+            print(f"   Janela: {alert['first_seen']} → {alert['last_seen']}")
+        else:
+            print(f"🚨 ALERTA DE SEGURANÇA: {alert['type']}")
+            print(f"   IP: {alert['ip']}")
+            print(f"   Detalhes: {json.dumps(alert['details'], indent=2)}")
+        print(f"   Severidade: {alert['severity']}")
+        print("-" * 50)
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def close(self):
+        self.flush()
+
+class JsonlSink:
+    """Acrescenta um alerta por linha em um arquivo JSONL"""
+    def __init__(self, path: str):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, alert: Dict):
+        self.file.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class WebhookSink:
+    """Envia os alertas em lotes (POST com uma lista JSON) para um webhook"""
+    def __init__(self, url: str, timeout: float = 5.0, batch_size: int = 100):
+        self.url = url
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.pending: List[Dict] = []
+        self.errors = 0
+
+    def write(self, alert: Dict):
+        self.pending.append(alert)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        body = json.dumps(self.pending, ensure_ascii=False).encode('utf-8')
+        self.pending = []
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as e:
+            self.errors += 1
+            print(f"⚠️  Erro ao enviar alertas para {self.url}: {e}", file=sys.stderr)
+
+    def close(self):
+        self.flush()
+
+class AlertDispatcher:
+    """
+    Agrupa e despacha alertas sem bloquear a análise dos eventos.
+
+    O primeiro alerta de cada (tipo, IP) sai na hora; os seguintes dentro de
+    `suppression_window` segundos (pelo tempo dos eventos) só são contados e,
+    quando a janela termina, saem como um único alerta com `repeated`. A
+    escrita nos destinos (sinks) roda em uma thread, alimentada por uma fila
+    limitada: se ela encher, o alerta é descartado e contado em `dropped`,
+    em vez de segurar o processamento.
+    """
+    def __init__(self, sinks: List = None, suppression_window: float = 60.0,
+                 max_keys: int = 100_000, max_pending: int = 10_000):
+        self.sinks = [StdoutSink()] if sinks is None else sinks
+        self.suppression_window = suppression_window
+        self.max_keys = max_keys
+        # (tipo, ip) -> [início da janela, repetições, último alerta, instante do último],
+        # em ordem de início da janela
+        self._windows: "OrderedDict[tuple, list]" = OrderedDict()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = None
+        self.published = 0
+        self.suppressed = 0
+        self.dispatched = 0
+        self.dropped = 0
+
+    def publish(self, alert: Dict, now: float):
+        """Recebe um alerta ocorrido em `now` (segundos)"""
+        self.published += 1
+        if self.suppression_window <= 0:
+            self._emit(alert)
+            return
+        self.sweep(now)
+        key = (alert['type'], alert['ip'])
+        window = self._windows.get(key)
+        if window is not None:
+            window[1] += 1
+            window[2] = alert
+            window[3] = now
+            self.suppressed += 1
+            return
+        self._windows[key] = [now, 0, alert, now]
+        if len(self._windows) > self.max_keys:
+            self._close_window(*self._windows.popitem(last=False))
+        self._emit(alert)
+
+    def forward(self, alert: Dict):
+        """Despacha um alerta que já passou pela supressão em outro dispatcher (ex.: de um worker)"""
+        self.published += 1
+        self._emit(alert)
+
+    def sweep(self, now: float):
+        """Fecha as janelas de supressão que terminaram até `now`"""
+        cutoff = now - self.suppression_window
+        windows = self._windows
+        while windows:
+            key = next(iter(windows))
+            if windows[key][0] > cutoff:
+                break
+            self._close_window(key, windows.pop(key))
+
+    def _close_window(self, key: tuple, window: list):
+        start, repeated, last_alert, last_time = window
+        if repeated:
+            self._emit(dict(last_alert, repeated=repeated,
+                            first_seen=datetime.fromtimestamp(start).isoformat(),
+                            last_seen=datetime.fromtimestamp(last_time).isoformat()))
+
+    def _emit(self, alert: Dict):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _work(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            for alert in batch:
+                if alert is None:
+                    continue
+                for sink in self.sinks:
+                    try:
+                        sink.write(alert)
+                    except Exception as e:
+                        print(f"⚠️  Erro no destino de alertas {type(sink).__name__}: {e}", file=sys.stderr)
+                self.dispatched += 1
+            for sink in self.sinks:
+                try:
+                    sink.flush()
+                except Exception as e:
+                    print(f"⚠️  Erro no destino de alertas {type(sink).__name__}: {e}", file=sys.stderr)
+            if stop:
+                return
+
+    def close(self):
+        """Fecha as janelas pendentes, espera a fila esvaziar e fecha os destinos"""
+        while self._windows:
+            self._close_window(*self._windows.popitem(last=False))
+        if self._thread is not None:
+            self._queue.put(None)  # aqui pode esperar: o processamento já terminou
+            self._thread.join()
+            self._thread = None
+        for sink in self.sinks:
+            sink.close()
+
+    def stats(self) -> Dict:
+        return {
+            'alerts_published': self.published,
+            'alerts_suppressed': self.suppressed,
+            'alerts_dispatched': self.dispatched,
+            'alerts_dropped': self.dropped,
+        }
+
+def serve_webhook_stub(port: int, latency: float = 0.0):
+    """Webhook local para testes: imprime quantos alertas recebe em cada POST"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            try:
+                alerts = json.loads(body)
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            print(f"📨 {len(alerts)} alerta(s) recebido(s)", flush=True)
+            self.send_response(204)
+            self.end_headers()
+
+    print(f"🌐 Webhook local em http://127.0.0.1:{port}/ (Ctrl+C para parar)")
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# Limites de API (requisições por segundo, rajada), como em src/lib/server/security.ts
+API_RATE_LIMIT = (100 / 60, 100)  # 100 requisições por minuto por IP
+ROUTE_RATE_LIMITS = {
+    '/api/pagamentos': (20 / 60, 20),
+    '/api/cadastro': (10 / 60, 10),
+}
+MAX_ROUTE_CACHE = 10_000
+
 class SecurityMonitor:
-    def __init__(self):
-        self.suspicious_ips = set()
-        self.rate_limit_violations = defaultdict(list)
-        self.failed_logins = defaultdict(list)
-        self.payment_attempts = defaultdict(list)
+    def __init__(self, time_window: int = 900, max_tracked_ips: int = 100_000,
+                 max_events_per_ip: int = 1_000, api_rate_limit: tuple = API_RATE_LIMIT,
+                 route_rate_limits: Dict[str, tuple] = None, dispatcher: AlertDispatcher = None):
+        self.dispatcher = dispatcher if dispatcher is not None else AlertDispatcher()
         self.alerts = deque(maxlen=100)
+        self.last_event_time = None  # instante (s) do último evento analisado
         
         # Configurações de alerta
         self.MAX_FAILED_LOGINS = 5
         self.MAX_PAYMENT_ATTEMPTS = 3
-        self.TIME_WINDOW = 900  # 15 minutos
+        self.TIME_WINDOW = time_window  # 15 minutos
+        
+        # Janelas por IP com limite de memória: IPs parados há mais de
+        # TIME_WINDOW saem, e no máximo max_tracked_ips ficam em cada janela
+        self.failed_logins = SlidingWindowCounter(time_window, max_tracked_ips, max_events_per_ip)
+        self.payment_attempts = SlidingWindowCounter(time_window, max_tracked_ips, max_events_per_ip)
+        # IPs suspeitos: só o instante do último alerta de cada um; um IP sem
+        # alertas há mais de TIME_WINDOW deixa de ser suspeito
+        self.suspicious_ips = SlidingWindowCounter(time_window, max_tracked_ips, max_events_per_key=1)
+        
+        # Taxa de uso da API: um balde por IP e, para as rotas com limite
+        # próprio (prefixo -> (taxa, rajada)), um balde por (IP, prefixo)
+        self.api_limiter = TokenBucketLimiter(*api_rate_limit, max_keys=max_tracked_ips)
+        if route_rate_limits is None:
+            route_rate_limits = ROUTE_RATE_LIMITS
+        # Prefixos mais longos primeiro, para valer o limite mais específico
+        self.route_limiters = {
+            prefix: TokenBucketLimiter(rate, burst, max_keys=max_tracked_ips)
+            for prefix, (rate, burst) in sorted(route_rate_limits.items(), key=lambda item: -len(item[0]))
+        }
+        self._route_prefix_cache: Dict[str, Any] = {}
         
-    def analyze_log_entry(self, log_entry: Dict[str, Any]):
-        """Analisa uma entrada de log para detectar atividade suspeita"""
+    def analyze_log_entry(self, log_entry: Dict[str, Any]) -> bool:
+        """
+        Analisa uma entrada de log para detectar atividade suspeita.
+        Retorna False se a entrada for inválida (ex.: timestamp que não é uma
+        data ISO), que então é ignorada.
+        """
         timestamp = log_entry.get('timestamp')
         event_type = log_entry.get('event')
         client_ip = log_entry.get('clientIP', 'unknown')
         
         if not timestamp or not event_type:
-            return
-            
-        current_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            return True
+        if not isinstance(timestamp, str) or not isinstance(event_type, str) or not isinstance(client_ip, str):
+            return False
+        
+        try:
+            current_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+        except (ValueError, OverflowError, OSError):
+            return False
+        self.last_event_time = current_time
         
         # Analisar diferentes tipos de eventos
         if 'login' in event_type and 'error' in event_type:
@@ -44,49 +441,71 @@ class SecurityMonitor:
             self._track_payment_activity(client_ip, current_time, log_entry)
             
         elif 'rate_limit' in event_type or event_type == 'api_access':
-            self._track_api_usage(client_ip, current_time)
+            self._track_api_usage(client_ip, current_time, log_entry.get('endpoint'))
             
         # Detectar padrões suspeitos
         self._detect_suspicious_patterns(client_ip, current_time)
+        return True
     
-    def _track_failed_login(self, ip: str, timestamp: datetime):
-        """Rastreia tentativas de login falhadas"""
-        self.failed_logins[ip].append(timestamp)
-        
-        # Limpar entradas antigas
-        cutoff = timestamp - timedelta(seconds=self.TIME_WINDOW)
-        self.failed_logins[ip] = [t for t in self.failed_logins[ip] if t > cutoff]
+    def _track_failed_login(self, ip: str, timestamp: float):
+        """Rastreia tentativas de login falhadas (timestamp em segundos)"""
+        attempts = self.failed_logins.add(ip, timestamp)
         
         # Verificar se excedeu o limite
-        if len(self.failed_logins[ip]) >= self.MAX_FAILED_LOGINS:
+        if attempts >= self.MAX_FAILED_LOGINS:
             self._create_alert('BRUTE_FORCE_LOGIN', ip, {
-                'attempts': len(self.failed_logins[ip]),
+                'attempts': attempts,
                 'time_window': self.TIME_WINDOW
             })
     
-    def _track_payment_activity(self, ip: str, timestamp: datetime, log_entry: Dict):
+    def _track_payment_activity(self, ip: str, timestamp: float, log_entry: Dict):
         """Rastreia atividade de pagamento suspeita"""
-        self.payment_attempts[ip].append(timestamp)
-        
-        # Limpar entradas antigas
-        cutoff = timestamp - timedelta(seconds=self.TIME_WINDOW)
-        self.payment_attempts[ip] = [t for t in self.payment_attempts[ip] if t > cutoff]
+        attempts = self.payment_attempts.add(ip, timestamp)
         
         # Verificar tentativas excessivas de pagamento
-        if len(self.payment_attempts[ip]) >= self.MAX_PAYMENT_ATTEMPTS:
+        if attempts >= self.MAX_PAYMENT_ATTEMPTS:
             self._create_alert('EXCESSIVE_PAYMENT_ATTEMPTS', ip, {
-                'attempts': len(self.payment_attempts[ip]),
+                'attempts': attempts,
                 'time_window': self.TIME_WINDOW
             })
     
-    def _track_api_usage(self, ip: str, timestamp: datetime):
-        """Rastreia uso excessivo da API"""
-        # Implementar lógica específica de rate limiting
-        pass
+    def _track_api_usage(self, ip: str, timestamp: float, endpoint: str = None):
+        """Rastreia uso excessivo da API (por IP e por rota com limite próprio)"""
+        rejected = self.api_limiter.hit(ip, timestamp)
+        if rejected == 1:
+            self._create_alert('RATE_LIMIT_VIOLATION', ip, {
+                'scope': 'ip',
+                'limit_per_minute': round(self.api_limiter.rate * 60, 2),
+                'burst': self.api_limiter.burst
+            })
+        
+        if endpoint and self.route_limiters:
+            prefix = self._route_prefix(endpoint)
+            if prefix is not None:
+                limiter = self.route_limiters[prefix]
+                if limiter.hit((ip, prefix), timestamp) == 1:
+                    self._create_alert('RATE_LIMIT_VIOLATION', ip, {
+                        'scope': 'route',
+                        'route': prefix,
+                        'limit_per_minute': round(limiter.rate * 60, 2),
+                        'burst': limiter.burst
+                    })
+    
+    def _route_prefix(self, endpoint: str):
+        """Prefixo com limite próprio que casa com o endpoint (None se nenhum)"""
+        cache = self._route_prefix_cache
+        if endpoint in cache:
+            return cache[endpoint]
+        if len(cache) >= MAX_ROUTE_CACHE:
+            cache.clear()  # endpoints com IDs não crescem o cache sem limite
+        prefix = next((p for p in self.route_limiters if endpoint.startswith(p)), None)
+        cache[endpoint] = prefix
+        return prefix
     
-    def _detect_suspicious_patterns(self, ip: str, timestamp: datetime):
+    def _detect_suspicious_patterns(self, ip: str, timestamp: float):
         """Detecta padrões comportamentais suspeitos"""
         # Verificar se IP já foi marcado como suspeito
+        self.suspicious_ips.sweep(timestamp)
         if ip in self.suspicious_ips:
             self._create_alert('SUSPICIOUS_IP_ACTIVITY', ip, {
                 'status': 'IP já marcado como suspeito'
@@ -94,8 +513,10 @@ class SecurityMonitor:
     
     def _create_alert(self, alert_type: str, ip: str, details: Dict):
         """Cria um alerta de segurança"""
+        now = self.last_event_time if self.last_event_time is not None else time.time()
         alert = {
             'timestamp': datetime.now().isoformat(),
+            'event_time': datetime.fromtimestamp(now).isoformat(),  # instante do evento que gerou o alerta
             'type': alert_type,
             'ip': ip,
             'details': details,
@@ -103,14 +524,23 @@ class SecurityMonitor:
         }
         
         self.alerts.append(alert)
-        self.suspicious_ips.add(ip)
+        self.suspicious_ips.add(ip, now)
         
-        # Log do alerta
-        print(f"🚨 ALERTA DE SEGURANÇA: {alert_type}")
-        print(f"   IP: {ip}")
-        print(f"   Detalhes: {json.dumps(details, indent=2)}")
-        print(f"   Severidade: {alert['severity']}")
-        print("-" * 50)
+        # Saída agrupada e em segundo plano (ver AlertDispatcher)
+        self.dispatcher.publish(alert, now)
+    
+    def sweep_idle(self, idle_seconds: float):
+        """
+        Fecha as janelas de supressão vencidas depois de `idle_seconds` sem
+        eventos. O relógio é o dos eventos (último evento + tempo parado),
+        o mesmo das janelas: num replay de logs antigos nada vence antes da hora.
+        """
+        if self.last_event_time is not None:
+            self.dispatcher.sweep(self.last_event_time + idle_seconds)
+
+    def close(self):
+        """Envia os alertas pendentes e fecha os destinos"""
+        self.dispatcher.close()
     
     def _get_severity(self, alert_type: str) -> str:
         """Determina a severidade do alerta"""
@@ -126,21 +556,529 @@ class SecurityMonitor:
         """Retorna resumo do status de segurança"""
         return {
             'suspicious_ips_count': len(self.suspicious_ips),
+            'evicted_suspicious_ips': self.suspicious_ips.evicted_idle + self.suspicious_ips.evicted_over_limit,
             'recent_alerts': len(self.alerts),
             'high_severity_alerts': len([a for a in self.alerts if a['severity'] == 'HIGH']),
             'failed_login_ips': len(self.failed_logins),
-            'payment_monitoring_ips': len(self.payment_attempts)
+            'payment_monitoring_ips': len(self.payment_attempts),
+            'evicted_idle_ips': self.failed_logins.evicted_idle + self.payment_attempts.evicted_idle,
+            'evicted_over_limit_ips': self.failed_logins.evicted_over_limit + self.payment_attempts.evicted_over_limit,
+            'api_rate_tracked_ips': len(self.api_limiter),
+            'api_rate_rejected_requests': self.api_limiter.rejected,
+            'route_rate_rejected_requests': sum(limiter.rejected for limiter in self.route_limiters.values()),
+            **self.dispatcher.stats()
         }
 
-def monitor_security_logs():
-    """Função principal para monitorar logs de segurança"""
-    monitor = SecurityMonitor()
-    
-    print("🛡️  MONITOR DE SEGURANÇA ATIVO")
-    print("Monitorando atividades suspeitas...")
-    print("=" * 50)
-    
-    # Simular análise de logs (em produção, ler logs reais)
+# ---------------- Ingestão de logs ----------------
+READ_CHUNK_BYTES = 1024 * 1024
+BATCH_LINES = 2000
+
+class IngestStats:
+    """Contadores de vazão e atraso da ingestão"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events = 0
+        self.parse_errors = 0
+        self.bytes = 0
+        self.batches = 0
+        self.first_event_time = None
+        self.last_event_time = None
+
+    def snapshot(self, backlog_bytes: int = 0, live: bool = True) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        lag = None
+        if live and self.last_event_time is not None:
+            lag = time.time() - self.last_event_time
+        return {
+            'events': self.events,
+            'parse_errors': self.parse_errors,
+            'batches': self.batches,
+            'megabytes': round(self.bytes / 1024 / 1024, 2),
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(self.events / elapsed) if elapsed else 0,
+            # Atraso: relógio atual menos o instante do último evento (só ao acompanhar)
+            'lag_seconds': round(lag, 3) if lag is not None else None,
+            'backlog_bytes': backlog_bytes,
+            'event_time_span_seconds': (round(self.last_event_time - self.first_event_time, 3)
+                                        if self.first_event_time is not None else None),
+        }
+
+def split_lines(carry: bytes, data: bytes):
+    """Separa as linhas completas; devolve (linhas, resto sem quebra de linha)"""
+    lines = (carry + data).split(b"\n")
+    carry = lines.pop()
+    return [line for line in lines if line.strip()], carry
+
+def unwrap_entry(entry: Any):
+    """Aceita o evento direto ou dentro de 'message' (como em `vercel logs --output json`)"""
+    if isinstance(entry, dict) and 'event' not in entry:
+        message = entry.get('message')
+        if isinstance(message, str) and message.startswith('{'):
+            try:
+                return json.loads(message)
+            except ValueError:
+                return entry
+    return entry
+
+def parse_batch(lines: List[bytes], stats: IngestStats) -> List[Any]:
+    """
+    Interpreta um lote de linhas JSONL com um único json.loads (as linhas
+    viram um array). O array só vale se tiver um objeto por linha: uma linha
+    como `1,2` vira dois itens e duas metades de um objeto quebrado viram um
+    só, então, nesses casos ou se o array for inválido, cai para linha a linha.
+    """
+    try:
+        entries = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        entries = None
+    if entries is None or len(entries) != len(lines) or not all(isinstance(entry, dict) for entry in entries):
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                stats.parse_errors += 1
+    return [unwrap_entry(entry) for entry in entries]
+
+class FileFollower:
+    """
+    Lê um arquivo JSONL como `tail -F`: entrega as linhas acrescentadas e,
+    quando o arquivo é rotacionado (novo inode) ou truncado, termina o antigo
+    e recomeça do início do novo.
+    """
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self.file = None
+        self.inode = None
+        self.carry = b""
+        self.eof = False
+        self._open(seek_end=not from_start)
+
+    def _open(self, seek_end: bool = False):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.file = None
+            return
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        if seek_end:
+            self.file.seek(0, os.SEEK_END)
+
+    def read(self, max_bytes: int = READ_CHUNK_BYTES) -> List[bytes]:
+        if self.file is None:
+            self._open()
+            if self.file is None:
+                self.eof = True
+                return []
+
+        data = self.file.read(max_bytes)
+        if data:
+            self.eof = False
+            lines, self.carry = split_lines(self.carry, data)
+            return lines
+
+        self.eof = True
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if st.st_ino != self.inode or st.st_size < self.file.tell():
+            # Rotação ou truncamento: a última linha sem quebra também conta
+            lines = [self.carry] if self.carry.strip() else []
+            self.carry = b""
+            self.file.close()
+            self._open()
+            self.eof = False
+            return lines
+        return []
+
+    def backlog_bytes(self) -> int:
+        if self.file is None:
+            return 0
+        try:
+            return max(0, os.stat(self.path).st_size - self.file.tell())
+        except FileNotFoundError:
+            return 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+class StreamReader:
+    """Lê JSONL de um fluxo (stdin), entregando o que já chegou sem esperar encher o bloco"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.carry = b""
+        self.eof = False
+
+    def read(self, max_bytes: int = READ_CHUNK_BYTES) -> List[bytes]:
+        if self.eof:
+            return []
+        data = self.stream.read1(max_bytes)
+        if not data:
+            self.eof = True
+            return [self.carry] if self.carry.strip() else []
+        lines, self.carry = split_lines(self.carry, data)
+        return lines
+
+    def backlog_bytes(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+def analyze_lines(monitor: SecurityMonitor, lines: List[bytes], stats: IngestStats, batch_lines: int = BATCH_LINES):
+    """Interpreta as linhas em lotes e passa cada evento ao monitor"""
+    analyze = monitor.analyze_log_entry
+    for start in range(0, len(lines), batch_lines):
+        entries = parse_batch(lines[start:start + batch_lines], stats)
+        stats.batches += 1
+        for entry in entries:
+            # Linhas com JSON válido mas evento inválido também contam como erro
+            if not isinstance(entry, dict) or not analyze(entry):
+                stats.parse_errors += 1
+        stats.events += len(entries)
+    if monitor.last_event_time is not None:
+        if stats.first_event_time is None:
+            stats.first_event_time = monitor.last_event_time
+        stats.last_event_time = monitor.last_event_time
+
+def ingest(monitor, sources: List, follow: bool = True, batch_lines: int = BATCH_LINES,
+           stats_interval: float = 10.0, poll_interval: float = 0.5, max_seconds: float = None,
+           clock=time.monotonic, sleep=time.sleep) -> IngestStats:
+    """
+    Alimenta o monitor (SecurityMonitor ou ShardedMonitor) com as linhas das
+    fontes, em lotes. Com follow=False (replay), lê tudo o mais rápido
+    possível e para no fim das fontes; os eventos são avaliados pelos seus
+    próprios timestamps. `clock`/`sleep` só medem o tempo parado no follow.
+    """
+    stats = IngestStats()
+    sharded = isinstance(monitor, ShardedMonitor)
+    last_lines_at = clock()
+    next_report = time.perf_counter() + stats_interval
+    deadline = time.perf_counter() + max_seconds if max_seconds else None
+
+    while True:
+        got_lines = False
+        for source in sources:
+            lines = source.read()
+            if not lines:
+                continue
+            got_lines = True
+            stats.bytes += sum(map(len, lines)) + len(lines)
+            if sharded:
+                monitor.feed(lines, stats)
+            else:
+                analyze_lines(monitor, lines, stats, batch_lines)
+
+        if got_lines:
+            last_lines_at = clock()
+        now = time.perf_counter()
+        if stats_interval and now >= next_report:
+            print_ingest_stats(stats.snapshot(sum(src.backlog_bytes() for src in sources), live=follow))
+            next_report = now + stats_interval
+        if deadline and now >= deadline:
+            break
+        if not got_lines:
+            if not follow and all(src.eof for src in sources):
+                break
+            if follow:
+                # Sem eventos novos: fecha as janelas de supressão vencidas no tempo parado
+                # (no modo com processos, cada worker faz isso sozinho)
+                if not sharded:
+                    monitor.sweep_idle(clock() - last_lines_at)
+                sleep(poll_interval)
+    return stats
+
+def print_ingest_stats(snapshot: Dict):
+    lag = f", atraso {snapshot['lag_seconds']:.1f}s" if snapshot['lag_seconds'] is not None else ""
+    print(f"📈 {snapshot['events']} eventos ({snapshot['events_per_second']:,}/s), "
+          f"{snapshot['megabytes']} MB, {snapshot['parse_errors']} linhas inválidas"
+          f"{lag}, {snapshot['backlog_bytes']} bytes pendentes")
+
+# ---------------- Execução em vários processos ----------------
+# clientIP na linha bruta, também dentro de um 'message' com JSON escapado
+CLIENT_IP_PATTERN = re.compile(rb'clientIP\\?"\s*:\s*\\?"([^"\\]*)')
+
+def shard_of(line: bytes, shards: int) -> int:
+    """Processo responsável pela linha: hash estável do clientIP"""
+    match = CLIENT_IP_PATTERN.search(line)
+    return zlib.crc32(match.group(1) if match else b'unknown') % shards
+
+class QueueSink:
+    """Destino de alertas de um worker: devolve os alertas ao processo principal"""
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.pending: List[Dict] = []
+
+    def write(self, alert: Dict):
+        self.pending.append(alert)
+
+    def flush(self):
+        if self.pending:
+            self.outbox.put(('alerts', self.pending))
+            self.pending = []
+
+    def close(self):
+        self.flush()
+
+def _shard_worker(index: int, inbox, outbox, monitor_options: Dict, suppression_window: float,
+                  follow: bool, poll_interval: float):
+    """Processo de um shard: monitor próprio para os IPs que caem nele"""
+    dispatcher = AlertDispatcher([QueueSink(outbox)], suppression_window=suppression_window)
+    monitor = SecurityMonitor(dispatcher=dispatcher, **monitor_options)
+    stats = IngestStats()
+    error = None
+    last_chunk_at = time.monotonic()
+    try:
+        while True:
+            try:
+                chunk = inbox.get(timeout=poll_interval)
+            except queue.Empty:
+                if follow:
+                    monitor.sweep_idle(time.monotonic() - last_chunk_at)
+                continue
+            if chunk is None:
+                break
+            last_chunk_at = time.monotonic()
+            analyze_lines(monitor, chunk.split(b"\n"), stats)
+    except KeyboardInterrupt:
+        pass  # Ctrl+C chega a todo o grupo: encerra entregando o que já analisou
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # Sempre avisa o processo principal, mesmo após um erro
+        summary, alerts = None, []
+        try:
+            monitor.close()
+            summary, alerts = monitor.get_security_summary(), list(monitor.alerts)
+        except Exception as e:
+            error = error or f"{type(e).__name__}: {e}"
+        outbox.put(('done', index, summary, alerts, stats.events, stats.parse_errors, error))
+
+class ShardedMonitor:
+    """
+    Distribui a análise entre `workers` processos, cada um com seu próprio
+    SecurityMonitor. Cada linha vai para o processo escolhido pelo hash do
+    clientIP, então todo o estado de um IP fica em um só processo e seus
+    eventos são analisados na ordem em que chegaram.
+
+    Os workers agrupam seus alertas (AlertDispatcher) e os devolvem ao
+    processo principal, que os entrega ao `dispatcher` daqui (os destinos
+    configurados). Ao fechar, os resumos e alertas de todos são combinados.
+    """
+    def __init__(self, workers: int, monitor_options: Dict = None, dispatcher: AlertDispatcher = None,
+                 follow: bool = False, poll_interval: float = 0.5, max_pending_chunks: int = 64):
+        self.workers = workers
+        monitor_options = dict(monitor_options or {})
+        monitor_options.pop('dispatcher', None)
+        # Quem agrupa são os workers (cada IP está em um só), com a janela do
+        # dispatcher recebido; aqui os alertas deles só são repassados (forward)
+        self.dispatcher = dispatcher if dispatcher is not None else AlertDispatcher()
+        suppression_window = self.dispatcher.suppression_window
+        self.alerts = deque(maxlen=100)
+        self.summary: Dict = {}
+        self.parse_errors = 0
+        self.events = 0
+        self.failed: Dict[int, str] = {}  # shard -> erro
+        self.dropped_lines = 0  # linhas destinadas a shards que falharam
+
+        self._outbox = multiprocessing.Queue()
+        self._inboxes = [multiprocessing.Queue(maxsize=max_pending_chunks) for _ in range(workers)]
+        self._processes = [
+            multiprocessing.Process(target=_shard_worker, daemon=True,
+                                    args=(i, inbox, self._outbox, monitor_options, suppression_window,
+                                          follow, poll_interval))
+            for i, inbox in enumerate(self._inboxes)
+        ]
+        for process in self._processes:
+            process.start()
+        self._results: List[tuple] = []
+        self._reported: set = set()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def feed(self, lines: List[bytes], stats: IngestStats = None):
+        """Envia as linhas, separadas por shard, aos workers (espera se a fila deles encher)"""
+        shards = self.workers
+        buckets: List[List[bytes]] = [[] for _ in range(shards)]
+        search = CLIENT_IP_PATTERN.search
+        for line in lines:
+            match = search(line)
+            buckets[zlib.crc32(match.group(1) if match else b'unknown') % shards].append(line)
+        for index, bucket in enumerate(buckets):
+            if bucket and not self._put(index, b"\n".join(bucket)):
+                self.dropped_lines += len(bucket)
+        if stats is not None:
+            stats.events += len(lines)
+            stats.batches += 1
+
+    def _put(self, index: int, item) -> bool:
+        """Entrega ao shard sem travar se ele tiver morrido; False se falhou"""
+        inbox = self._inboxes[index]
+        process = self._processes[index]
+        while index not in self.failed:
+            try:
+                inbox.put(item, timeout=1.0)
+                return True
+            except queue.Full:
+                if not process.is_alive():
+                    self._fail(index, f"processo saiu com código {process.exitcode}")
+        return False
+
+    def _fail(self, index: int, error: str):
+        if index not in self.failed:
+            self.failed[index] = error
+            print(f"⚠️  Worker {index} falhou ({error}); seus eventos serão descartados", file=sys.stderr)
+
+    def _collect(self):
+        missing_since: Dict[int, float] = {}
+        while len(self._reported) < self.workers:
+            try:
+                message = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                # Um worker morto sem 'done' (ex.: morto pelo sistema) não pode travar o fechamento;
+                # espera um ciclo a mais para não perder um 'done' ainda em trânsito
+                now = time.monotonic()
+                for index, process in enumerate(self._processes):
+                    if index in self._reported or process.exitcode is None:
+                        continue
+                    if now - missing_since.setdefault(index, now) >= 1.0:
+                        self._fail(index, f"processo saiu com código {process.exitcode}")
+                        self._reported.add(index)
+                continue
+            if message[0] == 'alerts':
+                for alert in message[1]:
+                    self.dispatcher.forward(alert)
+            else:
+                index, error = message[1], message[-1]
+                if error:
+                    self._fail(index, error)
+                self._results.append(message[1:])
+                self._reported.add(index)
+
+    def close(self) -> Dict:
+        """Termina os workers e combina seus resumos e alertas"""
+        for index in range(self.workers):
+            self._put(index, None)
+        self._collector.join()
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self.dispatcher.close()
+
+        summaries = []
+        alerts = []
+        for index, summary, worker_alerts, events, parse_errors, _ in sorted(self._results, key=lambda r: r[0]):
+            if summary is not None:
+                summaries.append(summary)
+            alerts.extend(worker_alerts)
+            self.events += events
+            self.parse_errors += parse_errors
+        self.summary, self.alerts = merge_results(summaries, alerts)
+        # Alertas descartados aqui, na fila do processo principal
+        self.summary['alerts_dropped'] = self.summary.get('alerts_dropped', 0) + self.dispatcher.dropped
+        self.summary['workers'] = self.workers
+        self.summary['failed_workers'] = len(self.failed)
+        self.summary['dropped_lines'] = self.dropped_lines
+        return self.summary
+
+    def get_security_summary(self) -> Dict:
+        return self.summary
+
+# Campos do resumo que dependem de como os IPs se dividem entre os processos:
+# cada shard remove os IPs parados no ritmo dos seus próprios eventos
+SHARD_DEPENDENT_KEYS = (
+    'suspicious_ips_count', 'evicted_suspicious_ips', 'failed_login_ips', 'payment_monitoring_ips',
+    'evicted_idle_ips', 'evicted_over_limit_ips', 'api_rate_tracked_ips', 'workers',
+)
+
+def merge_results(summaries: List[Dict], alerts: List[Dict], max_alerts: int = 100):
+    """
+    Combina os resultados dos shards: os IPs de cada shard são disjuntos,
+    então as contagens somam; os alertas recentes são os `max_alerts` mais
+    novos de todos pelo instante do evento, e as contagens derivadas deles
+    são recalculadas. Os alertas são os mesmos de um processo só; já os IPs
+    em memória (SHARD_DEPENDENT_KEYS) podem diferir um pouco.
+    """
+    recent = deque(sorted(alerts, key=lambda alert: alert['event_time']), maxlen=max_alerts)
+    merged: Dict = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            merged[key] = merged.get(key, 0) + value
+    merged['recent_alerts'] = len(recent)
+    merged['high_severity_alerts'] = len([a for a in recent if a['severity'] == 'HIGH'])
+    return merged, recent
+
+def comparable_result(summary: Dict, alerts) -> tuple:
+    """Resumo e alertas recentes sem o que varia com o número de processos (e sem o relógio)"""
+    return ({key: value for key, value in summary.items() if key not in SHARD_DEPENDENT_KEYS},
+            [{key: value for key, value in alert.items() if key != 'timestamp'} for alert in alerts])
+
+def replay_sharded(path: str, workers: int, monitor_options: Dict = None) -> Dict:
+    """Processa um arquivo inteiro com `workers` processos (sem imprimir alertas)"""
+    monitor = ShardedMonitor(workers, monitor_options, dispatcher=AlertDispatcher([]))
+    source = FileFollower(path, from_start=True)
+    start = time.perf_counter()
+    try:
+        ingest(monitor, [source], follow=False, stats_interval=0)
+    finally:
+        source.close()
+    summary = monitor.close()
+    seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'events': monitor.events, 'summary': summary, 'alerts': list(monitor.alerts)}
+
+def bench_sharding(path: str, max_workers: int = 8, monitor_options: Dict = None) -> List[Dict]:
+    """
+    Vazão do replay de `path` com 1, 2, 4, ... até max_workers processos.
+    `same_result` diz se o resumo e os alertas recentes combinados são os
+    mesmos da execução com 1 processo (ver comparable_result).
+    """
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    rows = []
+    base = None
+    reference = None
+    for workers in counts:
+        result = replay_sharded(path, workers, monitor_options)
+        rate = result['events'] / result['seconds']
+        base = base or rate
+        comparable = comparable_result(result['summary'], result['alerts'])
+        reference = reference or comparable
+        rows.append({
+            'workers': workers,
+            'events_per_second': round(rate),
+            'speedup': round(rate / base, 2),
+            'efficiency': round(rate / base / workers, 2),
+            'alerts_published': result['summary']['alerts_published'],
+            'same_result': comparable == reference,
+        })
+    return rows
+
+def generate_sample_logs(count: int, ips: int = 1000, start: datetime = None, seed: int = 42):
+    """Eventos sintéticos (um dict por evento) para testar a ingestão e medir vazão"""
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1)
+    events = ['api_access'] * 6 + ['login_success', 'login_error', 'payment_attempt', 'payment_success']
+    routes = ['/api/simulados', '/api/simulados/1/questoes', '/api/cadastro', '/api/pagamentos', '/api/admin']
+    t = start.timestamp()
+    for _ in range(count):
+        t += rng.expovariate(200)  # ~200 eventos/s
+        yield {
+            'timestamp': datetime.fromtimestamp(t).isoformat(),
+            'event': rng.choice(events),
+            'clientIP': f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(ips) % 256}",
+            'endpoint': rng.choice(routes),
+            'method': 'GET',
+        }
+
+def run_demo(monitor: SecurityMonitor):
+    # Sem fontes: analisa dois eventos de exemplo
     sample_logs = [
         {
             'timestamp': datetime.now().isoformat(),
@@ -158,6 +1096,111 @@ def monitor_security_logs():
     
     for log_entry in sample_logs:
         monitor.analyze_log_entry(log_entry)
+
+def bench_api_tracking(events: int = 1_000_000, ips: int = 200_000, seed: int = 42,
+                       api_rate_limit: tuple = API_RATE_LIMIT, route_rate_limits: Dict[str, tuple] = None) -> Dict:
+    """
+    Microbenchmark do rastreamento de taxa da API: custo por evento de
+    `_track_api_usage` (sem parsing de JSON nem impressão de alertas) e
+    memória ocupada pelos baldes.
+    """
+    import tracemalloc
+
+    rng = random.Random(seed)
+    routes = ['/api/simulados', '/api/simulados/1/questoes', '/api/cadastro', '/api/pagamentos', '/api/admin']
+    ip_pool = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(ips)]
+    t = datetime(2025, 1, 1).timestamp()
+    stream = []
+    for _ in range(events):
+        t += rng.expovariate(2000)
+        # 10% do tráfego vem de poucos IPs muito ativos, que estouram o limite
+        ip = ip_pool[rng.randrange(20)] if rng.random() < 0.1 else ip_pool[rng.randrange(ips)]
+        stream.append((ip, t, rng.choice(routes)))
+
+    def noop(ip, ts, endpoint):
+        pass
+
+    start = time.perf_counter()
+    for ip, ts, endpoint in stream:
+        noop(ip, ts, endpoint)
+    loop_seconds = time.perf_counter() - start
+
+    monitor = SecurityMonitor(api_rate_limit=api_rate_limit, route_rate_limits=route_rate_limits)
+    alerts = []
+    monitor._create_alert = lambda alert_type, ip, details: alerts.append(alert_type)
+    track = monitor._track_api_usage
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for ip, ts, endpoint in stream:
+        track(ip, ts, endpoint)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Mesma passada sem tracemalloc, que pesa no tempo
+    monitor = SecurityMonitor(api_rate_limit=api_rate_limit, route_rate_limits=route_rate_limits)
+    monitor._create_alert = lambda alert_type, ip, details: None
+    track = monitor._track_api_usage
+    start = time.perf_counter()
+    for ip, ts, endpoint in stream:
+        track(ip, ts, endpoint)
+    seconds = time.perf_counter() - start
+
+    keys = len(monitor.api_limiter) + sum(len(limiter) for limiter in monitor.route_limiters.values())
+    return {
+        'events': events,
+        'distinct_ips': ips,
+        'ns_per_event': round((seconds - loop_seconds) / events * 1e9, 1),
+        'ns_per_event_with_loop': round(seconds / events * 1e9, 1),
+        'events_per_second': round(events / seconds),
+        'tracked_keys': keys,
+        'peak_memory_mb': round(peak / 1024 / 1024, 1),
+        'bytes_per_key': round(peak / keys) if keys else None,
+        'violations': len(alerts),
+        'rejected_requests': monitor.api_limiter.rejected + sum(
+            limiter.rejected for limiter in monitor.route_limiters.values()),
+    }
+
+def monitor_security_logs(paths: List[str] = None, replay: bool = False, from_start: bool = False,
+                          batch_lines: int = BATCH_LINES, stats_interval: float = 10.0,
+                          poll_interval: float = 0.5, monitor_options: Dict = None, workers: int = 1):
+    """
+    Função principal para monitorar logs de segurança.
+
+    paths: arquivos JSONL a acompanhar ('-' para stdin). Com replay=True os
+    arquivos são lidos do início ao fim, sem esperar novas linhas.
+    monitor_options: argumentos extras do SecurityMonitor (ex.: limites de API).
+    workers: com mais de 1, os eventos são divididos por IP entre processos.
+    """
+    monitor_options = monitor_options or {}
+    follow = bool(paths) and not replay and any(path != '-' for path in paths)
+    if paths and workers > 1:
+        monitor = ShardedMonitor(workers, monitor_options, dispatcher=monitor_options.get('dispatcher'),
+                                 follow=follow, poll_interval=poll_interval)
+    else:
+        monitor = SecurityMonitor(**monitor_options)
+    
+    print("🛡️  MONITOR DE SEGURANÇA ATIVO")
+    print("Monitorando atividades suspeitas...")
+    print("=" * 50)
+    
+    if not paths:
+        run_demo(monitor)
+    else:
+        sources = [StreamReader(sys.stdin.buffer) if path == '-' else FileFollower(path, from_start or replay)
+                   for path in paths]
+        try:
+            stats = ingest(monitor, sources, follow=follow, batch_lines=batch_lines,
+                           stats_interval=stats_interval, poll_interval=poll_interval)
+        except KeyboardInterrupt:
+            stats = None
+        finally:
+            for source in sources:
+                source.close()
+        if stats is not None:
+            print_ingest_stats(stats.snapshot(live=follow))
+    monitor.close()
     
     # Exibir resumo
     summary = monitor.get_security_summary()
@@ -168,5 +1211,103 @@ def monitor_security_logs():
     print("\n✅ Monitoramento concluído")
     return monitor
 
+def parse_rate_limit(value: str) -> tuple:
+    """'100' ou '100/20' (requisições por minuto / rajada) -> (por segundo, rajada)"""
+    per_minute, _, burst = value.partition('/')
+    try:
+        per_minute = float(per_minute)
+        burst = float(burst) if burst else per_minute
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"limite inválido: {value}")
+    if per_minute <= 0 or burst < 1:
+        raise argparse.ArgumentTypeError(f"limite inválido: {value}")
+    return per_minute / 60, burst
+
+def parse_route_limit(value: str):
+    """'/api/pagamentos=20/5' -> ('/api/pagamentos', (por segundo, rajada)); 'none' -> None"""
+    if value == 'none':
+        return None
+    prefix, sep, limit = value.partition('=')
+    if not sep or not prefix:
+        raise argparse.ArgumentTypeError(f"use PREFIXO=POR_MINUTO[/RAJADA]: {value}")
+    return prefix, parse_rate_limit(limit)
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor de segurança: analisa logs JSONL em tempo real")
+    parser.add_argument("paths", nargs="*",
+                        help="Arquivos JSONL a acompanhar ('-' para stdin, ex.: vercel logs ... | security-monitor.py -)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Processa os arquivos do início ao fim o mais rápido possível, pelos timestamps dos eventos")
+    parser.add_argument("--from-start", action="store_true", help="Ao acompanhar, lê os arquivos desde o início")
+    parser.add_argument("--batch-lines", type=int, default=BATCH_LINES, help="Linhas interpretadas por lote")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="Segundos entre relatórios de vazão (0 desliga)")
+    parser.add_argument("--poll", type=float, default=0.5, help="Espera (s) quando não há linhas novas")
+    parser.add_argument("--generate", type=int, metavar="N", help="Escreve N eventos sintéticos em JSONL no stdout e sai")
+    parser.add_argument("--api-limit", type=parse_rate_limit, default=API_RATE_LIMIT, metavar="POR_MINUTO[/RAJADA]",
+                        help="Limite de requisições à API por IP (padrão: 100/100)")
+    parser.add_argument("--route-limit", action="append", type=parse_route_limit, metavar="PREFIXO=POR_MINUTO[/RAJADA]",
+                        help="Limite por IP para rotas com o prefixo (repetível; substitui os limites padrão; "
+                             "'none' desliga)")
+    parser.add_argument("--suppress-window", type=float, default=60.0,
+                        help="Segundos em que alertas repetidos do mesmo tipo e IP são só contados (0 desliga)")
+    parser.add_argument("--alerts-jsonl", metavar="ARQUIVO", help="Também grava os alertas neste arquivo JSONL")
+    parser.add_argument("--webhook", metavar="URL", help="Também envia os alertas (em lotes) para este webhook")
+    parser.add_argument("--no-stdout-alerts", action="store_true", help="Não imprime os alertas no terminal")
+    parser.add_argument("--serve-webhook", type=int, metavar="PORTA",
+                        help="Sobe um webhook local que só conta os alertas recebidos (para testes) e sai ao parar")
+    parser.add_argument("--webhook-latency", type=float, default=0.0,
+                        help="Latência (s) simulada por requisição no webhook local")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos de análise; os eventos são divididos pelo hash do clientIP")
+    parser.add_argument("--bench-shards", metavar="ARQUIVO",
+                        help="Mede a vazão do replay de ARQUIVO com 1, 2, 4... até --max-workers processos e sai")
+    parser.add_argument("--max-workers", type=int, default=8, help="Maior número de processos em --bench-shards")
+    parser.add_argument("--bench", type=int, nargs="?", const=1_000_000, metavar="N",
+                        help="Mede o custo por evento do rastreamento de taxa da API com N eventos e sai")
+    args = parser.parse_args()
+
+    route_limits = None
+    if args.route_limit:
+        route_limits = dict(limit for limit in args.route_limit if limit is not None)
+    monitor_options = {'api_rate_limit': args.api_limit, 'route_rate_limits': route_limits}
+
+    if args.serve_webhook:
+        serve_webhook_stub(args.serve_webhook, args.webhook_latency)
+        return
+
+    if args.bench:
+        print("⏱️  Benchmark do rastreamento de taxa da API...")
+        for key, value in bench_api_tracking(args.bench, **monitor_options).items():
+            print(f"   {key}: {value}")
+        return
+
+    if args.bench_shards:
+        print(f"⏱️  Escalonamento por processos ({os.cpu_count()} CPUs)...")
+        print(f"   {'workers':>7} {'eventos/s':>10} {'speedup':>8} {'eficiência':>10} {'resultado':>10}")
+        for row in bench_sharding(args.bench_shards, args.max_workers, monitor_options):
+            same = "igual" if row['same_result'] else "DIFERENTE"
+            print(f"   {row['workers']:>7} {row['events_per_second']:>10,} {row['speedup']:>8} "
+                  f"{row['efficiency']:>10} {same:>10}")
+        return
+
+    if args.generate:
+        out = sys.stdout
+        for entry in generate_sample_logs(args.generate):
+            out.write(json.dumps(entry) + "\n")
+        return
+
+    if not args.paths and not sys.stdin.isatty():
+        args.paths = ['-']
+
+    sinks = [] if args.no_stdout_alerts else [StdoutSink()]
+    if args.alerts_jsonl:
+        sinks.append(JsonlSink(args.alerts_jsonl))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    monitor_options['dispatcher'] = AlertDispatcher(sinks, suppression_window=args.suppress_window)
+    monitor_security_logs(args.paths, replay=args.replay, from_start=args.from_start,
+                          batch_lines=args.batch_lines, stats_interval=args.stats_interval,
+                          poll_interval=args.poll, monitor_options=monitor_options, workers=args.workers)
+
 if __name__ == "__main__":
-    monitor_security_logs()
\ No newline at end of file
+    main()
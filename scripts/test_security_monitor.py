@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Testes do Monitor de Segurança
+==============================
+
+Os instantes dos eventos são passados explicitamente (relógio injetado),
+então nenhum teste depende do relógio da máquina.
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+import importlib.util
+from pathlib import Path
+
+# security-monitor.py tem hífen no nome: carregado pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "security_monitor", Path(__file__).resolve().parent / "security-monitor.py")
+sm = importlib.util.module_from_spec(_spec)
+sys.modules["security_monitor"] = sm
+_spec.loader.exec_module(sm)
+
+
+def test_sliding_window_eviction():
+    """Eventos vencidos saem da janela e IPs parados ou em excesso saem da memória"""
+    print("🧪 Testando a janela deslizante por IP...")
+
+    counter = sm.SlidingWindowCounter(window=10, max_keys=2, max_events_per_key=3)
+    assert counter.add("a", 0) == 1
+    assert counter.add("a", 5) == 2
+    # Em t=10 o evento de t=0 sai da janela (o limite é exclusivo)
+    assert counter.add("a", 10) == 2
+    # A contagem satura em max_events_per_key
+    assert [counter.add("a", 11), counter.add("a", 12)] == [3, 3]
+
+    # Acima de max_keys, sai o IP usado há mais tempo
+    counter.add("b", 13)
+    counter.add("a", 14)
+    counter.add("c", 15)
+    assert "b" not in counter and "a" in counter and counter.evicted_over_limit == 1
+
+    # Um IP sem eventos na janela sai na próxima varredura
+    counter.sweep(24)
+    assert "a" not in counter and "c" in counter and counter.evicted_idle == 1
+    counter.add("d", 30)
+    assert len(counter) == 1 and counter.count("c") == 0 and counter.evicted_idle == 2
+    print("   ✅ Janela e remoção de IPs")
+
+
+def test_suspicious_ip_expiry():
+    """Um IP deixa de ser suspeito depois de TIME_WINDOW sem alertas"""
+    print("\n🧪 Testando a expiração de IPs suspeitos...")
+
+    monitor = sm.SecurityMonitor(time_window=60, dispatcher=sm.AlertDispatcher([]))
+
+    def event(seconds, kind="login_error", ip="1.2.3.4"):
+        ts = sm.datetime(2025, 1, 1).timestamp() + seconds
+        monitor.analyze_log_entry({'timestamp': sm.datetime.fromtimestamp(ts).isoformat(),
+                                   'event': kind, 'clientIP': ip})
+
+    for t in range(5):
+        event(t)
+    assert "1.2.3.4" in monitor.suspicious_ips
+    types = [a['type'] for a in monitor.alerts]
+    event(30, "page_view")
+    assert len(monitor.alerts) == len(types) + 1 and monitor.alerts[-1]['type'] == 'SUSPICIOUS_IP_ACTIVITY'
+
+    # Passada a janela desde o último alerta, o IP volta a ser tratado como novo
+    event(200, "page_view")
+    assert "1.2.3.4" not in monitor.suspicious_ips and len(monitor.alerts) == len(types) + 1
+    monitor.close()
+    print("   ✅ IP suspeito expirado")
+
+
+def test_token_bucket_refill():
+    """O balde recarrega `rate` fichas por segundo até `burst`, e chaves paradas saem"""
+    print("\n🧪 Testando o balde de fichas...")
+
+    limiter = sm.TokenBucketLimiter(rate=1, burst=3)
+    # A rajada inicial cabe no balde; as recusas seguidas são numeradas
+    assert [limiter.hit("a", 0) for _ in range(5)] == [0, 0, 0, 1, 2]
+    # Meio segundo não rende uma ficha; um segundo rende
+    assert limiter.hit("a", 0.5) == 3
+    assert limiter.hit("a", 1.5) == 0 and limiter.hit("a", 1.5) == 1
+    # Um evento fora de ordem não recarrega o balde
+    assert limiter.hit("a", 1.0) == 2
+    # A recarga para em `burst`
+    assert [limiter.hit("a", 100) for _ in range(4)] == [0, 0, 0, 1]
+    assert limiter.rejected == 6
+
+    # Um balde que já estaria cheio equivale a não ter estado
+    limiter.hit("b", 101)
+    limiter.sweep(103.5)
+    assert "a" not in limiter and "b" in limiter and limiter.evicted_idle == 1
+    limiter.sweep(104)
+    assert len(limiter) == 0 and limiter.evicted_idle == 2
+
+    limiter = sm.TokenBucketLimiter(rate=1, burst=3, max_keys=1)
+    limiter.hit("a", 0)
+    limiter.hit("b", 0)
+    assert "a" not in limiter and limiter.evicted_over_limit == 1
+    print("   ✅ Recarga e remoção de chaves")
+
+
+class ListSink:
+    """Destino de alertas em memória"""
+    def __init__(self):
+        self.alerts = []
+
+    def write(self, alert):
+        self.alerts.append(alert)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_dispatcher_coalescing():
+    """Alertas repetidos na janela de supressão saem como um só, com `repeated`"""
+    print("\n🧪 Testando o agrupamento de alertas...")
+
+    sink = ListSink()
+    dispatcher = sm.AlertDispatcher([sink], suppression_window=10)
+
+    def alert(kind, n):
+        return {'type': kind, 'ip': '1.1.1.1', 'n': n}
+
+    dispatcher.publish(alert('X', 1), 0)
+    dispatcher.publish(alert('X', 2), 3)
+    dispatcher.publish(alert('Y', 3), 4)  # outro tipo: outra janela
+    dispatcher.publish(alert('X', 4), 5)
+    dispatcher.sweep(9.9)
+    dispatcher.publish(alert('X', 5), 9.9)  # ainda dentro da janela
+    dispatcher.sweep(10)  # a janela de X termina; a de Y (início em 4) não
+    dispatcher.publish(alert('X', 6), 11)  # nova janela: sai na hora
+    dispatcher.close()
+
+    assert [(a['n'], a.get('repeated')) for a in sink.alerts] == [(1, None), (3, None), (5, 3), (6, None)]
+    coalesced = sink.alerts[2]
+    assert coalesced['first_seen'] == sm.datetime.fromtimestamp(0).isoformat()
+    assert coalesced['last_seen'] == sm.datetime.fromtimestamp(9.9).isoformat()
+    assert dispatcher.stats() == {'alerts_published': 6, 'alerts_suppressed': 3,
+                                  'alerts_dispatched': 4, 'alerts_dropped': 0}
+    print("   ✅ Alertas agrupados por janela")
+
+
+def test_follow_idle_sweep_event_time():
+    """No follow, o tempo parado avança o relógio dos eventos, não o da máquina"""
+    print("\n🧪 Testando a varredura do follow com logs antigos...")
+
+    class RecordingDispatcher(sm.AlertDispatcher):
+        def sweep(self, now):
+            sweeps.append(now)
+            super().sweep(now)
+
+    class OneShotSource:
+        """Entrega um lote de linhas e depois fica parado"""
+        eof = False
+
+        def __init__(self, lines):
+            self.lines = lines
+
+        def read(self):
+            lines, self.lines = self.lines, []
+            return lines
+
+        def backlog_bytes(self):
+            return 0
+
+    class Stop(Exception):
+        pass
+
+    clock = [1_000.0]
+
+    def sleep(seconds):
+        open_windows.append(len(monitor.dispatcher._windows))
+        clock[0] += seconds
+        if clock[0] > 1_100:
+            raise Stop()
+
+    sweeps, open_windows = [], []
+    start = sm.datetime(2020, 1, 1).timestamp()  # logs de anos atrás
+    lines = [json.dumps({'timestamp': sm.datetime.fromtimestamp(start + t).isoformat(),
+                         'event': 'login_error', 'clientIP': '9.9.9.9'}).encode() for t in range(8)]
+    monitor = sm.SecurityMonitor(dispatcher=RecordingDispatcher([ListSink()], suppression_window=60))
+    try:
+        sm.ingest(monitor, [OneShotSource(lines)], follow=True, stats_interval=0,
+                  poll_interval=10, clock=lambda: clock[0], sleep=sleep)
+    except Stop:
+        pass
+
+    idle_sweeps = [now - (start + 7) for now in sweeps if now > start + 7]
+    print(f"   📝 Varreduras no tempo parado (s após o último evento): {idle_sweeps}")
+    assert idle_sweeps == [10 * i for i in range(1, 11)]
+    # Janelas abertas após cada varredura (0, 10, ..., 100 s parados): as dos
+    # alertas (último em start+7, janela de 60 s) só fecham aos 60 s
+    assert monitor.dispatcher.suppressed > 0
+    assert open_windows == [2] * 6 + [0] * 5
+    monitor.close()
+    print("   ✅ Mesmo relógio dos eventos")
+
+
+def test_parse_batch_malformed():
+    """Linhas malformadas não passam pelo array único do lote"""
+    print("\n🧪 Testando interpretação de lotes com linhas malformadas...")
+
+    stats = sm.IngestStats()
+    entries = sm.parse_batch([b'{"a":1}', b'1,2', b'{"b":2}'], stats)
+    assert entries == [{'a': 1}, {'b': 2}] and stats.parse_errors == 1
+
+    # Duas metades de um objeto quebrado não viram um registro válido
+    stats = sm.IngestStats()
+    entries = sm.parse_batch([b'{"c":3', b'"d":4}', b'{"e":5}'], stats)
+    assert entries == [{'e': 5}] and stats.parse_errors == 2
+
+    # JSON válido que não é objeto segue adiante (e conta como erro na análise)
+    stats = sm.IngestStats()
+    assert sm.parse_batch([b'{"a":1}', b'5'], stats) == [{'a': 1}, 5] and stats.parse_errors == 0
+
+    stats = sm.IngestStats()
+    assert sm.parse_batch([b'{"a":1}', b'{"b":2}'], stats) == [{'a': 1}, {'b': 2}]
+    print("   ✅ Lotes malformados caem para linha a linha")
+
+
+def test_file_follower_rotation():
+    """O FileFollower termina o arquivo rotacionado e recomeça no novo, e volta ao início se truncado"""
+    print("\n🧪 Testando rotação e truncamento no FileFollower...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "logs.jsonl")
+        with open(path, "wb") as f:
+            f.write(b'{"n":0}\n')
+        follower = sm.FileFollower(path)  # acompanha a partir do fim
+        assert follower.read() == []
+
+        with open(path, "ab") as f:
+            f.write(b'{"n":1}\n{"n":2')  # a última linha ainda não terminou
+        assert follower.read() == [b'{"n":1}']
+
+        # Rotação: o resto do arquivo antigo sai, e o novo é lido do início
+        os.rename(path, path + ".1")
+        with open(path, "wb") as f:
+            f.write(b'{"n":3}\n')
+        assert follower.read() == [b'{"n":2']
+        assert follower.read() == [b'{"n":3}']
+
+        with open(path, "ab") as f:
+            f.write(b'{"n":4}\n{"n":5}\n')
+        assert follower.read() == [b'{"n":4}', b'{"n":5}']
+
+        # Truncamento: recomeça do início do mesmo arquivo
+        with open(path, "wb") as f:
+            f.write(b'{"n":6}\n')
+        assert follower.read() == []
+        assert follower.read() == [b'{"n":6}']
+        assert follower.read() == [] and follower.eof
+        follower.close()
+    print("   ✅ Rotação e truncamento acompanhados")
+
+
+def write_sample_logs(path, count, ips):
+    """Eventos sintéticos concentrados em `ips` IPs, para gerar muitos alertas"""
+    rng = random.Random(7)
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in sm.generate_sample_logs(count):
+            entry['clientIP'] = f"10.0.0.{rng.randrange(ips)}"
+            f.write(json.dumps(entry) + "\n")
+
+
+def test_sharded_same_result():
+    """Com 1 ou N processos, o resumo e os alertas combinados são os mesmos"""
+    print("\n🧪 Testando o monitor em vários processos...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "logs.jsonl")
+        # Poucos IPs: muitos alertas, repetidos e agrupados
+        write_sample_logs(path, 20_000, ips=40)
+        rows = sm.bench_sharding(path, max_workers=3)
+
+        # O mesmo resultado do monitor de um processo só
+        monitor = sm.SecurityMonitor(dispatcher=sm.AlertDispatcher([]))
+        source = sm.FileFollower(path, from_start=True)
+        sm.ingest(monitor, [source], follow=False, stats_interval=0)
+        source.close()
+        monitor.close()
+        single = sm.comparable_result(monitor.get_security_summary(), monitor.alerts)
+        sharded = sm.replay_sharded(path, 2)
+
+    print(f"   ✅ {[(row['workers'], row['alerts_published'], row['same_result']) for row in rows]}")
+    assert [row['workers'] for row in rows] == [1, 2, 3]
+    assert rows[0]['alerts_published'] > 0 and all(row['same_result'] for row in rows)
+    sharded_result = sm.comparable_result(sharded['summary'], sharded['alerts'])
+    assert {k: v for k, v in sharded_result[0].items() if k in single[0]} == single[0]
+    assert sharded_result[1] == single[1]
+
+
+def test_sharded_keeps_dispatcher():
+    """O ShardedMonitor não altera o dispatcher recebido"""
+    print("\n🧪 Testando o dispatcher passado ao monitor em vários processos...")
+
+    dispatcher = sm.AlertDispatcher([], suppression_window=30)
+    monitor = sm.ShardedMonitor(2, dispatcher=dispatcher)
+    monitor.close()
+    assert dispatcher.suppression_window == 30
+    print("   ✅ Janela de supressão preservada")
+
+
+def test_merge_results():
+    """Os resumos somam e os alertas recentes são os mais novos pelo instante do evento"""
+    print("\n🧪 Testando a combinação dos resultados dos shards...")
+
+    def alert(event_time, severity):
+        return {'timestamp': '2030-01-01T00:00:00', 'event_time': event_time, 'type': 'X',
+                'ip': '1.1.1.1', 'severity': severity}
+
+    summaries = [{'alerts_published': 2, 'failed_login_ips': 1}, {'alerts_published': 3, 'failed_login_ips': 4}]
+    alerts = [alert('2025-01-01T00:00:03', 'HIGH'), alert('2025-01-01T00:00:01', 'LOW'),
+              alert('2025-01-01T00:00:02', 'HIGH')]
+    merged, recent = sm.merge_results(summaries, alerts, max_alerts=2)
+
+    assert merged['alerts_published'] == 5 and merged['failed_login_ips'] == 5
+    assert [a['event_time'][-2:] for a in recent] == ['02', '03']
+    assert merged['recent_alerts'] == 2 and merged['high_severity_alerts'] == 2
+    print("   ✅ Resultados combinados")
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("🧪 EXECUTANDO TESTES DO MONITOR DE SEGURANÇA")
+    print("=" * 50)
+
+    tests = [
+        ("Janela Deslizante", test_sliding_window_eviction),
+        ("Expiração de IP Suspeito", test_suspicious_ip_expiry),
+        ("Balde de Fichas", test_token_bucket_refill),
+        ("Agrupamento de Alertas", test_dispatcher_coalescing),
+        ("Varredura no Follow", test_follow_idle_sweep_event_time),
+        ("Lotes Malformados", test_parse_batch_malformed),
+        ("Rotação de Arquivo", test_file_follower_rotation),
+        ("Vários Processos", test_sharded_same_result),
+        ("Dispatcher Preservado", test_sharded_keeps_dispatcher),
+        ("Combinação dos Shards", test_merge_results),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append(True)
+            print(f"\n{test_name}: ✅ PASSOU")
+        except AssertionError:
+            print(f"\n{test_name}: ❌ FALHOU")
+            results.append(False)
+        except Exception as e:
+            print(f"\n{test_name}: ❌ ERRO - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print("📊 RESUMO DOS TESTES")
+    print("=" * 50)
+
+    passed = sum(results)
+    total = len(results)
+
+    print(f"Testes executados: {total}")
+    print(f"Testes passou: {passed}")
+    print(f"Taxa de sucesso: {passed/total*100:.1f}%")
+
+    if passed != total:
+        print(f"\n⚠️  {total-passed} teste(s) falharam.")
+
+
+if __name__ == "__main__":
+    run_all_tests()